@@ -0,0 +1,75 @@
+"""Runtime gzip for responses that benefit from it
+
+Starlette's ``GZipMiddleware`` compresses every response above its minimum
+size on the event loop. ``SelectiveGZipMiddleware`` leaves alone:
+
+- responses that already have a Content-Encoding (the precompressed static
+  assets) or whose media type is compressed already (images, archives, PDF);
+- JSON without a Content-Length (streamed) or above ``GZIP_MAX_JSON_BYTES``:
+  compressing megabytes at level 9 would stall every other request on the
+  worker, and such clients are usually other services on a fast network.
+"""
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.static_assets import is_compressible
+
+
+def skip_compression(headers: Headers, max_json_bytes: int) -> bool:
+    """Whether a response with these headers should be sent as is"""
+    if "content-encoding" in headers:
+        return True
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if not is_compressible(media_type):
+        return True
+    if media_type == "application/json" or media_type.endswith(("+json", "/x-ndjson")):
+        length = headers.get("content-length", "")
+        return not length.isdigit() or int(length) > max_json_bytes
+    return False
+
+
+class _SelectiveGZipResponder(GZipResponder):
+    def __init__(
+        self, app: ASGIApp, minimum_size: int, compresslevel: int, max_json_bytes: int
+    ) -> None:
+        super().__init__(app, minimum_size, compresslevel=compresslevel)
+        self.max_json_bytes = max_json_bytes
+
+    async def send_with_gzip(self, message: Message) -> None:
+        await super().send_with_gzip(message)
+        if message["type"] == "http.response.start" and skip_compression(
+            Headers(raw=message["headers"]), self.max_json_bytes
+        ):
+            # GZipResponder passes bodies through untouched when it has seen
+            # a Content-Encoding header
+            self.content_encoding_set = True
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """``GZipMiddleware`` that skips precompressed and large JSON responses"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        compresslevel: int = 9,
+        max_json_bytes: int = 1024 * 1024,
+    ) -> None:
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.max_json_bytes = max_json_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            if "gzip" in headers.get("Accept-Encoding", ""):
+                responder = _SelectiveGZipResponder(
+                    self.app,
+                    self.minimum_size,
+                    compresslevel=self.compresslevel,
+                    max_json_bytes=self.max_json_bytes,
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -16,12 +16,40 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Background jobs (Celery)
+    JOB_QUEUE_BACKEND: str = "redis"  # redis, sqlite, eager (in-process, tests)
+    JOB_QUEUE_SQLITE_PATH: str = "./jobs.db"
+    WORKER_CONCURRENCY: int = 4
+    JOB_MAX_RETRIES: int = 6
+    JOB_RETRY_BACKOFF_SECONDS: int = 5  # 5s, 10s, 20s, ... with jitter
+    JOB_RETRY_BACKOFF_MAX_SECONDS: int = 600
+    KSEF_SUBMIT_RATE_LIMIT: Optional[str] = None  # per worker, e.g. "10/s"
+
     # Security
     JWT_SECRET: str = "your-secret-key-change-this-in-production"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # Password hashing (see app.utils.passwords); outdated hashes are
+    # replaced on the next successful login
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # bcrypt, argon2id (needs argon2-cffi)
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_KIB: int = 64 * 1024
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: int = 2  # threads per process
+    PASSWORD_HASH_MAX_PENDING: int = 32  # running + waiting, 503 beyond
+
+    # Principals of access tokens (see app.utils.principals), so authenticated
+    # requests skip the users table; entries never outlive their token
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_BACKEND: str = "memory"  # memory (per process), redis (shared)
+    AUTH_CACHE_TTL_SECONDS: int = 300
+    AUTH_CACHE_MAX_ENTRIES: int = 10_000  # memory backend, per process
+    # Memory backend: other workers keep a changed principal this long at most
+    AUTH_CACHE_MEMORY_TTL_SECONDS: int = 5
+
     # CORS
     ALLOWED_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -30,7 +58,26 @@ class Settings(BaseSettings):
     ALLOWED_HOSTS: List[str] = ["localhost", "api.polcomply.pl"]
 
     # KSeF API
-    KSEF_API_URL: str = "https://ksef-test.mf.gov.pl"
+    KSEF_API_URL: str = "https://ksef-test.mf.gov.pl"  # sandbox/test
+    KSEF_DEMO_API_URL: str = "https://ksef-demo.mf.gov.pl"
+    KSEF_PRODUCTION_API_URL: str = "https://ksef.mf.gov.pl"
+    KSEF_PUBLIC_KEY_PATH: Optional[str] = None  # MF key for token encryption
+    KSEF_MAX_CONNECTIONS: int = 20  # per process and environment
+    KSEF_KEEPALIVE_SECONDS: float = 60.0
+    KSEF_TIMEOUT_SECONDS: float = 30.0
+    KSEF_SESSION_TTL_SECONDS: int = 1200
+    KSEF_BATCH_CONCURRENCY: int = 4
+
+    # KSeF status poller
+    KSEF_POLL_INITIAL_INTERVAL_SECONDS: float = 2.0  # doubles after each check
+    KSEF_POLL_MAX_INTERVAL_SECONDS: float = 60.0
+    KSEF_POLL_MAX_ATTEMPTS: int = 120
+    KSEF_POLL_BATCH_SIZE: int = 200
+    KSEF_POLL_RATE_PER_SECOND: float = 10.0  # status calls across all companies
+    KSEF_POLL_LEASE_SECONDS: int = 120
+    KSEF_POLL_IDLE_SECONDS: float = 1.0
+    KSEF_SUBMISSION_TTL_SECONDS: int = 7 * 24 * 3600  # kept after the last change
+    KSEF_SUBMISSION_PURGE_INTERVAL_SECONDS: float = 300.0
     KSEF_API_KEY: Optional[str] = None
     KSEF_CERT_PATH: Optional[str] = None
 
@@ -45,8 +92,47 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     SMTP_FROM: str = "noreply@polcomply.pl"
 
-    # Rate limiting
+    # Rate limiting (token buckets per client and route class, see app.rate_limit)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory (per process), redis (shared)
     RATE_LIMIT_PER_MINUTE: int = 100
+    RATE_LIMIT_FREE_PER_MINUTE: int = 20  # anonymous /api/validate requests
+    RATE_LIMIT_LOGIN_PER_MINUTE: int = 10  # /v1/auth requests per client
+    FAIR_QUEUE_CONCURRENCY: int = 16  # limited requests running at once
+    FAIR_QUEUE_AUTHENTICATED_WEIGHT: int = 4
+    FAIR_QUEUE_FREE_WEIGHT: int = 1
+    FAIR_QUEUE_MAX_WAITING: int = 200  # per class, 503 beyond
+
+    # Request bodies (after gzip decoding) and upload streaming
+    MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_CHUNK_BYTES: int = 64 * 1024
+
+    # Runtime gzip (see app.compression); static assets are precompressed
+    GZIP_MINIMUM_BYTES: int = 1000
+    GZIP_MAX_JSON_BYTES: int = 1024 * 1024  # larger or streamed JSON is sent as is
+
+    # Dependency probes behind /health, run in the background (see app.health)
+    HEALTH_CHECKS_ENABLED: bool = True
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5.0
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = 2.0
+
+    # Request profiling (opt-in): slow requests and requests carrying a signed
+    # X-Profile token are sampled and saved to PROFILE_DIR
+    PROFILING_ENABLED: bool = False
+    PROFILING_SECRET: Optional[str] = None  # signs X-Profile; JWT_SECRET if unset
+    PROFILE_SLOW_REQUEST_SECONDS: float = 2.0
+    PROFILE_SAMPLE_INTERVAL_SECONDS: float = 0.005
+    PROFILE_DIR: str = "./profiles"
+    PROFILE_MAX_FILES: int = 100
+
+    # Lead capture (see app.services.lead_sink): requests only queue the lead,
+    # a background task appends batches to a SQLite table in WAL mode
+    LEADS_DB_PATH: str = "./out/leads.db"
+    LEAD_BATCH_SIZE: int = 100  # write early once this many are queued
+    LEAD_FLUSH_INTERVAL_SECONDS: float = 1.0
+    LEAD_CHECKPOINT_INTERVAL_SECONDS: float = 30.0  # WAL checkpoint (fsync)
+    LEAD_ROTATE_BYTES: int = 50 * 1024 * 1024  # then archived to leads-<ts>.db
+    LEAD_MAX_PENDING: int = 10_000  # queued in memory, 503 beyond
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,250 @@
+"""Dependency health, probed in the background and served from memory
+
+Load balancers poll the health endpoints every second or so. Instead of
+probing dependencies on each of those requests (or not at all), a
+``HealthMonitor`` per process runs every probe each
+``HEALTH_CHECK_INTERVAL_SECONDS`` and keeps the results; the endpoints only
+read them.
+
+Probes, each on a thread and bounded by ``HEALTH_PROBE_TIMEOUT_SECONDS``:
+
+- ``database``: ``SELECT 1`` through the pooled engine
+- ``redis``: PING, when a Redis backend is configured
+- ``schemas``: the FA schemas are compiled and loaded
+- ``queue``: the job queue's broker answers (depth per queue)
+
+The database and the schemas are required: without them the service is
+``unhealthy`` and ``/health`` answers 503. The others only make it
+``degraded``. Results older than three intervals count as failed, so a stuck
+monitor does not keep reporting the last good state.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Set
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+UNHEALTHY = "unhealthy"
+STARTING = "starting"
+
+REQUIRED = ("database", "schemas")
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of one probe run"""
+
+    status: str
+    seconds: float = 0.0
+    checked_at: float = field(default_factory=time.time)
+    error: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "status": self.status,
+            "latency_ms": round(self.seconds * 1000, 1),
+            "checked_at": self.checked_at,
+        }
+        if self.error:
+            result["error"] = self.error
+        result.update(self.details)
+        return result
+
+
+# --- Probes (blocking; they run on threads) ---------------------------------------
+
+
+def probe_database() -> Dict[str, Any]:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return {}
+
+
+def _uses_redis() -> bool:
+    return "redis" in (
+        settings.JOB_QUEUE_BACKEND,
+        settings.RATE_LIMIT_BACKEND,
+        settings.AUTH_CACHE_BACKEND,
+    )
+
+
+def probe_redis() -> Optional[Dict[str, Any]]:
+    if not _uses_redis():
+        return None
+    from redis import Redis
+
+    client = Redis.from_url(
+        settings.REDIS_URL,
+        socket_timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS,
+    )
+    try:
+        client.ping()
+    finally:
+        client.close()
+    return {}
+
+
+def probe_schemas() -> Dict[str, Any]:
+    # Imported here: the validate router reads this module's results
+    from app.routers.validate import get_schema_registry
+
+    registry = get_schema_registry()
+    if not len(registry):
+        raise RuntimeError("No FA schema found")
+    return {"versions": sorted(registry.versions.values())}
+
+
+def probe_queue() -> Optional[Dict[str, Any]]:
+    if settings.JOB_QUEUE_BACKEND == "eager":
+        return None
+    from app.metrics import queue_depths
+
+    depths = queue_depths()
+    if not depths:
+        raise RuntimeError("Broker unreachable")
+    return {"depth": depths}
+
+
+PROBES: Dict[str, Callable[[], Optional[Dict[str, Any]]]] = {
+    "database": probe_database,
+    "redis": probe_redis,
+    "schemas": probe_schemas,
+    "queue": probe_queue,
+}
+
+
+class HealthMonitor:
+    """Runs the probes periodically and keeps their latest results"""
+
+    def __init__(
+        self,
+        probes: Optional[Dict[str, Callable[[], Optional[Dict[str, Any]]]]] = None,
+        interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.probes = probes if probes is not None else PROBES
+        self.interval = interval or settings.HEALTH_CHECK_INTERVAL_SECONDS
+        self.timeout = timeout or settings.HEALTH_PROBE_TIMEOUT_SECONDS
+        self.results: Dict[str, ProbeResult] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Probes whose thread is still busy, e.g. after timing out
+        self._running: Set[str] = set()
+
+    def _run_probe(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.probes[name]()
+        finally:
+            self._running.discard(name)
+
+    async def _probe(self, name: str) -> ProbeResult:
+        if name in self._running:
+            # A hanging dependency must not pile up one thread per round
+            return ProbeResult(FAILED, error="Previous probe still running")
+        self._running.add(name)
+        started = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(
+                asyncio.to_thread(self._run_probe, name), self.timeout
+            )
+        except asyncio.TimeoutError:
+            result = ProbeResult(FAILED, error=f"Timed out after {self.timeout}s")
+        except Exception as e:
+            result = ProbeResult(FAILED, error=str(e) or type(e).__name__)
+        else:
+            result = ProbeResult(SKIPPED if details is None else OK)
+            result.details = details or {}
+        result.seconds = time.perf_counter() - started
+        return result
+
+    async def check(self) -> Dict[str, ProbeResult]:
+        """Run all probes concurrently and store the results"""
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._probe(name) for name in names))
+        for name, result in zip(names, results):
+            previous = self.results.get(name)
+            if result.status == FAILED and (
+                previous is None or previous.status != FAILED
+            ):
+                logger.warning(f"Health check {name} failed: {result.error}")
+            elif result.status != FAILED and previous and previous.status == FAILED:
+                logger.info(f"Health check {name} recovered")
+        self.results = dict(zip(names, results))
+        return self.results
+
+    def start(self) -> None:
+        """Probe in the background; the status is ``starting`` until then"""
+        if self._task is None and settings.HEALTH_CHECKS_ENABLED:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Health checks failed to run: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def result(self, name: str, now: Optional[float] = None) -> Optional[ProbeResult]:
+        """Latest result of a probe; stale results count as failed"""
+        result = self.results.get(name)
+        if result is None:
+            return None
+        age = (now or time.time()) - result.checked_at
+        if age > 3 * self.interval:
+            return ProbeResult(
+                FAILED,
+                checked_at=result.checked_at,
+                error=f"No result for {age:.0f}s",
+            )
+        return result
+
+    def status(self, now: Optional[float] = None) -> str:
+        if not settings.HEALTH_CHECKS_ENABLED:
+            return HEALTHY
+        if not self.results:
+            return STARTING
+        overall = HEALTHY
+        for name in self.probes:
+            result = self.result(name, now)
+            if result is None or result.status == FAILED:
+                if name in REQUIRED:
+                    return UNHEALTHY
+                overall = DEGRADED
+        return overall
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Overall status and every probe's latest result"""
+        checks = {}
+        for name in self.probes:
+            result = self.result(name, now)
+            if result is not None:
+                checks[name] = result.to_dict()
+        return {"status": self.status(now), "checks": checks}
+
+
+health_monitor = HealthMonitor()
@@ -5,19 +5,25 @@ Licensed under the Business Source License 1.1 (BSL).
 See LICENSE file for full terms.
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 from starlette.middleware.sessions import SessionMiddleware
 import logging
 from pathlib import Path
 
+from app.compression import SelectiveGZipMiddleware
 from app.config import settings
 from app.database import engine, Base
+from app.health import OK, SKIPPED, STARTING, UNHEALTHY, health_monitor
+from app.metrics import setup_metrics
+from app.profiling import setup_profiling
+from app.rate_limit import RateLimitMiddleware
+from app.uploads import RequestBodyLimitMiddleware
 from app.routers import auth, invoices, vat, ai, companies, validate, lead, ksef
+from app.services.ksef_client import close_http_clients
+from app.services.lead_sink import lead_sink
+from app.static_assets import StaticAssets
 from app.utils.logging import setup_logging
 
 # Setup logging
@@ -60,12 +66,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Skips precompressed static assets and large or streamed JSON
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_BYTES,
+    max_json_bytes=settings.GZIP_MAX_JSON_BYTES,
+)
 app.add_middleware(SessionMiddleware, secret_key=settings.JWT_SECRET)
 
 if settings.ENVIRONMENT == "production":
     app.add_middleware(TrustedHostMiddleware, allowed_hosts=settings.ALLOWED_HOSTS)
 
+# Per-client token buckets, then fair queuing of free vs authenticated traffic
+app.add_middleware(RateLimitMiddleware)
+
+# Reject oversized bodies while they arrive; decode gzip request bodies
+app.add_middleware(RequestBodyLimitMiddleware, max_bytes=settings.MAX_UPLOAD_BYTES)
+
+# Request latency histograms, SDK stage timings and GET /metrics
+setup_metrics(app)
+
+# Sampling profiles of slow requests, saved to PROFILE_DIR (opt-in)
+if settings.PROFILING_ENABLED:
+    setup_profiling(app)
+
 # Include routers
 app.include_router(validate.router)  # Free FA-3 validation (no prefix for easy access)
 app.include_router(ksef.router)  # KSeF sandbox integration
@@ -76,18 +100,24 @@ app.include_router(vat.router, prefix="/v1/vat", tags=["VAT"])
 app.include_router(ai.router, prefix="/v1/ai", tags=["AI Assistant"])
 app.include_router(lead.router)
 
+# Compile the FA schemas now; with gunicorn's preload_app this happens once in
+# the master process instead of in every worker
+validate.preload_schemas()
+
 
 # Resolve absolute static directory (backend/static)
 BASE_DIR = Path(__file__).resolve().parent.parent  # backend
 STATIC_DIR = BASE_DIR / "static"  # backend/static
 
+# Hashed and precompressed once here, served from memory
+static_assets = StaticAssets(STATIC_DIR, prefix="/static")
+
 
 # Upload page (root endpoint)
 @app.get("/")
-async def upload_page():
+async def upload_page(request: Request):
     """Serve the XML upload page"""
-    upload_file = STATIC_DIR / "upload.html"
-    return FileResponse(str(upload_file))
+    return static_assets.response("upload.html", request.headers)
 
 
 # API info endpoint
@@ -101,14 +131,23 @@ async def api_info():
     }
 
 
-# Health check endpoint
+# Health check endpoint: latest background probe results, 503 until the first
+# round of probes and whenever a required dependency is down
 @app.get("/health")
-async def health_check():
-    return {"status": "healthy", "database": "connected", "redis": "connected"}
+async def health_check(response: Response):
+    snapshot = health_monitor.snapshot()
+    if snapshot["status"] in (STARTING, UNHEALTHY):
+        response.status_code = 503
+    for name in ("database", "redis"):
+        probe = snapshot["checks"].get(name, {}).get("status")
+        snapshot[name] = {OK: "connected", SKIPPED: "not configured"}.get(
+            probe, "disconnected" if probe else "unknown"
+        )
+    return snapshot
 
 
 # Mount static files
-app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+app.mount("/static", static_assets, name="static")
 
 
 # Startup event
@@ -118,12 +157,17 @@ async def startup_event():
     # Create database tables
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created/verified")
+    lead_sink.start()
+    health_monitor.start()
 
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down PolComply API...")
+    await health_monitor.stop()
+    await lead_sink.stop()
+    await close_http_clients()
 
 
 if __name__ == "__main__":
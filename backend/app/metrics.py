@@ -0,0 +1,221 @@
+"""Prometheus metrics for the API, the validation pipeline and the KSeF queue
+
+Exposed at ``GET /metrics``. Request latency is measured per route template,
+pipeline stages (schema compile, XML parse, XSD validation, ...) come from the
+SDK's ``polcomply.timing`` hooks, and the KSeF submission states and job queue
+depth are read when Prometheus scrapes.
+
+Under gunicorn set ``PROMETHEUS_MULTIPROC_DIR`` to an empty directory, so every
+worker writes its samples there and a scrape aggregates all of them.
+"""
+
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from fastapi import APIRouter, Depends, FastAPI, Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy.orm import Session
+from starlette.routing import Match, Mount
+
+from app.config import settings
+from app.database import get_db
+from app.services import ksef_submissions
+
+# Ensure local package import in test/runtime without global install
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from polcomply import timing  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["metrics"])
+
+# Stages take from microseconds (cached lookups) to seconds (huge documents)
+STAGE_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "polcomply_stage_seconds",
+    "Time spent per validation/mapping pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "polcomply_http_request_seconds",
+    "HTTP request latency per route",
+    ["method", "route", "status"],
+)
+DOCUMENTS_VALIDATED = Counter(
+    "polcomply_documents_validated_total",
+    "Validated XML documents",
+    ["schema_version", "result"],
+)
+VALIDATION_ERRORS = Counter(
+    "polcomply_validation_errors_total",
+    "Validation errors reported, per error code",
+    ["code"],
+)
+EVENTS = Counter(
+    "polcomply_events_total",
+    "Pipeline events, e.g. schema cache hits and misses",
+    ["event"],
+)
+
+
+class PrometheusObserver(timing.Observer):
+    """Feeds SDK stage timings and events into the Prometheus metrics"""
+
+    def stage(self, name: str, seconds: float) -> None:
+        STAGE_SECONDS.labels(stage=name).observe(seconds)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        EVENTS.labels(event=name).inc(amount)
+
+
+_observer: Optional[PrometheusObserver] = None
+
+
+def record_validation(schema_version: Optional[str], errors: Iterable) -> None:
+    """Count one validated document and its errors by code"""
+    codes: Dict[str, int] = {}
+    for error in errors:
+        code = error.code or "VALIDATION_ERROR"
+        codes[code] = codes.get(code, 0) + 1
+    for code, amount in codes.items():
+        VALIDATION_ERRORS.labels(code=code).inc(amount)
+    DOCUMENTS_VALIDATED.labels(
+        schema_version=schema_version or "unknown",
+        result="invalid" if codes else "valid",
+    ).inc()
+
+
+def queue_depths() -> Dict[str, int]:
+    """Jobs waiting per Celery queue; empty if the broker is unreachable"""
+    if settings.JOB_QUEUE_BACKEND == "eager":
+        return {}
+
+    from app.workers.celery_app import DEAD_LETTER_QUEUE, KSEF_QUEUE, celery_app
+
+    depths: Dict[str, int] = {}
+    try:
+        with celery_app.connection_for_read() as connection:
+            # Fail fast: a scrape must not wait out the broker retry policy
+            connection.ensure_connection(max_retries=1)
+            channel = connection.default_channel
+            for queue in (KSEF_QUEUE, DEAD_LETTER_QUEUE):
+                depths[queue] = channel.queue_declare(
+                    queue=queue, passive=True
+                ).message_count
+    except Exception as e:
+        logger.warning(f"Could not read queue depth: {str(e)}")
+    return depths
+
+
+class _StateCollector:
+    """Scrape-time gauges: KSeF submissions per status and queue depth"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def collect(self):
+        submissions = GaugeMetricFamily(
+            "polcomply_ksef_submissions",
+            "Stored KSeF submissions per status",
+            labels=["status"],
+        )
+        for submission_status, count in ksef_submissions.status_counts(self.db).items():
+            submissions.add_metric([submission_status], count)
+        yield submissions
+
+        queues = GaugeMetricFamily(
+            "polcomply_queue_depth", "Jobs waiting per queue", labels=["queue"]
+        )
+        for queue, depth in queue_depths().items():
+            queues.add_metric([queue], depth)
+        yield queues
+
+
+def _process_registry() -> CollectorRegistry:
+    """This process's metrics, or every worker's in multiprocess mode"""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(db: Session = Depends(get_db)):
+    """Prometheus text exposition of all metrics"""
+    state = CollectorRegistry(auto_describe=False)
+    state.register(_StateCollector(db))
+    return Response(
+        generate_latest(_process_registry()) + generate_latest(state),
+        media_type=CONTENT_TYPE_LATEST,
+    )
+
+
+def _route_label(request: Request) -> str:
+    """Route template (``/api/ksef/status/{submission_id}``), not the raw path"""
+    route = request.scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounts (``/static``) don't set the route; label them by their prefix
+    for route in request.app.routes:
+        if isinstance(route, Mount) and route.matches(request.scope)[0] == Match.FULL:
+            return f"{route.path}/*"
+    # Unmatched paths would give every scanner probe its own series
+    return "unmatched"
+
+
+def setup_metrics(app: FastAPI) -> None:
+    """Register the SDK observer, the request timer and ``/metrics``"""
+    global _observer
+    if _observer is None:
+        _observer = timing.observe(PrometheusObserver())
+
+    @app.middleware("http")
+    async def time_requests(request: Request, call_next):
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            if request.url.path != "/metrics":
+                HTTP_REQUEST_SECONDS.labels(
+                    method=request.method,
+                    route=_route_label(request),
+                    status=str(status_code),
+                ).observe(time.perf_counter() - started)
+
+    app.include_router(router)
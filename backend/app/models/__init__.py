@@ -4,5 +4,16 @@ from .user import User
 from .company import Company
 from .invoice import Invoice
 from .audit import AuditLog
+from .vat import VatPeriodAggregate
+from .ksef import KSeFPayload, KSeFSubmission, KSeFSubmissionCount
 
-__all__ = ["User", "Company", "Invoice", "AuditLog"]
+__all__ = [
+    "User",
+    "Company",
+    "Invoice",
+    "AuditLog",
+    "VatPeriodAggregate",
+    "KSeFPayload",
+    "KSeFSubmission",
+    "KSeFSubmissionCount",
+]
@@ -30,7 +30,7 @@ class Invoice(Base):
     payment_method = Column(String(50), nullable=False)
     ksef_status = Column(
         String(50), default="pending"
-    )  # pending, submitted, accepted, rejected
+    )  # pending, submitted, accepted, rejected, unknown (polling timed out)
     ksef_upo = Column(Text, nullable=True)  # KSeF UPO (Unique Payment Order)
     ksef_error = Column(Text, nullable=True)  # KSeF error message
     validation_errors = Column(JSON, nullable=True)  # FA(3) validation errors
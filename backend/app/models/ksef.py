@@ -0,0 +1,83 @@
+"""
+KSeF submission tracking models
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from uuid import uuid4
+from app.database import Base
+
+
+class KSeFPayload(Base):
+    """
+    XML document sent to KSeF, stored once per content hash.
+
+    Kept apart from ``ksef_submissions`` so status reads never load the XML,
+    and resubmissions of the same document share one row.
+    """
+
+    __tablename__ = "ksef_payloads"
+
+    sha256 = Column(String(64), primary_key=True)
+    xml_content = Column(Text, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<KSeFPayload(sha256='{self.sha256}', size={self.size})>"
+
+
+class KSeFSubmission(Base):
+    """
+    One document sent to KSeF and awaiting (or holding) its UPO.
+
+    Shared by all API and worker processes; the status poller picks rows
+    whose ``next_poll_at`` is due, so pending submissions cost no timers.
+    Rows are purged once ``expires_at`` has passed.
+    """
+
+    __tablename__ = "ksef_submissions"
+    __table_args__ = (
+        Index("ix_ksef_submissions_due", "status", "next_poll_at"),
+        Index("ix_ksef_submissions_expires_at", "expires_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    invoice_id = Column(UUID(as_uuid=True), ForeignKey("invoices.id"), nullable=True)
+    # NULL for demo submissions from unregistered NIPs (simulated sandbox)
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=True)
+    nip = Column(String(10), nullable=False)
+    environment = Column(String(20), nullable=False, default="sandbox")
+    # PENDING, UPO, ERROR, TIMEOUT (no final answer; can be polled again)
+    status = Column(String(20), nullable=False, default="PENDING")
+    reference_number = Column(String(100), nullable=True)  # KSeF element reference
+    upo_reference = Column(String(100), nullable=True)
+    details = Column(Text, nullable=True)
+    payload_sha256 = Column(String(64), ForeignKey("ksef_payloads.sha256"))
+    poll_attempts = Column(Integer, nullable=False, default=0)
+    next_poll_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __repr__(self):
+        return (
+            f"<KSeFSubmission(id={self.id}, status='{self.status}', "
+            f"reference='{self.reference_number}')>"
+        )
+
+
+class KSeFSubmissionCount(Base):
+    """Number of stored submissions per status, so health checks never scan"""
+
+    __tablename__ = "ksef_submission_counts"
+
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<KSeFSubmissionCount(status='{self.status}', count={self.count})>"
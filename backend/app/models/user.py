@@ -11,6 +11,9 @@ from app.database import Base
 if TYPE_CHECKING:
     from app.models.company import Company
 
+# Higher roles include the permissions of lower ones
+ROLE_HIERARCHY = {"accountant": 1, "supervisor": 2, "owner": 3}
+
 
 class User(Base):
     __tablename__ = "users"
@@ -54,8 +57,7 @@ class User(Base):
 
     def has_role(self, required_role: str) -> bool:
         """Check if user has required role or higher"""
-        role_hierarchy = {"accountant": 1, "supervisor": 2, "owner": 3}
-        return role_hierarchy.get(self.role, 0) >= role_hierarchy.get(required_role, 0)
+        return ROLE_HIERARCHY.get(self.role, 0) >= ROLE_HIERARCHY.get(required_role, 0)
 
     def __repr__(self):
         return f"<User(id={self.id}, email='{self.email}', role='{self.role}')>"
@@ -0,0 +1,52 @@
+"""
+VAT period aggregate model
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+from sqlalchemy import (
+    Column,
+    String,
+    Integer,
+    DateTime,
+    Numeric,
+    ForeignKey,
+    PrimaryKeyConstraint,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class VatPeriodAggregate(Base):
+    """
+    Incrementally maintained VAT totals per company, month and VAT rate.
+
+    Rows are updated by ``app.services.vat_aggregates`` whenever an invoice is
+    created or its KSeF status changes, so the VAT summary is a primary key
+    range read instead of a scan over ``invoices``.
+    """
+
+    __tablename__ = "vat_period_aggregates"
+    __table_args__ = (PrimaryKeyConstraint("company_id", "period", "vat_rate"),)
+
+    company_id = Column(UUID(as_uuid=True), ForeignKey("companies.id"), nullable=False)
+    period = Column(String(7), nullable=False)  # YYYY-MM
+    vat_rate = Column(Integer, nullable=False)  # 0, 5, 8, 23
+    net_due = Column(Numeric(14, 2), nullable=False, default=0)  # sales
+    vat_due = Column(Numeric(14, 2), nullable=False, default=0)
+    net_deductible = Column(Numeric(14, 2), nullable=False, default=0)  # purchases
+    vat_deductible = Column(Numeric(14, 2), nullable=False, default=0)
+    # Each invoice is counted once, on the row of its first item's rate,
+    # so summing the column over a period yields distinct invoices.
+    invoice_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return (
+            f"<VatPeriodAggregate(company_id={self.company_id}, "
+            f"period='{self.period}', vat_rate={self.vat_rate})>"
+        )
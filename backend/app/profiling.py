@@ -0,0 +1,212 @@
+"""Opt-in sampling profiler for slow or explicitly flagged requests
+
+With ``PROFILING_ENABLED`` every request is watched by one shared sampler
+thread. A request that is still running after ``PROFILE_SLOW_REQUEST_SECONDS``,
+or that carries a valid ``X-Profile`` token, gets the stacks of all busy
+threads sampled every ``PROFILE_SAMPLE_INTERVAL_SECONDS`` until it finishes.
+Fast requests only register and unregister themselves, so the cost when
+nothing is profiled is a few dictionary operations per request.
+
+Profiles are written to ``PROFILE_DIR`` in the folded-stack format read by
+flamegraph.pl and speedscope; only the newest ``PROFILE_MAX_FILES`` are kept.
+Concurrent requests share threads, so a profile may include their stacks too.
+
+Create a token (valid for ten minutes) with::
+
+    python -m app.profiling
+"""
+
+import hashlib
+import hmac
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_FILE_HEADER = "X-Profile-File"
+
+
+def _sign(message: str) -> str:
+    secret = settings.PROFILING_SECRET or settings.JWT_SECRET
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def profile_token(ttl_seconds: int = 600, now: Optional[float] = None) -> str:
+    """Signed ``X-Profile`` value, valid for ``ttl_seconds``"""
+    expires = str(int((now or time.time()) + ttl_seconds))
+    return f"{expires}.{_sign(expires)}"
+
+
+def verify_token(token: str, now: Optional[float] = None) -> bool:
+    """Whether ``token`` was signed with our secret and has not expired"""
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < (now or time.time()):
+        return False
+    return hmac.compare_digest(signature, _sign(expires))
+
+
+def _frame_label(code) -> str:
+    path = "/".join(Path(code.co_filename).parts[-2:])
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    """Event loop waiting for I/O, or a thread pool worker waiting for work"""
+    code = frame.f_code
+    if code.co_name == "select" and code.co_filename.endswith("selectors.py"):
+        return True
+    while frame is not None and frame.f_code.co_filename.endswith("threading.py"):
+        frame = frame.f_back
+    return (
+        frame is not None
+        and frame.f_code.co_name == "get"
+        and frame.f_code.co_filename.endswith("queue.py")
+    )
+
+
+class _Watch:
+    """One watched request: when sampling starts and what was sampled"""
+
+    __slots__ = ("deadline", "stacks")
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.stacks: Counter = Counter()
+
+
+class StackSampler:
+    """Samples busy threads while any watched request is past its deadline"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._watches: Dict[int, _Watch] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, delay: float) -> _Watch:
+        """Start sampling after ``delay`` seconds unless unwatched before"""
+        watch = _Watch(time.monotonic() + delay)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+            earliest = min((w.deadline for w in self._watches.values()), default=None)
+            self._watches[id(watch)] = watch
+        # The sampler sleeps until the earliest deadline it knows about
+        if earliest is None or watch.deadline < earliest:
+            self._wakeup.set()
+        return watch
+
+    def unwatch(self, watch: _Watch) -> Counter:
+        """Stop watching; returns the sampled stacks (empty if never due)"""
+        with self._lock:
+            self._watches.pop(id(watch), None)
+            # A copy: a sample taken just before may still be added to it
+            return Counter(watch.stacks)
+
+    def _sample(self) -> Counter:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me or _is_idle(frame):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stacks[";".join(reversed(labels))] += 1
+        return stacks
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            with self._lock:
+                watches = list(self._watches.values())
+            now = time.monotonic()
+            due = [w for w in watches if w.deadline <= now]
+            if due:
+                stacks = self._sample()
+                with self._lock:
+                    for watch in due:
+                        watch.stacks.update(stacks)
+                timeout: Optional[float] = self.interval
+            elif watches:
+                timeout = min(w.deadline for w in watches) - now
+            else:
+                timeout = None
+            self._wakeup.wait(timeout)
+
+
+def save_profile(stacks: Counter, request: Request, seconds: float) -> Path:
+    """Write folded stacks to ``PROFILE_DIR`` and drop the oldest profiles"""
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    route = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_")[:60]
+    name = (
+        f"{datetime.now():%Y%m%d-%H%M%S-%f}-{request.method}-{route or 'root'}"
+        f"-{int(seconds * 1000)}ms.folded"
+    )
+    path = directory / name
+    path.write_text(
+        "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()),
+        encoding="utf-8",
+    )
+
+    # Names start with the timestamp, so they sort oldest first
+    profiles = sorted(directory.glob("*.folded"))
+    for old in profiles[: max(0, len(profiles) - settings.PROFILE_MAX_FILES)]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+def setup_profiling(app: FastAPI) -> None:
+    """Profile slow and ``X-Profile`` requests (see the module docstring)"""
+    sampler = StackSampler(settings.PROFILE_SAMPLE_INTERVAL_SECONDS)
+
+    @app.middleware("http")
+    async def profile_requests(request: Request, call_next):
+        token = request.headers.get(PROFILE_HEADER)
+        requested = token is not None and verify_token(token)
+        watch = sampler.watch(
+            0.0 if requested else settings.PROFILE_SLOW_REQUEST_SECONDS
+        )
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            stacks = sampler.unwatch(watch)
+            seconds = time.perf_counter() - started
+            path = None
+            if stacks or requested:
+                path = save_profile(stacks, request, seconds)
+                logger.info(
+                    f"Profiled {request.method} {request.url.path} "
+                    f"({seconds:.2f}s): {path}"
+                )
+        if requested and path is not None:
+            response.headers[PROFILE_FILE_HEADER] = path.name
+        return response
+
+    logger.info(
+        f"Request profiling enabled (slow: {settings.PROFILE_SLOW_REQUEST_SECONDS}s, "
+        f"output: {settings.PROFILE_DIR})"
+    )
+
+
+if __name__ == "__main__":
+    print(profile_token())
@@ -0,0 +1,263 @@
+"""Per-client rate limiting and weighted fair queuing
+
+Every request to a limited route class takes one token from its client's
+bucket for that class; an empty bucket means 429 with ``Retry-After``.
+Clients are identified by the user of a valid bearer token, otherwise by IP
+address (run behind the proxy with forwarded-allow-ips set, so the address is
+the real client's). Buckets live in process memory, or in Redis with
+``RATE_LIMIT_BACKEND=redis`` so all workers share them.
+
+Admitted requests then pass a per-process fair queue: at most
+``FAIR_QUEUE_CONCURRENCY`` run at once, and when requests wait, authenticated
+ones get ``FAIR_QUEUE_AUTHENTICATED_WEIGHT`` slots for every
+``FAIR_QUEUE_FREE_WEIGHT`` slots of anonymous ones. A flood of free
+validations therefore queues behind itself instead of in front of customers,
+and beyond ``FAIR_QUEUE_MAX_WAITING`` waiting requests per class new ones are
+turned away with 503.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+from app.utils.auth import verify_token
+
+logger = logging.getLogger(__name__)
+
+FREE = "free"
+AUTHENTICATED = "authenticated"
+
+# Never limited: load balancers and Prometheus poll these constantly
+EXEMPT_PATHS = frozenset(
+    {"/health", "/api/validate/health", "/ksef/health", "/metrics"}
+)
+
+# Route classes by path prefix, first match wins; other paths are not limited
+ROUTE_CLASSES: Tuple[Tuple[str, str], ...] = (
+    ("/v1/auth/", "login"),
+    ("/api/validate/", "validate"),
+    ("/api/", "api"),
+    ("/v1/", "api"),
+    ("/ksef/", "api"),
+)
+
+# In-memory buckets kept before idle (full) ones are dropped
+MAX_MEMORY_BUCKETS = 10_000
+
+
+def route_class(path: str) -> Optional[str]:
+    """Rate limit class of a request path, ``None`` if it is not limited"""
+    if path.rstrip("/") in EXEMPT_PATHS:
+        return None
+    for prefix, name in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return name
+    return None
+
+
+def requests_per_minute(route: str, authenticated: bool) -> int:
+    """Bucket size (and refill per minute) for a route class and client kind"""
+    if route == "login":
+        return settings.RATE_LIMIT_LOGIN_PER_MINUTE
+    if route == "validate" and not authenticated:
+        return settings.RATE_LIMIT_FREE_PER_MINUTE
+    return settings.RATE_LIMIT_PER_MINUTE
+
+
+def client_identity(scope: Scope, headers: Headers) -> Tuple[str, bool]:
+    """Bucket key of the client and whether it is authenticated"""
+    authorization = headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        user_id = verify_token(authorization[7:].strip())
+        if user_id is not None:
+            return f"user:{user_id}", True
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}", False
+
+
+class MemoryBuckets:
+    """Token buckets in process memory"""
+
+    def __init__(self) -> None:
+        # Key -> (tokens, last update, bucket size)
+        self._buckets: Dict[str, Tuple[float, float, int]] = {}
+
+    async def take(self, key: str, per_minute: int) -> float:
+        """Take one token; returns 0 if allowed, else seconds until one refills"""
+        rate = per_minute / 60.0
+        now = time.monotonic()
+        tokens, updated, _ = self._buckets.get(key, (float(per_minute), now, 0))
+        tokens = min(float(per_minute), tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now, per_minute)
+        if len(self._buckets) > MAX_MEMORY_BUCKETS:
+            self._prune(now)
+        return wait
+
+    def _prune(self, now: float) -> None:
+        """Drop buckets that have refilled completely; they hold no state"""
+        for key, (tokens, updated, per_minute) in list(self._buckets.items()):
+            if tokens + (now - updated) * per_minute / 60.0 >= per_minute:
+                del self._buckets[key]
+
+
+# Refill, take and expire in one round trip; uses the Redis clock so all
+# workers agree. Returns the wait as a string, Lua numbers become integers.
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = capacity / 60
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], 61)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Token buckets in Redis, shared by all workers; fails open"""
+
+    def __init__(self, url: str) -> None:
+        from redis.asyncio import Redis
+
+        self._redis = Redis.from_url(url, socket_timeout=0.5)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, per_minute: int) -> float:
+        try:
+            wait = await self._take(keys=[f"ratelimit:{key}"], args=[per_minute])
+        except Exception as e:
+            # An unreachable Redis must not take the API down with it
+            logger.warning(f"Rate limiter unavailable, request allowed: {str(e)}")
+            return 0.0
+        return float(wait)
+
+
+class FairQueue:
+    """Shares a fixed number of request slots between classes by weight"""
+
+    def __init__(self, concurrency: int, weights: Dict[str, int], max_waiting: int):
+        self.free_slots = concurrency
+        self.weights = weights
+        self.max_waiting = max_waiting
+        self._waiting: Dict[str, Deque[asyncio.Future]] = {c: deque() for c in weights}
+        # Stride scheduling: the waiting class with the lowest pass goes next
+        self._passes: Dict[str, float] = {c: 0.0 for c in weights}
+        self._virtual_time = 0.0
+
+    def waiting(self, kind: str) -> int:
+        return len(self._waiting[kind])
+
+    async def acquire(self, kind: str) -> bool:
+        """Wait for a slot; ``False`` if too many requests already wait"""
+        if self.free_slots > 0 and not any(self._waiting.values()):
+            self.free_slots -= 1
+            return True
+        queue = self._waiting[kind]
+        if len(queue) >= self.max_waiting:
+            return False
+        if not queue:
+            # A class that was idle does not get to catch up on its share
+            self._passes[kind] = max(self._passes[kind], self._virtual_time)
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                queue.remove(future)
+            raise
+        return True
+
+    def release(self) -> None:
+        """Hand the slot to the next waiting request, or free it"""
+        candidates = [kind for kind, queue in self._waiting.items() if queue]
+        if not candidates:
+            self.free_slots += 1
+            return
+        kind = min(candidates, key=self._passes.__getitem__)
+        self._virtual_time = self._passes[kind]
+        self._passes[kind] += 1.0 / self.weights[kind]
+        self._waiting[kind].popleft().set_result(None)
+
+
+class RateLimitMiddleware:
+    """Token bucket limits per client and route class, then fair queuing"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            self.buckets = RedisBuckets(settings.REDIS_URL)
+        else:
+            self.buckets = MemoryBuckets()
+        self.queue = FairQueue(
+            settings.FAIR_QUEUE_CONCURRENCY,
+            {
+                AUTHENTICATED: settings.FAIR_QUEUE_AUTHENTICATED_WEIGHT,
+                FREE: settings.FAIR_QUEUE_FREE_WEIGHT,
+            },
+            settings.FAIR_QUEUE_MAX_WAITING,
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = route_class(scope["path"]) if scope["type"] == "http" else None
+        if route is None or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        client, authenticated = client_identity(scope, Headers(scope=scope))
+        wait = await self.buckets.take(
+            f"{route}:{client}", requests_per_minute(route, authenticated)
+        )
+        if wait > 0:
+            await _reject(send, 429, "Too many requests", math.ceil(wait))
+            return
+
+        kind = AUTHENTICATED if authenticated else FREE
+        if not await self.queue.acquire(kind):
+            await _reject(send, 503, "Server busy, try again shortly", 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.queue.release()
+
+
+async def _reject(send: Send, status_code: int, detail: str, retry_after: int) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
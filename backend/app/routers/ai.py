@@ -5,8 +5,8 @@ from sqlalchemy.orm import Session
 import logging
 
 from app.database import get_db
-from app.utils.auth import get_current_user
-from app.models.user import User
+from app.utils.auth import get_current_principal
+from app.utils.principals import Principal
 from app.schemas.ai import ComplianceCheckRequest, ComplianceCheckResponse
 
 router = APIRouter()
@@ -17,7 +17,7 @@ logger = logging.getLogger(__name__)
 async def check_compliance(
     request: ComplianceCheckRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ):
     """
     Check compliance and get AI-powered recommendations in Polish.
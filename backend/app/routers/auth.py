@@ -8,6 +8,7 @@ from datetime import timedelta
 from app.database import get_db
 from app.config import settings
 from app.utils.auth import authenticate_user, create_access_token, create_refresh_token
+from app.utils.passwords import PasswordHashingBusy, hash_password_async
 from app.schemas.auth import Token, UserCreate, UserResponse
 
 router = APIRouter()
@@ -20,7 +21,14 @@ async def login(
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serwer jest przeciążony, spróbuj ponownie",  # Server busy
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,13 +72,20 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Create new user
-    from app.utils.auth import get_password_hash
+    try:
+        hashed_password = await hash_password_async(user_data.password)
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Serwer jest przeciążony, spróbuj ponownie",  # Server busy
+            headers={"Retry-After": "1"},
+        )
 
     user = User(
         email=user_data.email,
         first_name=user_data.first_name,
         last_name=user_data.last_name,
-        password_hash=get_password_hash(user_data.password),
+        hashed_password=hashed_password,
         role=user_data.role or "owner",
     )
 
@@ -5,8 +5,8 @@ from sqlalchemy.orm import Session
 import logging
 
 from app.database import get_db
-from app.utils.auth import get_current_user
-from app.models.user import User
+from app.utils.auth import get_current_principal
+from app.utils.principals import Principal
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -14,7 +14,8 @@ logger = logging.getLogger(__name__)
 
 @router.get("/")
 async def list_companies(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(get_current_principal),
 ):
     """
     List all companies the current user has access to.
@@ -17,7 +17,9 @@ from app.schemas.invoice import (
     ValidationResult,
 )
 from app.services.fa3_validator import FA3Validator
-from app.utils.auth import get_current_user
+from app.services import vat_aggregates
+from app.utils.auth import get_current_principal, get_current_user
+from app.utils.principals import Principal
 from app.models.user import User
 from app.models.audit import create_audit_log
 
@@ -92,6 +94,7 @@ async def create_invoice(
     )
 
     db.add(invoice)
+    vat_aggregates.on_invoice_created(db, invoice)
     db.commit()
     db.refresh(invoice)
 
@@ -121,11 +124,12 @@ async def create_invoice(
     return invoice
 
 
-async def submit_invoice_to_ksef(invoice_id: UUID, company_id: UUID):
-    """Background task to submit invoice to KSeF"""
+def submit_invoice_to_ksef(invoice_id: UUID, company_id: UUID):
+    """Background task to queue the invoice for KSeF submission"""
     try:
-        # This would be implemented with Celery in production
-        # For now, we'll use FastAPI's BackgroundTasks
+        # Publishing to the broker is blocking I/O, so this runs in the
+        # threadpool; the submission itself is executed by worker processes
+        # (python -m app.workers.worker).
         from app.workers.tasks import submit_invoice_task
 
         submit_invoice_task.delay(str(invoice_id), str(company_id))
@@ -137,7 +141,7 @@ async def submit_invoice_to_ksef(invoice_id: UUID, company_id: UUID):
 async def get_invoice(
     invoice_id: UUID,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ):
     """Get invoice details by ID"""
     invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
@@ -149,7 +153,7 @@ async def get_invoice(
         )
 
     # Check access
-    if not current_user.has_company_access(invoice.company_id, db):
+    if not principal.has_company_access(invoice.company_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Brak dostępu do tej faktury",  # No access to this invoice
@@ -167,24 +171,22 @@ async def list_invoices(
     page: int = 1,
     limit: int = 20,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ):
     """List invoices with filters"""
     query = db.query(Invoice)
 
     # Filter by company if specified
     if company_id:
-        if not current_user.has_company_access(company_id, db):
+        if not principal.has_company_access(company_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Brak dostępu do tej firmy",
             )
         query = query.filter(Invoice.company_id == company_id)
     else:
-        # Get all companies user has access to
-        user_companies = current_user.get_companies(db)
-        company_ids = [c.id for c in user_companies]
-        query = query.filter(Invoice.company_id.in_(company_ids))
+        # All companies the user has access to
+        query = query.filter(Invoice.company_id.in_(principal.company_ids))
 
     # Apply date filters
     if from_date:
@@ -2,19 +2,21 @@
 
 import logging
 import uuid
-from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models.company import Company
+from app.services import ksef_submissions
+from app.services.ksef_poller import schedule_first_poll
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ksef", tags=["ksef"])
 
-# In-memory storage for demo purposes
-submissions: Dict[str, Dict[str, Any]] = {}
-
 
 class KSeFSendRequest(BaseModel):
     xml_content: str
@@ -30,98 +32,95 @@ class KSeFSendResponse(BaseModel):
 
 class KSeFStatusResponse(BaseModel):
     submission_id: str
-    status: str  # "PENDING", "UPO", "ERROR"
+    status: str  # "PENDING", "UPO", "ERROR", "TIMEOUT"
     details: Optional[str] = None
     upo_reference: Optional[str] = None
     timestamp: str
 
 
 @router.post("/send", response_model=KSeFSendResponse)
-async def send_to_ksef(request: KSeFSendRequest):
+def send_to_ksef(request: KSeFSendRequest, db: Session = Depends(get_db)):
     """
-    Send FA-3 XML to KSeF sandbox for UPO generation demo
+    Send FA-3 XML to KSeF sandbox for UPO generation demo.
+
+    Companies with a KSeF token get a real submission through the job queue;
+    other NIPs get a simulated sandbox submission. Either way the status
+    poller fills in the UPO.
     """
     try:
-        # Generate unique submission ID
-        submission_id = str(uuid.uuid4())
-        
-        # Simulate KSeF processing
-        logger.info(f"KSeF submission {submission_id} for NIP {request.nip}")
-        
-        # Store submission for status tracking
-        submissions[submission_id] = {
-            "nip": request.nip,
-            "xml_content": request.xml_content,
-            "environment": request.environment,
-            "status": "PENDING",
-            "created_at": datetime.now().isoformat(),
-            "upo_reference": None,
-            "details": None
-        }
-        
-        # Simulate async processing - in real implementation this would be a background task
-        # For demo, we'll set status to UPO after a short delay
-        import asyncio
-        asyncio.create_task(process_ksef_submission(submission_id))
-        
+        company = (
+            db.query(Company)
+            .filter(Company.nip == request.nip, Company.ksef_token.isnot(None))
+            .first()
+        )
+        submission = ksef_submissions.create_submission(
+            db,
+            xml_content=request.xml_content,
+            id=uuid.uuid4(),
+            company_id=company.id if company else None,
+            nip=request.nip,
+            environment=request.environment,
+        )
+        if company is None:
+            submission.reference_number = f"DEMO-{submission.id.hex[:12].upper()}"
+            schedule_first_poll(submission)
+        db.commit()
+
+        if company is not None:
+            from app.workers.tasks import send_submission_task
+
+            send_submission_task.delay(str(submission.id))
+
+        logger.info(f"KSeF submission {submission.id} for NIP {request.nip}")
+
         return KSeFSendResponse(
-            submission_id=submission_id,
+            submission_id=str(submission.id),
             status="PENDING",
-            message="FA-3 XML submitted to KSeF sandbox successfully"
+            message="FA-3 XML submitted to KSeF sandbox successfully",
         )
-        
+
     except Exception as e:
         logger.error(f"KSeF submission error: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to submit to KSeF: {str(e)}"
+            detail=f"Failed to submit to KSeF: {str(e)}",
         )
 
 
 @router.get("/status", response_model=KSeFStatusResponse)
-async def get_ksef_status(submission_id: str):
+def get_ksef_status(submission_id: str, db: Session = Depends(get_db)):
     """
     Get status of KSeF submission
     """
-    if submission_id not in submissions:
+    try:
+        key = uuid.UUID(submission_id)
+    except ValueError:
+        key = None
+    submission = ksef_submissions.get_submission(db, key) if key else None
+    if submission is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Submission not found"
+            status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found"
         )
-    
-    submission = submissions[submission_id]
-    
+
     return KSeFStatusResponse(
         submission_id=submission_id,
-        status=submission["status"],
-        details=submission.get("details"),
-        upo_reference=submission.get("upo_reference"),
-        timestamp=submission["created_at"]
+        status=submission.status,
+        details=submission.details,
+        upo_reference=submission.upo_reference,
+        timestamp=submission.created_at.isoformat() if submission.created_at else "",
     )
 
 
-async def process_ksef_submission(submission_id: str):
-    """
-    Simulate KSeF processing - in real implementation this would call actual KSeF API
-    """
-    await asyncio.sleep(2)  # Simulate processing time
-    
-    if submission_id in submissions:
-        submissions[submission_id]["status"] = "UPO"
-        submissions[submission_id]["upo_reference"] = f"UPO-{submission_id[:8].upper()}"
-        submissions[submission_id]["details"] = "FA-3 XML successfully processed by KSeF sandbox"
-        
-        logger.info(f"KSeF submission {submission_id} completed with UPO")
-
-
 @router.get("/health")
-async def ksef_health_check():
+def ksef_health_check(db: Session = Depends(get_db)):
     """
     Health check for KSeF integration
     """
+    counts = ksef_submissions.status_counts(db)
     return {
         "status": "healthy",
         "service": "ksef-sandbox",
         "environment": "demo",
-        "active_submissions": len(submissions)
+        "active_submissions": counts.get("PENDING", 0),
+        "submissions": counts,
     }
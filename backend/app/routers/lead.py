@@ -1,17 +1,12 @@
 """Lead capture endpoints"""
 
-import csv
-from datetime import datetime
-from pathlib import Path
 from typing import Optional
 
-from fastapi import APIRouter, Form
-
-router = APIRouter(prefix="/api", tags=["lead"])
+from fastapi import APIRouter, Form, HTTPException, status
 
+from app.services.lead_sink import lead_sink
 
-LEADS_DIR = Path(__file__).resolve().parents[2] / "out"
-LEADS_FILE = LEADS_DIR / "leads.csv"
+router = APIRouter(prefix="/api", tags=["lead"])
 
 
 @router.post("/lead")
@@ -24,34 +19,23 @@ async def create_lead(
     companySize: Optional[str] = Form(None),
     marketing: Optional[bool] = Form(False),
 ) -> dict:
-    LEADS_DIR.mkdir(parents=True, exist_ok=True)
-    is_new = not LEADS_FILE.exists()
-    with LEADS_FILE.open("a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if is_new:
-            writer.writerow(
-                [
-                    "ts",
-                    "firstName",
-                    "lastName",
-                    "email",
-                    "phone",
-                    "company",
-                    "companySize",
-                    "marketing",
-                ]
-            )
-        writer.writerow(
-            [
-                datetime.utcnow().isoformat(),
-                firstName,
-                lastName,
-                email,
-                phone or "",
-                company,
-                companySize or "",
-                str(bool(marketing)).lower(),
-            ]
+    # Queued only; written to the leads table in the background
+    queued = lead_sink.submit(
+        {
+            "first_name": firstName,
+            "last_name": lastName,
+            "email": email,
+            "phone": phone or "",
+            "company": company,
+            "company_size": companySize or "",
+            "marketing": str(bool(marketing)).lower(),
+        }
+    )
+    if not queued:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many requests, please try again shortly",
+            headers={"Retry-After": "5"},
         )
 
     return {"ok": True}
@@ -1,30 +1,76 @@
 """XML validation router for FA-3 compliance"""
 
+import hashlib
 import logging
 import sys
+import time
 from pathlib import Path
+from typing import Any, List, Optional, Tuple
 from fastapi import APIRouter, UploadFile, HTTPException, status
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.config import settings
+from app.health import health_monitor
+from app.metrics import record_validation
 
 # Ensure local package import in test/runtime without global install
 repo_root = Path(__file__).resolve().parents[3]
 sys.path.insert(0, str(repo_root))
 
-from polcomply.validators.xsd import XSDValidator  # noqa: E402
-from polcomply.validators.paths import resolve_fa3_schema  # noqa: E402
+from polcomply.reporting.html_report import iter_html_report  # noqa: E402
+from polcomply.timing import record, timed  # noqa: E402
+from polcomply.validators.registry import (  # noqa: E402
+    SchemaRegistry,
+    fa_schema_registry,
+)
+from polcomply.validators.xsd import XMLFeedParser  # noqa: E402
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/validate", tags=["validate"])
 
 
-@router.post("/xml")
-async def validate_xml(file: UploadFile):
+# All FA schema versions, compiled once per process
+_registry: Optional[SchemaRegistry] = None
+
+
+def get_schema_registry() -> SchemaRegistry:
+    """Registry of every resolved FA schema version, built on first use"""
+    global _registry
+    if _registry is None or not len(_registry):
+        _registry = fa_schema_registry()
+    return _registry
+
+
+def preload_schemas() -> None:
     """
-    Validate XML file against FA-3 schema
+    Resolve and compile all FA schema versions ahead of the first request.
 
-    This endpoint provides free XML validation for FA-3 compliance.
-    Perfect for businesses that need to ensure their invoices meet
-    Polish e-invoicing requirements.
+    Called at import time, so under gunicorn's ``preload_app`` the compiled
+    schemas live in the master and forked workers share them copy-on-write.
+    """
+    try:
+        registry = get_schema_registry()
+    except Exception as e:
+        logger.error(f"Failed to preload FA schemas: {str(e)}")
+        return
+    if not len(registry):
+        logger.warning("No FA schema found, validation requests will fail")
+        return
+    logger.info(f"FA schemas preloaded: {', '.join(registry.versions.values())}")
+
+
+async def _validate_upload(
+    file: UploadFile,
+) -> Tuple[Optional[str], List[Any], str]:
+    """
+    Validate an uploaded XML file chunk by chunk
+
+    The upload is fed to the parser as it is read, so only the parsed tree and
+    one chunk are in memory; the SHA-256 of the document is computed on the way.
+
+    Returns:
+        Schema version, validation errors and the document's SHA-256
     """
     if not file.filename.endswith(".xml"):
         raise HTTPException(
@@ -32,9 +78,9 @@ async def validate_xml(file: UploadFile):
             detail="Only XML files are accepted",
         )
 
-    # Auto-resolve FA-3 schema
-    schema_path = resolve_fa3_schema()
-    if schema_path is None:
+    # Preloaded schemas, one per FA version
+    registry = get_schema_registry()
+    if not len(registry):
         logger.error("FA-3 schema not found")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -42,37 +88,23 @@ async def validate_xml(file: UploadFile):
         )
 
     try:
-        # Initialize validator
-        validator = XSDValidator(schema_path)
-
-        # Read uploaded file
-        xml_content = await file.read()
-
-        # Validate XML
-        errors = validator.validate(xml_content)
-
-        # Format response
-        is_valid = len(errors) == 0
-
-        return {
-            "ok": is_valid,
-            "filename": file.filename,
-            "errors": [
-                {
-                    "line": e.line,
-                    "column": e.column,
-                    "code": e.code,
-                    "message": e.message,
-                    "severity": getattr(e, "severity", "error"),
-                }
-                for e in errors
-            ],
-            "summary": {
-                "total_errors": len(errors),
-                "is_compliant": is_valid,
-                "schema_version": "FA-3",
-            },
-        }
+        feed = XMLFeedParser()
+        digest = hashlib.sha256()
+        read_seconds = 0.0
+        while True:
+            started = time.perf_counter()
+            chunk = await file.read(settings.UPLOAD_CHUNK_BYTES)
+            read_seconds += time.perf_counter() - started
+            if not chunk:
+                break
+            digest.update(chunk)
+            feed.feed(chunk)
+        record("upload_read", read_seconds)
+
+        # Validate XML against the schema matching its root namespace
+        schema_version, errors = registry.validate_feed(feed)
+        record_validation(schema_version, errors)
+        return schema_version, errors, digest.hexdigest()
 
     except Exception as e:
         logger.error(f"Validation error: {str(e)}")
@@ -82,12 +114,72 @@ async def validate_xml(file: UploadFile):
         )
 
 
+@router.post("/xml")
+async def validate_xml(file: UploadFile):
+    """
+    Validate XML file against FA-3 schema
+
+    This endpoint provides free XML validation for FA-3 compliance.
+    Perfect for businesses that need to ensure their invoices meet
+    Polish e-invoicing requirements.
+    """
+    schema_version, errors, sha256 = await _validate_upload(file)
+
+    # Format response
+    is_valid = len(errors) == 0
+
+    with timed("serialize"):
+        return JSONResponse(
+            {
+                "ok": is_valid,
+                "filename": file.filename,
+                "errors": [
+                    {
+                        "line": e.line,
+                        "column": e.column,
+                        "code": e.code,
+                        "message": e.message,
+                        "severity": getattr(e, "severity", "error"),
+                    }
+                    for e in errors
+                ],
+                "summary": {
+                    "total_errors": len(errors),
+                    "is_compliant": is_valid,
+                    "schema_version": schema_version,
+                    "sha256": sha256,
+                },
+            }
+        )
+
+
+@router.post("/xml/report")
+async def validate_xml_report(file: UploadFile):
+    """
+    Validate XML file and return the HTML report
+
+    The report is streamed as it is generated, so invoices with many
+    thousands of errors do not have to be rendered in memory first.
+    """
+    schema_version, errors, _ = await _validate_upload(file)
+    return StreamingResponse(
+        iter_html_report(errors, file.filename, schema_version or "FA-3"),
+        media_type="text/html; charset=utf-8",
+    )
+
+
 @router.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    schema_path = resolve_fa3_schema()
+    """Health check endpoint (schema state from the background health probe)"""
+    schemas = health_monitor.result("schemas")
+    if schemas is None:
+        # Not probed yet (or probing disabled): look without loading anything
+        versions = sorted(_registry.versions.values()) if _registry else []
+    else:
+        versions = schemas.details.get("versions", [])
     return {
-        "status": "healthy",
+        "status": "healthy" if versions else "unhealthy",
         "service": "FA-3 XML Validator",
-        "schema_available": schema_path is not None and schema_path.exists(),
+        "schema_available": bool(versions),
+        "schema_versions": versions,
     }
@@ -1,13 +1,14 @@
 """VAT management endpoints"""
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from uuid import UUID
 import logging
 
 from app.database import get_db
-from app.utils.auth import get_current_user
-from app.models.user import User
+from app.utils.auth import get_current_principal
+from app.utils.principals import Principal
+from app.services import vat_aggregates
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -20,20 +21,19 @@ async def get_vat_summary(
         ..., description="Period in YYYY-MM format", regex="^\d{4}-\d{2}$"
     ),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ):
     """
     Get VAT summary for a specific period.
     Returns VAT due, deductible, and net amounts.
+
+    Reads the materialized ``vat_period_aggregates`` rows (at most one per
+    VAT rate), so the cost does not depend on the number of invoices.
     """
-    # This is a simplified implementation
-    # In production, this would calculate from actual invoices
+    if not principal.has_company_access(company_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Brak dostępu do tej firmy",  # No access to this company
+        )
 
-    return {
-        "period": period,
-        "vat_due": 2500.00,  # Example data
-        "vat_deductible": 1200.00,
-        "net_vat": 1300.00,
-        "invoice_count": 15,
-        "deadline": f"{period}-25",  # 25th of next month
-    }
+    return vat_aggregates.get_period_summary(db, company_id, period)
@@ -0,0 +1,67 @@
+"""
+FA(3) XML of stored invoices
+
+Invoices are kept as structured data; the document sent to KSeF is generated
+from them when they are submitted, with the polcomply FA-3 mapper and its
+``fa3.yaml`` mapping (scenario ``fv_b2b``: invoices have no type of their own
+yet, so they are all ``VAT``).
+"""
+
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+from app.models.company import Company
+from app.models.invoice import Invoice
+
+# Ensure local package import in test/runtime without global install
+repo_root = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(repo_root))
+
+FA3_CONFIG = repo_root / "polcomply" / "mapping" / "fa3.yaml"
+
+
+class InvoiceXMLError(ValueError):
+    """The invoice cannot be written as an FA(3) document"""
+
+
+@lru_cache(maxsize=1)
+def _mapper():
+    # pandas is only loaded by the processes that submit invoices
+    from polcomply.mapping.csv_to_fa import CSVToFAMapper
+
+    return CSVToFAMapper(FA3_CONFIG)
+
+
+def invoice_record(invoice: Invoice, company: Company) -> Dict[str, Any]:
+    """Mapper fields of an invoice issued by ``company``"""
+    return {
+        "invoice_number": invoice.invoice_number,
+        "issue_date": invoice.issue_date.strftime("%Y-%m-%d"),
+        "invoice_type": "VAT",
+        "seller_nip": company.nip,
+        "buyer_nip": (invoice.contractor_data or {}).get("nip"),
+        "net_amount": str(invoice.net_amount),
+        "vat_amount": str(invoice.vat_amount),
+        "gross_amount": str(invoice.gross_amount),
+    }
+
+
+def invoice_xml(invoice: Invoice, company: Company) -> bytes:
+    """
+    FA(3) document of one invoice, as submitted to KSeF
+
+    Raises:
+        InvoiceXMLError: If a value cannot be written to XML
+    """
+    import pandas as pd
+    from polcomply.mapping.csv_to_fa import MappingError
+
+    try:
+        (document,) = _mapper().iter_invoice_documents(
+            pd.DataFrame([invoice_record(invoice, company)])
+        )
+    except MappingError as e:
+        raise InvoiceXMLError(str(e)) from e
+    return document
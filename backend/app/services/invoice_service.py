@@ -6,6 +6,7 @@ from uuid import UUID
 from datetime import date
 from app.models.invoice import Invoice
 from app.schemas.invoice import InvoiceCreate
+from app.services import vat_aggregates
 
 
 class InvoiceService:
@@ -46,6 +47,7 @@ class InvoiceService:
         )
 
         self.db.add(invoice)
+        vat_aggregates.on_invoice_created(self.db, invoice)
         self.db.commit()
         self.db.refresh(invoice)
 
@@ -100,7 +102,9 @@ class InvoiceService:
         if not invoice:
             raise ValueError("Invoice not found")
 
+        old_status = invoice.ksef_status
         invoice.ksef_status = status
+        vat_aggregates.on_invoice_status_changed(self.db, invoice, old_status)
         if upo:
             invoice.ksef_upo = upo
         if error:
@@ -1,102 +1,415 @@
-"""KSeF API client for invoice submission"""
+"""KSeF API client for invoice submission
+
+All ``KSeFClient`` instances share one pooled ``httpx.AsyncClient`` per base
+URL (and event loop), so consecutive invoices reuse keep-alive TLS
+connections. Interactive KSeF sessions are cached per environment and NIP and
+reused until they expire, instead of being opened for every invoice. A batch
+that ends with its collective UPO runs in a session of its own, so closing it
+does not pull the cached session from under concurrent jobs.
+"""
 
-import logging
 import asyncio
-from typing import Dict, Any
+import base64
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import settings
 from app.models.company import Company
 
 logger = logging.getLogger(__name__)
 
+SESSION_NS = "http://ksef.mf.gov.pl/schema/gtw/svc/online/types/2021/10/01/0001"
+TYPES_NS = "http://ksef.mf.gov.pl/schema/gtw/svc/types/2021/10/01/0001"
+AUTH_NS = "http://ksef.mf.gov.pl/schema/gtw/svc/online/auth/request/2021/10/01/0001"
+
+
+class KSeFError(Exception):
+    """KSeF communication error that should not be retried"""
+
+
+class KSeFTransientError(KSeFError):
+    """Temporary KSeF failure (network, 5xx, throttling) - safe to retry"""
+
+
+def base_url_for(environment: str) -> str:
+    """KSeF API base URL of an environment (sandbox/test, demo, production)"""
+    urls = {
+        "sandbox": settings.KSEF_API_URL,
+        "test": settings.KSEF_API_URL,
+        "demo": settings.KSEF_DEMO_API_URL,
+        "production": settings.KSEF_PRODUCTION_API_URL,
+    }
+    if environment not in urls:
+        raise KSeFError(f"Unknown KSeF environment: {environment}")
+    return urls[environment].rstrip("/")
+
+
+# --- Shared HTTP connection pool ---------------------------------------------
+
+_http_clients: Dict[Tuple[str, int], httpx.AsyncClient] = {}
+
+
+def get_http_client(base_url: str) -> httpx.AsyncClient:
+    """
+    Pooled keep-alive client for ``base_url``.
+
+    Connections are bound to the event loop that opened them, so the pool is
+    kept per loop; API processes and workers each run one long-lived loop.
+    """
+    key = (base_url, id(asyncio.get_running_loop()))
+    client = _http_clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(
+                max_connections=settings.KSEF_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.KSEF_MAX_CONNECTIONS,
+                keepalive_expiry=settings.KSEF_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(settings.KSEF_TIMEOUT_SECONDS),
+            headers={"Accept": "application/json"},
+        )
+        _http_clients[key] = client
+    return client
+
+
+async def close_http_clients() -> None:
+    """Close pooled connections of the current event loop (app shutdown)"""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [key for key in _http_clients if key[1] == loop_id]:
+        await _http_clients.pop(key).aclose()
+
+
+# --- Session cache -----------------------------------------------------------
+
+
+@dataclass
+class KSeFSession:
+    """Interactive KSeF session opened with a company's authorisation token"""
+
+    reference_number: str
+    token: str
+    expires_at: float
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+_sessions: Dict[Tuple[str, str], KSeFSession] = {}
+_session_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+
+def invalidate_session(environment: str, nip: str) -> None:
+    """Forget a cached session (e.g. after KSeF answered 401)"""
+    _sessions.pop((environment, nip), None)
+
 
 class KSeFClient:
     """KSeF API client for invoice submission"""
 
-    def __init__(self, company: Company):
+    def __init__(
+        self, company: Company, http_client: Optional[httpx.AsyncClient] = None
+    ):
         self.company = company
         self.environment = company.ksef_environment or "sandbox"
         self.token = company.ksef_token
+        self.nip = company.nip
+        self.base_url = base_url_for(self.environment)
+        self._http_client = http_client
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return self._http_client or get_http_client(self.base_url)
+
+    # --- Transport ---------------------------------------------------------
+
+    async def _request(
+        self, method: str, path: str, session: Optional[KSeFSession] = None, **kwargs
+    ) -> Dict[str, Any]:
+        headers = kwargs.pop("headers", {})
+        if session is not None:
+            headers["SessionToken"] = session.token
+
+        try:
+            response = await self.http.request(method, path, headers=headers, **kwargs)
+        except httpx.TransportError as e:
+            raise KSeFTransientError(f"KSeF connection error: {e}")
+
+        if response.status_code == 401 and session is not None:
+            if _sessions.get((self.environment, self.nip)) is session:
+                invalidate_session(self.environment, self.nip)
+            raise KSeFTransientError("KSeF session expired")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise KSeFTransientError(f"KSeF HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise KSeFError(f"KSeF HTTP {response.status_code}: {response.text}")
+        return response.json() if response.content else {}
+
+    def _encrypt_token(self, challenge_timestamp: str) -> str:
+        """
+        Encrypt ``token|timestamp`` with the Ministry of Finance public key.
+
+        Without ``KSEF_PUBLIC_KEY_PATH`` the value is only base64-encoded,
+        which is what local stand-in servers expect.
+        """
+        timestamp_ms = challenge_timestamp
+        if not timestamp_ms.isdigit():
+            from datetime import datetime
 
-    async def submit_invoice(self, invoice_data: Dict[str, Any]) -> Dict[str, Any]:
+            parsed = datetime.fromisoformat(timestamp_ms.replace("Z", "+00:00"))
+            timestamp_ms = str(int(parsed.timestamp() * 1000))
+        plain = f"{self.token}|{timestamp_ms}".encode("utf-8")
+
+        if not settings.KSEF_PUBLIC_KEY_PATH:
+            return base64.b64encode(plain).decode("ascii")
+
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        with open(settings.KSEF_PUBLIC_KEY_PATH, "rb") as f:
+            public_key = serialization.load_pem_public_key(f.read())
+        encrypted = public_key.encrypt(plain, padding.PKCS1v15())
+        return base64.b64encode(encrypted).decode("ascii")
+
+    async def _open_session(self) -> KSeFSession:
+        if not self.token:
+            raise KSeFError("Brak tokenu KSeF dla firmy")  # No KSeF token
+
+        challenge = await self._request(
+            "POST",
+            "/api/online/Session/AuthorisationChallenge",
+            json={"contextIdentifier": {"type": "onip", "identifier": self.nip}},
+        )
+        body = f"""<?xml version="1.0" encoding="UTF-8"?>
+<ns3:InitSessionTokenRequest xmlns="{SESSION_NS}" xmlns:ns2="{TYPES_NS}" xmlns:ns3="{AUTH_NS}">
+  <ns3:Context>
+    <Challenge>{challenge["challenge"]}</Challenge>
+    <Identifier xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:type="ns2:SubjectIdentifierByCompanyType">
+      <ns2:Identifier>{self.nip}</ns2:Identifier>
+    </Identifier>
+    <DocumentType>
+      <ns2:Service>KSeF</ns2:Service>
+      <ns2:FormCode>
+        <ns2:SystemCode>FA (3)</ns2:SystemCode>
+        <ns2:SchemaVersion>1-0E</ns2:SchemaVersion>
+        <ns2:TargetNamespace>http://crd.gov.pl/wzor/2023/06/21/12348/</ns2:TargetNamespace>
+        <ns2:Value>FA</ns2:Value>
+      </ns2:FormCode>
+    </DocumentType>
+    <Token>{self._encrypt_token(str(challenge["timestamp"]))}</Token>
+  </ns3:Context>
+</ns3:InitSessionTokenRequest>"""
+        response = await self._request(
+            "POST",
+            "/api/online/Session/InitToken",
+            content=body.encode("utf-8"),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        logger.info(
+            f"KSeF session {response['referenceNumber']} opened for NIP {self.nip}"
+        )
+        return KSeFSession(
+            reference_number=response["referenceNumber"],
+            token=response["sessionToken"]["token"],
+            expires_at=time.monotonic() + settings.KSEF_SESSION_TTL_SECONDS,
+        )
+
+    async def get_session(self) -> KSeFSession:
+        """Cached interactive session for this company, opened on first use"""
+        key = (self.environment, self.nip)
+        session = _sessions.get(key)
+        if session is not None and not session.expired:
+            return session
+
+        lock = _session_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            session = _sessions.get(key)
+            if session is None or session.expired:
+                session = await self._open_session()
+                _sessions[key] = session
+        return session
+
+    async def terminate_session(self) -> None:
+        """Close the cached session (KSeF then generates the collective UPO)"""
+        session = _sessions.pop((self.environment, self.nip), None)
+        if session is not None:
+            await self._terminate(session)
+
+    async def _terminate(self, session: KSeFSession) -> None:
+        await self._request("GET", "/api/online/Session/Terminate", session)
+
+    # --- Invoices ----------------------------------------------------------
+
+    async def _send(
+        self, session: KSeFSession, invoice_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        xml_content = invoice_data["xml_content"]
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode("utf-8")
+
+        response = await self._request(
+            "PUT",
+            "/api/online/Invoice/Send",
+            session,
+            json={
+                "invoiceHash": {
+                    "hashSHA": {
+                        "algorithm": "SHA-256",
+                        "encoding": "Base64",
+                        "value": base64.b64encode(
+                            hashlib.sha256(xml_content).digest()
+                        ).decode("ascii"),
+                    },
+                    "fileSize": len(xml_content),
+                },
+                "invoicePayload": {
+                    "type": "plain",
+                    "invoiceBody": base64.b64encode(xml_content).decode("ascii"),
+                },
+            },
+        )
+        return {
+            "success": True,
+            "reference_number": response["elementReferenceNumber"],
+            "status": "submitted",
+            "message": "Faktura została wysłana do KSeF",
+        }
+
+    async def submit_invoice(
+        self, invoice_data: Dict[str, Any], session: Optional[KSeFSession] = None
+    ) -> Dict[str, Any]:
         """
         Submit invoice to KSeF
 
         Args:
-            invoice_data: Invoice data to submit
+            invoice_data: Invoice data to submit; ``xml_content`` holds the
+                FA(3) document
+            session: Session to send in (default: the cached one)
 
         Returns:
-            Dict with submission result
+            Dict with submission result; ``status`` is ``submitted`` (with
+            ``reference_number``), ``rejected`` or ``error`` (retryable)
+
+        Raises:
+            KSeFError: If the invoice carries no XML document
         """
+        if not invoice_data.get("xml_content"):
+            raise KSeFError("Brak treści XML faktury FA(3)")  # No FA(3) XML
+
+        logger.info(f"Submitting invoice to KSeF (environment: {self.environment})")
         try:
-            # Mock implementation for demo
-            # In production, this would make actual KSeF API calls
-
-            logger.info(f"Submitting invoice to KSeF (environment: {self.environment})")
-
-            # Simulate API call delay
-            import asyncio
-
-            await asyncio.sleep(1)
-
-            # Mock response
-            if self.environment == "sandbox":
-                return {
-                    "success": True,
-                    "upo": f"UPO-{self.environment.upper()}-{invoice_data.get('invoice_number', 'TEST')}-001",
-                    "status": "accepted",
-                    "message": "Faktura została przyjęta przez KSeF",
-                }
-            else:
-                # Simulate potential errors in production
-                if "error" in invoice_data.get("invoice_number", "").lower():
-                    return {
-                        "success": False,
-                        "error": "Błąd walidacji FA(3)",
-                        "status": "rejected",
-                        "message": "Faktura została odrzucona przez KSeF",
-                    }
-                else:
-                    return {
-                        "success": True,
-                        "upo": f"UPO-PROD-{invoice_data.get('invoice_number', 'PROD')}-001",
-                        "status": "accepted",
-                        "message": "Faktura została przyjęta przez KSeF",
-                    }
-
-        except Exception as e:
-            logger.error(f"KSeF submission error: {e}")
+            session = session or await self.get_session()
+            return await self._send(session, invoice_data)
+        except KSeFError as e:
+            return self._failure(e)
+
+    @staticmethod
+    def _failure(error: KSeFError) -> Dict[str, Any]:
+        """Submission result of a KSeF error"""
+        if isinstance(error, KSeFTransientError):
+            logger.warning(f"KSeF submission error: {error}")
             return {
                 "success": False,
-                "error": str(e),
+                "error": str(error),
                 "status": "error",
                 "message": "Błąd podczas komunikacji z KSeF",
             }
+        logger.error(f"KSeF rejected submission: {error}")
+        return {
+            "success": False,
+            "error": str(error),
+            "status": "rejected",
+            "message": "Faktura została odrzucona przez KSeF",
+        }
+
+    async def submit_invoices(
+        self, invoices: List[Dict[str, Any]], terminate: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Submit many invoices over one interactive session
+
+        Invoices are sent concurrently over the pooled connections. With
+        ``terminate`` the batch opens a session of its own and closes it at
+        the end, so KSeF issues one collective UPO for exactly these
+        invoices; the cached session other jobs use stays open. Otherwise
+        the cached session is used.
 
-    async def get_invoice_status(self, upo: str) -> Dict[str, Any]:
+        Args:
+            invoices: Invoice data dicts, each with ``xml_content``
+            terminate: Send in a dedicated session and close it after the batch
+
+        Returns:
+            One result dict per invoice, in input order
+        """
+        session: Optional[KSeFSession] = None
+        if terminate:
+            try:
+                session = await self._open_session()
+            except KSeFError as e:
+                return [self._failure(e) for _ in invoices]
+
+        semaphore = asyncio.Semaphore(settings.KSEF_BATCH_CONCURRENCY)
+
+        async def send_one(invoice_data: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.submit_invoice(invoice_data, session)
+
+        results = await asyncio.gather(*(send_one(i) for i in invoices))
+        if session is not None:
+            try:
+                await self._terminate(session)
+            except KSeFError as e:
+                logger.warning(f"Failed to terminate KSeF session: {e}")
+        return list(results)
+
+    async def get_invoice_status(self, reference_number: str) -> Dict[str, Any]:
         """
         Get invoice status from KSeF
 
         Args:
-            upo: Unique Payment Order number
+            reference_number: Element reference number returned by submission
 
         Returns:
-            Dict with status information
+            Dict with status information; ``upo`` carries the KSeF number
+            once the invoice is accepted
         """
         try:
-            # Mock implementation
-            await asyncio.sleep(0.5)
+            session = await self.get_session()
+            response = await self._request(
+                "GET", f"/api/online/Invoice/Status/{reference_number}", session
+            )
+        except KSeFError as e:
+            logger.error(f"KSeF status check error: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "status": "error",
+                "message": "Błąd podczas sprawdzania statusu",
+            }
 
+        code = int(response.get("processingCode", 0))
+        if code == 200:
             return {
                 "success": True,
-                "upo": upo,
+                "upo": response.get("invoiceStatus", {}).get("ksefReferenceNumber"),
                 "status": "accepted",
                 "message": "Faktura została przetworzona",
             }
-
-        except Exception as e:
-            logger.error(f"KSeF status check error: {e}")
+        if code >= 400:
             return {
                 "success": False,
-                "error": str(e),
-                "status": "error",
-                "message": "Błąd podczas sprawdzania statusu",
+                "error": response.get("processingDescription"),
+                "status": "rejected",
+                "message": "Faktura została odrzucona przez KSeF",
             }
+        return {
+            "success": True,
+            "status": "processing",
+            "message": response.get("processingDescription", ""),
+        }
@@ -0,0 +1,385 @@
+"""
+Central KSeF status poller
+
+Replaces one sleeping task per submission with a single loop that claims due
+``ksef_submissions`` rows in batches, asks KSeF for their status under one
+global rate limit, and writes the outcome back with bulk updates. Pending
+references are re-polled with an adaptive interval: quickly at first, then
+backing off exponentially.
+
+After ``KSEF_POLL_MAX_ATTEMPTS`` checks without a final answer a submission
+becomes ``TIMEOUT`` and its invoice ``unknown``: KSeF may still accept it, so
+the invoice keeps counting towards VAT. Put timed-out submissions back in the
+polling queue with::
+
+    python -m app.services.ksef_submissions recheck
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.company import Company
+from app.models.invoice import Invoice
+from app.models.ksef import KSeFSubmission
+from app.services import ksef_submissions, vat_aggregates
+from app.services.ksef_client import KSeFClient
+
+logger = logging.getLogger(__name__)
+
+
+def next_poll_delay(attempts: int) -> float:
+    """Seconds until the next status check after ``attempts`` checks"""
+    return min(
+        settings.KSEF_POLL_MAX_INTERVAL_SECONDS,
+        settings.KSEF_POLL_INITIAL_INTERVAL_SECONDS * (2 ** min(attempts, 16)),
+    )
+
+
+class RateLimiter:
+    """Token bucket shared by every status call of this poller"""
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        self.rate = rate_per_second
+        self.capacity = burst or max(1, int(rate_per_second))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _demo_status(submission: Row) -> Dict[str, Any]:
+    """Simulated sandbox answer for demo submissions of unregistered NIPs"""
+    return {
+        "success": True,
+        "status": "accepted",
+        "upo": f"UPO-{str(submission.id)[:8].upper()}",
+        "message": "FA-3 XML successfully processed by KSeF sandbox",
+    }
+
+
+class KSeFStatusPoller:
+    """Batching, rate-limited status poller for pending KSeF submissions"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        batch_size: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        client_factory: Callable[[Company], KSeFClient] = KSeFClient,
+    ):
+        if session_factory is None:
+            from app.database import SessionLocal
+
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.KSEF_POLL_BATCH_SIZE
+        self.rate_limiter = RateLimiter(
+            rate_per_second or settings.KSEF_POLL_RATE_PER_SECOND
+        )
+        self.client_factory = client_factory
+        self.concurrency = asyncio.Semaphore(settings.KSEF_MAX_CONNECTIONS)
+
+    def _claim_due(self, db: Session, now: datetime) -> List[Row]:
+        """
+        Select due submissions and lease them, so concurrent pollers skip them
+        while their status calls are in flight.
+
+        Only the columns the poller needs are loaded, as plain rows: ORM
+        instances would expire on commit and reload one by one.
+        """
+        query = (
+            db.query(
+                KSeFSubmission.id,
+                KSeFSubmission.invoice_id,
+                KSeFSubmission.company_id,
+                KSeFSubmission.reference_number,
+                KSeFSubmission.poll_attempts,
+            )
+            .filter(
+                KSeFSubmission.status == "PENDING",
+                KSeFSubmission.reference_number.isnot(None),
+                KSeFSubmission.next_poll_at <= now,
+            )
+            .order_by(KSeFSubmission.next_poll_at)
+            .limit(self.batch_size)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        due = query.all()
+        if due:
+            lease = now + timedelta(seconds=settings.KSEF_POLL_LEASE_SECONDS)
+            db.bulk_update_mappings(
+                KSeFSubmission, [{"id": s.id, "next_poll_at": lease} for s in due]
+            )
+        db.commit()
+        return due
+
+    async def _fetch_statuses(
+        self, db: Session, due: List[Row]
+    ) -> Dict[Any, Dict[str, Any]]:
+        company_ids = {s.company_id for s in due if s.company_id is not None}
+        clients = {
+            company.id: self.client_factory(company)
+            for company in db.query(Company).filter(Company.id.in_(company_ids))
+        }
+
+        async def fetch(submission: Row) -> Dict[str, Any]:
+            client = clients.get(submission.company_id)
+            if client is None:
+                return _demo_status(submission)
+            async with self.concurrency:
+                await self.rate_limiter.acquire()
+                return await client.get_invoice_status(submission.reference_number)
+
+        results = await asyncio.gather(*(fetch(s) for s in due), return_exceptions=True)
+        statuses = {}
+        for submission, result in zip(due, results):
+            if isinstance(result, Exception):
+                logger.warning(
+                    f"KSeF status check failed for {submission.id}: {result}"
+                )
+                result = {"success": False, "status": "error", "error": str(result)}
+            statuses[submission.id] = result
+        return statuses
+
+    def _apply(
+        self,
+        db: Session,
+        due: List[Row],
+        statuses: Dict[Any, Dict[str, Any]],
+        now: datetime,
+    ) -> None:
+        submission_rows = []
+        invoice_rows = []
+        rejected_invoice_ids = []
+        counts = {"PENDING": 0, "UPO": 0, "ERROR": 0, "TIMEOUT": 0}
+        expires_at = ksef_submissions.expiry(now)
+
+        for submission in due:
+            result = statuses[submission.id]
+            status = result.get("status")
+            attempts = submission.poll_attempts + 1
+
+            if status == "accepted":
+                submission_rows.append(
+                    {
+                        "id": submission.id,
+                        "status": "UPO",
+                        "upo_reference": result.get("upo"),
+                        "details": result.get("message"),
+                        "poll_attempts": attempts,
+                        "next_poll_at": None,
+                        "expires_at": expires_at,
+                    }
+                )
+                counts["PENDING"] -= 1
+                counts["UPO"] += 1
+                if submission.invoice_id is not None:
+                    invoice_rows.append(
+                        {
+                            "id": submission.invoice_id,
+                            "ksef_status": "accepted",
+                            "ksef_upo": result.get("upo"),
+                        }
+                    )
+            elif status == "rejected":
+                error = result.get("error") or "KSeF rejected the document"
+                submission_rows.append(
+                    {
+                        "id": submission.id,
+                        "status": "ERROR",
+                        "details": error,
+                        "poll_attempts": attempts,
+                        "next_poll_at": None,
+                        "expires_at": expires_at,
+                    }
+                )
+                counts["PENDING"] -= 1
+                counts["ERROR"] += 1
+                if submission.invoice_id is not None:
+                    invoice_rows.append(
+                        {
+                            "id": submission.invoice_id,
+                            "ksef_status": "rejected",
+                            "ksef_error": error,
+                        }
+                    )
+                    rejected_invoice_ids.append(submission.invoice_id)
+            elif attempts >= settings.KSEF_POLL_MAX_ATTEMPTS:
+                # No final answer is not a rejection: the invoice stays in the
+                # VAT aggregates until a recheck settles it
+                error = "KSeF status polling timed out"
+                submission_rows.append(
+                    {
+                        "id": submission.id,
+                        "status": "TIMEOUT",
+                        "details": error,
+                        "poll_attempts": attempts,
+                        "next_poll_at": None,
+                        "expires_at": expires_at,
+                    }
+                )
+                counts["PENDING"] -= 1
+                counts["TIMEOUT"] += 1
+                if submission.invoice_id is not None:
+                    invoice_rows.append(
+                        {
+                            "id": submission.invoice_id,
+                            "ksef_status": "unknown",
+                            "ksef_error": error,
+                        }
+                    )
+            else:
+                submission_rows.append(
+                    {
+                        "id": submission.id,
+                        "poll_attempts": attempts,
+                        "next_poll_at": now
+                        + timedelta(seconds=next_poll_delay(attempts)),
+                    }
+                )
+
+        # Rejected invoices leave the VAT aggregates (rare, so done one by one)
+        if rejected_invoice_ids:
+            for invoice in db.query(Invoice).filter(
+                Invoice.id.in_(rejected_invoice_ids)
+            ):
+                if invoice.ksef_status not in vat_aggregates.EXCLUDED_STATUSES:
+                    vat_aggregates.apply_invoice(db, invoice, -1)
+
+        db.bulk_update_mappings(KSeFSubmission, submission_rows)
+        ksef_submissions.adjust_counts(db, counts)
+        if invoice_rows:
+            db.bulk_update_mappings(Invoice, invoice_rows)
+        db.commit()
+
+    async def poll_once(self) -> int:
+        """Poll one batch of due submissions; returns the batch size"""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            due = self._claim_due(db, now)
+            if not due:
+                return 0
+            statuses = await self._fetch_statuses(db, due)
+            self._apply(db, due, statuses, datetime.utcnow())
+            logger.info(f"Polled KSeF status of {len(due)} submissions")
+            return len(due)
+        finally:
+            db.close()
+
+    def purge(self) -> int:
+        """Evict expired submissions from the shared store"""
+        db = self.session_factory()
+        try:
+            return ksef_submissions.purge_expired(db)
+        finally:
+            db.close()
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Poll until ``stop`` is set, idling briefly when nothing is due"""
+        stop = stop or asyncio.Event()
+        next_purge = 0.0
+        while not stop.is_set():
+            try:
+                polled = await self.poll_once()
+                if time.monotonic() >= next_purge:
+                    self.purge()
+                    next_purge = (
+                        time.monotonic()
+                        + settings.KSEF_SUBMISSION_PURGE_INTERVAL_SECONDS
+                    )
+            except Exception as e:
+                logger.error(f"KSeF status poller error: {e}")
+                polled = 0
+            if polled < self.batch_size:
+                try:
+                    await asyncio.wait_for(
+                        stop.wait(), timeout=settings.KSEF_POLL_IDLE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+
+def recheck_timed_out(
+    db: Session,
+    submission_ids: Optional[Iterable[Any]] = None,
+    now: Optional[datetime] = None,
+) -> int:
+    """
+    Put timed-out submissions back in the polling queue
+
+    Args:
+        db: Database session (committed here)
+        submission_ids: Only these submissions (default: every timed-out one)
+        now: When the first new status check is due (default: now)
+
+    Returns:
+        Number of submissions queued again
+    """
+    now = now or datetime.utcnow()
+    query = db.query(KSeFSubmission.id, KSeFSubmission.invoice_id).filter(
+        KSeFSubmission.status == "TIMEOUT",
+        KSeFSubmission.reference_number.isnot(None),
+    )
+    if submission_ids is not None:
+        query = query.filter(KSeFSubmission.id.in_(list(submission_ids)))
+    rows = query.all()
+    if not rows:
+        return 0
+
+    db.bulk_update_mappings(
+        KSeFSubmission,
+        [
+            {
+                "id": row.id,
+                "status": "PENDING",
+                "details": None,
+                "poll_attempts": 0,
+                "next_poll_at": now,
+                "expires_at": ksef_submissions.expiry(now),
+            }
+            for row in rows
+        ],
+    )
+    ksef_submissions.adjust_counts(db, {"TIMEOUT": -len(rows), "PENDING": len(rows)})
+    invoice_ids = [row.invoice_id for row in rows if row.invoice_id is not None]
+    if invoice_ids:
+        db.bulk_update_mappings(
+            Invoice,
+            [
+                {"id": invoice_id, "ksef_status": "submitted", "ksef_error": None}
+                for invoice_id in invoice_ids
+            ],
+        )
+    db.commit()
+    logger.info(f"Queued {len(rows)} timed-out KSeF submissions for a recheck")
+    return len(rows)
+
+
+def schedule_first_poll(submission: KSeFSubmission) -> None:
+    """Set the first status check of a freshly submitted document"""
+    submission.poll_attempts = 0
+    submission.next_poll_at = datetime.utcnow() + timedelta(seconds=next_poll_delay(0))
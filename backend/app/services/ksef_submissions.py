@@ -0,0 +1,210 @@
+"""
+Shared KSeF submission store
+
+Submissions live in the database so every API worker, job worker and the
+status poller see the same registry. XML payloads are stored once per SHA-256
+in ``ksef_payloads``; per-status totals are kept in ``ksef_submission_counts``
+so health checks are primary key reads. Rows expire
+``KSEF_SUBMISSION_TTL_SECONDS`` after their last status change and are purged
+by the status poller, or manually with::
+
+    python -m app.services.ksef_submissions purge
+    python -m app.services.ksef_submissions recount
+    python -m app.services.ksef_submissions recheck  # TIMEOUT -> PENDING
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import argparse
+import hashlib
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Mapping, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.ksef import KSeFPayload, KSeFSubmission, KSeFSubmissionCount
+
+logger = logging.getLogger(__name__)
+
+
+def _insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:  # pragma: no cover - only PostgreSQL and SQLite are deployed
+        raise RuntimeError(f"KSeF submission store does not support '{dialect}'")
+    return insert
+
+
+def expiry(now: Optional[datetime] = None) -> datetime:
+    """Expiry time of a submission changed at ``now``"""
+    now = now or datetime.utcnow()
+    return now + timedelta(seconds=settings.KSEF_SUBMISSION_TTL_SECONDS)
+
+
+def store_payload(db: Session, xml_content: str) -> str:
+    """Store an XML payload under its SHA-256 (once) and return the hash"""
+    digest = hashlib.sha256(xml_content.encode("utf-8")).hexdigest()
+    insert = _insert(db)
+    stmt = insert(KSeFPayload.__table__).values(
+        sha256=digest, xml_content=xml_content, size=len(xml_content)
+    )
+    db.execute(stmt.on_conflict_do_nothing(index_elements=["sha256"]))
+    return digest
+
+
+def payload_xml(db: Session, submission: KSeFSubmission) -> Optional[str]:
+    """XML sent with a submission, if it was stored"""
+    if submission.payload_sha256 is None:
+        return None
+    return db.scalar(
+        select(KSeFPayload.xml_content).where(
+            KSeFPayload.sha256 == submission.payload_sha256
+        )
+    )
+
+
+def adjust_counts(db: Session, deltas: Mapping[str, int]) -> None:
+    """Atomically add per-status deltas to ``ksef_submission_counts``"""
+    insert = _insert(db)
+    table = KSeFSubmissionCount.__table__
+    for status, delta in deltas.items():
+        if not delta:
+            continue
+        stmt = insert(table).values(status=status, count=delta)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["status"],
+                set_={"count": table.c.count + stmt.excluded.count},
+            )
+        )
+
+
+def create_submission(
+    db: Session, xml_content: Optional[str] = None, **fields
+) -> KSeFSubmission:
+    """Add a PENDING submission (not committed) and count it"""
+    submission = KSeFSubmission(status="PENDING", expires_at=expiry(), **fields)
+    if xml_content is not None:
+        submission.payload_sha256 = store_payload(db, xml_content)
+    db.add(submission)
+    adjust_counts(db, {"PENDING": 1})
+    return submission
+
+
+def set_status(db: Session, submission: KSeFSubmission, status: str) -> None:
+    """Move one submission to a new status, keeping counts and expiry in step"""
+    if submission.status != status:
+        adjust_counts(db, {submission.status: -1, status: 1})
+    submission.status = status
+    submission.expires_at = expiry()
+
+
+def status_counts(db: Session) -> Dict[str, int]:
+    """Stored submissions per status"""
+    return {
+        row.status: row.count
+        for row in db.query(KSeFSubmissionCount).filter(KSeFSubmissionCount.count > 0)
+    }
+
+
+def get_submission(db: Session, submission_id) -> Optional[KSeFSubmission]:
+    """Primary key lookup that ignores expired (not yet purged) submissions"""
+    submission = db.get(KSeFSubmission, submission_id)
+    if submission is None:
+        return None
+    if submission.expires_at and submission.expires_at <= datetime.utcnow():
+        return None
+    return submission
+
+
+def purge_expired(
+    db: Session, now: Optional[datetime] = None, batch_size: int = 1000
+) -> int:
+    """Delete expired submissions and the payloads nobody references any more"""
+    now = now or datetime.utcnow()
+    purged = 0
+    while True:
+        rows = db.execute(
+            select(
+                KSeFSubmission.id, KSeFSubmission.status, KSeFSubmission.payload_sha256
+            )
+            .where(KSeFSubmission.expires_at <= now)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        db.execute(
+            delete(KSeFSubmission).where(KSeFSubmission.id.in_([r.id for r in rows]))
+        )
+        adjust_counts(db, {s: -n for s, n in Counter(r.status for r in rows).items()})
+
+        hashes = {r.payload_sha256 for r in rows if r.payload_sha256}
+        if hashes:
+            still_used = select(KSeFSubmission.payload_sha256).where(
+                KSeFSubmission.payload_sha256.in_(hashes)
+            )
+            db.execute(
+                delete(KSeFPayload).where(
+                    KSeFPayload.sha256.in_(hashes),
+                    KSeFPayload.sha256.not_in(still_used),
+                )
+            )
+        db.commit()
+        purged += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    if purged:
+        logger.info(f"Purged {purged} expired KSeF submissions")
+    return purged
+
+
+def recount(db: Session) -> Dict[str, int]:
+    """Recompute ``ksef_submission_counts`` from the submissions table"""
+    counts = dict(
+        db.query(KSeFSubmission.status, func.count()).group_by(KSeFSubmission.status)
+    )
+    db.query(KSeFSubmissionCount).delete()
+    db.add_all(KSeFSubmissionCount(status=s, count=n) for s, n in counts.items())
+    db.commit()
+    return counts
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain the KSeF submission store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("purge", help="Delete expired submissions and payloads")
+    commands.add_parser("recount", help="Recompute per-status counts")
+    commands.add_parser("recheck", help="Poll timed-out submissions again")
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal, engine, Base
+    from app.utils.logging import setup_logging
+
+    setup_logging()
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.command == "purge":
+            print(f"Purged {purge_expired(db)} expired submissions")
+        elif args.command == "recount":
+            print(f"Submission counts: {recount(db)}")
+        elif args.command == "recheck":
+            from app.services.ksef_poller import recheck_timed_out
+
+            print(f"Queued {recheck_timed_out(db)} timed-out submissions")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Lead capture sink: queued in memory, appended to SQLite in batches
+
+``POST /api/lead`` used to open, check and append to a CSV file on the event
+loop for every visitor, and several workers appending at once could write the
+header twice or interleave rows. Now the request only queues the lead; a
+background task writes everything queued every ``LEAD_FLUSH_INTERVAL_SECONDS``
+(or as soon as ``LEAD_BATCH_SIZE`` are waiting) in one transaction, on a
+thread.
+
+The table lives in ``LEADS_DB_PATH`` in WAL mode, so all workers append to it
+safely and it can be queried while they do. Commits are not fsynced; a WAL
+checkpoint every ``LEAD_CHECKPOINT_INTERVAL_SECONDS`` writes them to the
+database file. Once the table holds ``LEAD_ROTATE_BYTES`` its rows move to an
+archive next to it (``leads-<timestamp>.db``).
+
+A worker that dies loses at most the leads queued since its last flush.
+Export the current table as CSV with::
+
+    python -m app.services.lead_sink > leads.csv
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import asyncio
+import csv
+import logging
+import sqlite3
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    "ts",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "company",
+    "company_size",
+    "marketing",
+)
+
+_CREATE_TABLE = f"""
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f"{column} TEXT" for column in COLUMNS)}
+)
+"""
+_INSERT = (
+    f"INSERT INTO leads ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)})"
+)
+
+
+class LeadSink:
+    """Queues leads and appends them to the leads table in batches"""
+
+    def __init__(
+        self,
+        path: Path,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        checkpoint_interval: Optional[float] = None,
+        rotate_bytes: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.path = Path(path)
+        self.batch_size = batch_size or settings.LEAD_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.LEAD_FLUSH_INTERVAL_SECONDS
+        self.checkpoint_interval = (
+            checkpoint_interval or settings.LEAD_CHECKPOINT_INTERVAL_SECONDS
+        )
+        self.rotate_bytes = rotate_bytes or settings.LEAD_ROTATE_BYTES
+        self.max_pending = max_pending or settings.LEAD_MAX_PENDING
+        self._pending: Deque[Tuple[Any, ...]] = deque()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._last_checkpoint = time.monotonic()
+
+    def submit(self, lead: Dict[str, Any]) -> bool:
+        """Queue a lead (no I/O); ``False`` if too many are already queued"""
+        if len(self._pending) >= self.max_pending:
+            return False
+        self._pending.append(
+            (datetime.utcnow().isoformat(),) + tuple(lead.get(c) for c in COLUMNS[1:])
+        )
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def start(self) -> None:
+        """Start the background flush task on the running loop"""
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write whatever is still queued"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._connection is not None:
+            await asyncio.to_thread(self._close)
+
+    async def flush(self) -> int:
+        """Write all queued leads; returns how many were written"""
+        batch = list(self._pending)
+        self._pending.clear()
+        if not batch:
+            return 0
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            # Keep them for the next attempt, ahead of newer leads
+            self._pending.extendleft(reversed(batch))
+            logger.error(f"Could not write {len(batch)} leads: {str(e)}")
+            return 0
+        return len(batch)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    # --- Runs on a worker thread, one flush at a time ------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit mode: transactions are opened explicitly below
+            connection = sqlite3.connect(
+                str(self.path), isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            # Other workers may hold the write lock for a moment
+            connection.execute("PRAGMA busy_timeout=5000")
+            connection.execute(_CREATE_TABLE)
+            self._connection = connection
+        return self._connection
+
+    def _write(self, rows: List[Tuple[Any, ...]]) -> None:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(_INSERT, rows)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        now = time.monotonic()
+        if now - self._last_checkpoint < self.checkpoint_interval:
+            return
+        self._last_checkpoint = now
+        # The rows are committed; failing here must not get them written twice
+        try:
+            connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            if self._used_bytes(connection) >= self.rotate_bytes:
+                self._rotate(connection)
+        except sqlite3.Error as e:
+            logger.warning(f"Leads checkpoint or rotation failed: {str(e)}")
+
+    @staticmethod
+    def _used_bytes(connection: sqlite3.Connection) -> int:
+        """Size of the pages in use; the file keeps its size after a rotation"""
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        pages = connection.execute("PRAGMA page_count").fetchone()[0]
+        free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free) * page_size
+
+    def _rotate(self, connection: sqlite3.Connection) -> None:
+        """Move all rows to a new archive database next to the table"""
+        archive = self.path.with_name(
+            f"{self.path.stem}-{datetime.now():%Y%m%d-%H%M%S-%f}{self.path.suffix}"
+        )
+        connection.execute("ATTACH DATABASE ? AS archive", (str(archive),))
+        rotated = False
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Another worker may have rotated while we waited for the lock
+                if self._used_bytes(connection) >= self.rotate_bytes:
+                    connection.execute(
+                        "CREATE TABLE archive.leads AS SELECT * FROM main.leads"
+                    )
+                    connection.execute("DELETE FROM main.leads")
+                    rotated = True
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        finally:
+            connection.execute("DETACH DATABASE archive")
+        if rotated:
+            logger.info(f"Leads archived to {archive}")
+        else:
+            archive.unlink(missing_ok=True)
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._connection.close()
+            self._connection = None
+
+
+lead_sink = LeadSink(Path(settings.LEADS_DB_PATH))
+
+
+def export_csv(path: Path, out) -> int:
+    """Write the leads table as CSV; returns the number of leads"""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        count = 0
+        for row in connection.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM leads ORDER BY id"
+        ):
+            writer.writerow(row)
+            count += 1
+        return count
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    export_csv(Path(settings.LEADS_DB_PATH), sys.stdout)
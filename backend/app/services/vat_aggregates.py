@@ -0,0 +1,292 @@
+"""
+Materialized VAT period aggregates
+
+Keeps ``vat_period_aggregates`` in step with the ``invoices`` table so the VAT
+summary never has to scan invoices. Sales invoices add to the issuing
+company's VAT due; when the contractor NIP belongs to a company registered in
+PolComply, the same invoice adds to that company's deductible VAT.
+
+Rebuild from scratch with::
+
+    python -m app.services.vat_aggregates rebuild [--company-id UUID]
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import argparse
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.models.company import Company
+from app.models.invoice import Invoice
+from app.models.vat import VatPeriodAggregate
+
+logger = logging.getLogger(__name__)
+
+# Invoices rejected by KSeF do not exist for VAT purposes
+EXCLUDED_STATUSES = {"rejected"}
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0")
+
+AMOUNT_COLUMNS = ("net_due", "vat_due", "net_deductible", "vat_deductible")
+
+# (company_id, period, vat_rate) -> column -> delta
+Deltas = Dict[Tuple[Any, str, int], Dict[str, Any]]
+
+
+def _to_decimal(value: Any) -> Decimal:
+    if value is None:
+        return ZERO
+    return Decimal(str(value))
+
+
+def period_of(value: Any) -> str:
+    """Return the YYYY-MM settlement period of an issue date"""
+    if isinstance(value, (datetime, date)):
+        return f"{value.year:04d}-{value.month:02d}"
+    return str(value)[:7]
+
+
+def filing_deadline(period: str) -> str:
+    """JPK_V7 / VAT deadline: 25th day of the month following the period"""
+    year, month = (int(part) for part in period.split("-"))
+    if month == 12:
+        year, month = year + 1, 1
+    else:
+        month += 1
+    return f"{year:04d}-{month:02d}-25"
+
+
+def _rate_totals(items: Iterable[Dict[str, Any]]) -> Dict[int, Tuple[Decimal, Decimal]]:
+    """Sum net and VAT amounts of invoice items per VAT rate"""
+    totals: Dict[int, Tuple[Decimal, Decimal]] = {}
+    for item in items or []:
+        rate = int(item.get("vat_rate", 0))
+        net = item.get("net_amount")
+        net = (
+            _to_decimal(net)
+            if net is not None
+            else _to_decimal(item.get("quantity")) * _to_decimal(item.get("net_price"))
+        )
+        vat = item.get("vat_amount")
+        vat = _to_decimal(vat) if vat is not None else net * Decimal(rate) / 100
+        prev_net, prev_vat = totals.get(rate, (ZERO, ZERO))
+        totals[rate] = (prev_net + net, prev_vat + vat)
+
+    return {
+        rate: (
+            net.quantize(CENT, rounding=ROUND_HALF_UP),
+            vat.quantize(CENT, rounding=ROUND_HALF_UP),
+        )
+        for rate, (net, vat) in totals.items()
+    }
+
+
+def _purchaser_company_id(db: Session, invoice: Invoice) -> Optional[Any]:
+    """Company registered with the contractor's NIP, if any (indexed lookup)"""
+    nip = (invoice.contractor_data or {}).get("nip")
+    if not nip:
+        return None
+    row = db.query(Company.id).filter(Company.nip == nip).first()
+    return row[0] if row else None
+
+
+def _collect_deltas(
+    deltas: Deltas, invoice: Invoice, purchaser_id: Optional[Any], sign: int
+) -> None:
+    """Accumulate the contribution of one invoice into ``deltas``"""
+    period = period_of(invoice.issue_date)
+    items = invoice.items or []
+    totals = _rate_totals(items)
+    if not totals:
+        return
+    first_rate = int(items[0].get("vat_rate", 0)) if items else next(iter(totals))
+
+    for rate, (net, vat) in totals.items():
+        sales = deltas.setdefault((invoice.company_id, period, rate), {})
+        sales["net_due"] = sales.get("net_due", ZERO) + sign * net
+        sales["vat_due"] = sales.get("vat_due", ZERO) + sign * vat
+        if rate == first_rate:
+            sales["invoice_count"] = sales.get("invoice_count", 0) + sign
+
+        if purchaser_id is not None:
+            purchase = deltas.setdefault((purchaser_id, period, rate), {})
+            purchase["net_deductible"] = (
+                purchase.get("net_deductible", ZERO) + sign * net
+            )
+            purchase["vat_deductible"] = (
+                purchase.get("vat_deductible", ZERO) + sign * vat
+            )
+
+
+def _upsert(db: Session, deltas: Deltas) -> None:
+    """Atomically add deltas to aggregate rows (INSERT ... ON CONFLICT DO UPDATE)"""
+    if not deltas:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:  # pragma: no cover - only PostgreSQL and SQLite are deployed
+        raise RuntimeError(f"VAT aggregates do not support dialect '{dialect}'")
+
+    table = VatPeriodAggregate.__table__
+    for (company_id, period, rate), values in deltas.items():
+        row = {
+            "company_id": company_id,
+            "period": period,
+            "vat_rate": rate,
+            "invoice_count": values.get("invoice_count", 0),
+        }
+        for column in AMOUNT_COLUMNS:
+            row[column] = values.get(column, ZERO)
+
+        stmt = insert(table).values(**row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["company_id", "period", "vat_rate"],
+            set_={
+                column: table.c[column] + stmt.excluded[column]
+                for column in AMOUNT_COLUMNS + ("invoice_count",)
+            },
+        )
+        db.execute(stmt)
+
+
+def _is_counted(status: Optional[str]) -> bool:
+    return (status or "pending") not in EXCLUDED_STATUSES
+
+
+def apply_invoice(db: Session, invoice: Invoice, sign: int = 1) -> None:
+    """Add (``sign=1``) or remove (``sign=-1``) an invoice from the aggregates"""
+    deltas: Deltas = {}
+    _collect_deltas(deltas, invoice, _purchaser_company_id(db, invoice), sign)
+    _upsert(db, deltas)
+
+
+def on_invoice_created(db: Session, invoice: Invoice) -> None:
+    """Hook for new invoices; runs in the caller's transaction"""
+    if _is_counted(invoice.ksef_status):
+        apply_invoice(db, invoice, 1)
+
+
+def on_invoice_status_changed(
+    db: Session, invoice: Invoice, old_status: Optional[str]
+) -> None:
+    """Hook for KSeF status transitions; runs in the caller's transaction"""
+    was_counted = _is_counted(old_status)
+    is_counted = _is_counted(invoice.ksef_status)
+    if was_counted and not is_counted:
+        apply_invoice(db, invoice, -1)
+    elif is_counted and not was_counted:
+        apply_invoice(db, invoice, 1)
+
+
+def rebuild(db: Session, company_id: Optional[UUID] = None) -> int:
+    """
+    Recompute aggregates from the invoices table
+
+    Args:
+        db: Database session
+        company_id: Restrict the rebuild to one company (as seller or buyer)
+
+    Returns:
+        Number of invoices aggregated
+    """
+    nip_to_company = {nip: cid for cid, nip in db.query(Company.id, Company.nip)}
+
+    aggregates = db.query(VatPeriodAggregate)
+    if company_id is not None:
+        aggregates = aggregates.filter(VatPeriodAggregate.company_id == company_id)
+    aggregates.delete(synchronize_session=False)
+
+    deltas: Deltas = defaultdict(dict)
+    count = 0
+    for invoice in db.query(Invoice).yield_per(1000):
+        if not _is_counted(invoice.ksef_status):
+            continue
+        purchaser_id = nip_to_company.get((invoice.contractor_data or {}).get("nip"))
+        if company_id is not None and company_id not in (
+            invoice.company_id,
+            purchaser_id,
+        ):
+            continue
+        _collect_deltas(deltas, invoice, purchaser_id, 1)
+        count += 1
+
+    if company_id is not None:
+        deltas = {key: value for key, value in deltas.items() if key[0] == company_id}
+
+    _upsert(db, deltas)
+    db.commit()
+    logger.info(f"Rebuilt VAT aggregates from {count} invoices")
+    return count
+
+
+def get_period_summary(db: Session, company_id: UUID, period: str) -> Dict[str, Any]:
+    """Read the VAT summary of one period from the aggregate table"""
+    rows = (
+        db.query(VatPeriodAggregate)
+        .filter(
+            VatPeriodAggregate.company_id == company_id,
+            VatPeriodAggregate.period == period,
+        )
+        .order_by(VatPeriodAggregate.vat_rate)
+        .all()
+    )
+
+    vat_due = sum((_to_decimal(r.vat_due) for r in rows), ZERO)
+    vat_deductible = sum((_to_decimal(r.vat_deductible) for r in rows), ZERO)
+
+    return {
+        "period": period,
+        "vat_due": float(vat_due),
+        "vat_deductible": float(vat_deductible),
+        "net_vat": float(vat_due - vat_deductible),
+        "invoice_count": sum(r.invoice_count or 0 for r in rows),
+        "deadline": filing_deadline(period),
+        "rates": [
+            {
+                "vat_rate": r.vat_rate,
+                "net_due": float(_to_decimal(r.net_due)),
+                "vat_due": float(_to_decimal(r.vat_due)),
+                "net_deductible": float(_to_decimal(r.net_deductible)),
+                "vat_deductible": float(_to_decimal(r.vat_deductible)),
+            }
+            for r in rows
+        ],
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain VAT period aggregates")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = commands.add_parser("rebuild", help="Recompute from invoices")
+    rebuild_parser.add_argument("--company-id", type=UUID, default=None)
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal, engine, Base
+    from app.utils.logging import setup_logging
+
+    setup_logging()
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            count = rebuild(db, args.company_id)
+            print(f"Rebuilt VAT aggregates from {count} invoices")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
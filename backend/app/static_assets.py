@@ -0,0 +1,215 @@
+"""Precompressed static assets with content-hashed names
+
+At startup every file in the static directory is read once, hashed and
+compressed (gzip, and brotli when the ``brotli`` package is installed), so a
+request never compresses anything. Each asset is reachable under two names:
+
+- the hashed one, ``/static/upload.3f2a9c1b5e7d4a60.html``, served with a
+  one-year ``immutable`` Cache-Control: a changed file gets a new name, so
+  pages should link to ``StaticAssets.url(name)``;
+- its plain name (and ``/`` for the upload page), served with ``no-cache`` so
+  browsers revalidate it.
+
+Both carry a strong ETag per encoding and answer a matching
+``If-None-Match`` with 304 Not Modified.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Smaller files gain less from compression than the header costs
+MIN_COMPRESS_BYTES = 256
+
+# Already compressed formats; compressing them again only costs CPU
+_PRECOMPRESSED_TYPES = ("image/", "video/", "audio/", "font/woff")
+_UNCOMPRESSED_IMAGES = ("image/svg+xml", "image/x-icon", "image/bmp")
+
+
+def is_compressible(media_type: str) -> bool:
+    """Whether compressing a response of this media type pays off"""
+    media_type = media_type.split(";")[0].strip().lower()
+    if media_type in _UNCOMPRESSED_IMAGES:
+        return True
+    if media_type.startswith(_PRECOMPRESSED_TYPES):
+        return False
+    return media_type not in (
+        "application/zip",
+        "application/gzip",
+        "application/x-gzip",
+        "application/x-7z-compressed",
+        "application/x-bzip2",
+        "application/pdf",
+    )
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+@dataclass(frozen=True)
+class StaticAsset:
+    """One static file with its precompressed variants"""
+
+    name: str
+    hashed_name: str
+    media_type: str
+    digest: str
+    # Content-Encoding (``identity`` for none) -> body
+    variants: Dict[str, bytes]
+
+    def etag(self, encoding: str) -> str:
+        if encoding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+
+def build_asset(path: Path, name: str) -> StaticAsset:
+    """Read, hash and compress one file"""
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in (
+        "application/javascript",
+        "application/json",
+    ):
+        media_type += "; charset=utf-8"
+
+    variants = {"identity": data}
+    if len(data) >= MIN_COMPRESS_BYTES and is_compressible(media_type):
+        # mtime=0: the same file always gives the same bytes
+        variants["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+        brotli = _brotli()
+        if brotli is not None:
+            variants["br"] = brotli.compress(data, quality=11)
+        # Keep only variants that are actually smaller
+        variants = {
+            encoding: body
+            for encoding, body in variants.items()
+            if encoding == "identity" or len(body) < len(data)
+        }
+
+    stem, dot, suffix = name.rpartition(".")
+    hashed_name = f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+    return StaticAsset(name, hashed_name, media_type, digest, variants)
+
+
+def build_assets(directory: Path) -> Dict[str, StaticAsset]:
+    """All files below ``directory`` by their relative path"""
+    assets = {}
+    for path in sorted(directory.rglob("*")):
+        if path.is_file() and not path.name.startswith("."):
+            name = path.relative_to(directory).as_posix()
+            assets[name] = build_asset(path, name)
+    return assets
+
+
+def _accepted_encodings(accept_encoding: str) -> List[str]:
+    """Encodings the client accepts (``q=0`` excluded)"""
+    accepted = []
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.append(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(asset: StaticAsset, accept_encoding: str) -> str:
+    """Best precompressed variant the client accepts"""
+    accepted = _accepted_encodings(accept_encoding)
+    for encoding in ("br", "gzip"):
+        if encoding in asset.variants and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class StaticAssets:
+    """ASGI app serving precompressed assets by plain or hashed name"""
+
+    def __init__(self, directory: Path, prefix: str = "/static"):
+        self.prefix = prefix
+        self.assets = build_assets(directory)
+        # URL path -> (asset, whether the name is content-hashed)
+        self._routes: Dict[str, Tuple[StaticAsset, bool]] = {}
+        for asset in self.assets.values():
+            self._routes[asset.name] = (asset, False)
+            self._routes[asset.hashed_name] = (asset, True)
+        logger.info(f"Static assets prepared: {len(self.assets)} from {directory}")
+
+    def url(self, name: str) -> str:
+        """Cache-busting URL of an asset (``/static/<name>.<hash>.<ext>``)"""
+        return f"{self.prefix}/{self.assets[name].hashed_name}"
+
+    def response(
+        self, name: str, headers: Headers, method: str = "GET"
+    ) -> Optional[Response]:
+        """Response for an asset path, ``None`` if there is no such asset"""
+        route = self._routes.get(name)
+        if route is None:
+            return None
+        asset, hashed = route
+        encoding = choose_encoding(asset, headers.get("accept-encoding", ""))
+        etag = asset.etag(encoding)
+        response_headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE if hashed else REVALIDATE,
+        }
+        if len(asset.variants) > 1:
+            response_headers["Vary"] = "Accept-Encoding"
+
+        if _etag_matches(headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=response_headers)
+
+        body = asset.variants[encoding]
+        response_headers["Content-Type"] = asset.media_type
+        # HEAD reports the length of the body GET would send
+        response_headers["Content-Length"] = str(len(body))
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+        return Response(body if method != "HEAD" else b"", headers=response_headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            response: Optional[Response] = Response(
+                "Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"}
+            )
+        else:
+            response = self.response(
+                scope["path"].lstrip("/"), Headers(scope=scope), method
+            )
+            if response is None:
+                response = Response("Not Found", status_code=404)
+        await response(scope, receive, send)
@@ -0,0 +1,133 @@
+"""Request body size limit and gzip request decoding
+
+``RequestBodyLimitMiddleware`` counts body bytes as the server receives them,
+so an oversized upload is rejected with 413 before it has been spooled, not
+after. Bodies sent with ``Content-Encoding: gzip`` are decompressed on the fly
+and the decompressed size is capped as well, which also defuses gzip bombs.
+"""
+
+import json
+import zlib
+from typing import Any, Optional
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class BodyTooLarge(Exception):
+    """The request body exceeded the configured limit"""
+
+
+class InvalidBodyEncoding(Exception):
+    """The request body is not valid gzip"""
+
+
+class RequestBodyLimitMiddleware:
+    """Caps request bodies at ``max_bytes`` and decodes gzip request bodies"""
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        length = headers.get("content-length", "")
+        if length.isdigit() and int(length) > self.max_bytes:
+            await self._reject(send, 413, self._too_large_detail())
+            return
+
+        encoding = headers.get("content-encoding", "identity").lower()
+        if encoding not in ("identity", "gzip"):
+            await self._reject(
+                send, 415, f"Unsupported Content-Encoding '{encoding}', use gzip"
+            )
+            return
+
+        decoder: Optional[Any] = None
+        if encoding == "gzip":
+            decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            # Downstream sees the decoded body, of a length nobody knows yet
+            scope = dict(scope)
+            scope["headers"] = [
+                (name, value)
+                for name, value in scope["headers"]
+                if name not in (b"content-encoding", b"content-length")
+            ]
+
+        received = 0
+        decoded = 0
+        failure: Optional[Exception] = None
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, decoded, failure
+            message = await receive()
+            if message["type"] != "http.request" or failure is not None:
+                return message
+            body = message.get("body", b"")
+            try:
+                received += len(body)
+                if received > self.max_bytes:
+                    raise BodyTooLarge()
+                if decoder is not None:
+                    body = self._decode(decoder, body, self.max_bytes - decoded)
+                    if not message.get("more_body", False):
+                        body += decoder.flush()
+                        if not decoder.eof:
+                            raise InvalidBodyEncoding()
+                    decoded += len(body)
+                    if decoded > self.max_bytes:
+                        raise BodyTooLarge()
+            except (BodyTooLarge, InvalidBodyEncoding) as e:
+                failure = e
+                raise
+            return {**message, "body": body}
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            # Body parsers may turn our exception into their own error response
+            if failure is not None:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except (BodyTooLarge, InvalidBodyEncoding):
+            pass
+        if failure is not None and not response_started:
+            if isinstance(failure, BodyTooLarge):
+                await self._reject(send, 413, self._too_large_detail())
+            else:
+                await self._reject(send, 400, "Request body is not valid gzip")
+
+    @staticmethod
+    def _decode(decoder: Any, body: bytes, remaining: int) -> bytes:
+        """Decompress at most ``remaining + 1`` bytes, enough to detect overflow"""
+        try:
+            return decoder.decompress(body, remaining + 1)
+        except zlib.error as e:
+            raise InvalidBodyEncoding() from e
+
+    def _too_large_detail(self) -> str:
+        return f"Request body exceeds the limit of {self.max_bytes} bytes"
+
+    @staticmethod
+    async def _reject(send: Send, status_code: int, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -3,24 +3,23 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime, timedelta
+from uuid import UUID, uuid4
 import logging
 
 from app.database import get_db
 from app.models.user import User
 from app.config import settings
+from app.utils import passwords
+from app.utils.principals import Principal, cache_ttl, principal_cache
 
 logger = logging.getLogger(__name__)
 
 # Security scheme
 security = HTTPBearer()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT settings
 SECRET_KEY = settings.JWT_SECRET
 ALGORITHM = "HS256"
@@ -29,13 +28,14 @@ REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create JWT access token"""
+    """Create JWT access token with a unique ``jti`` (the principal cache key)"""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
+    to_encode.setdefault("jti", uuid4().hex)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -55,64 +55,122 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 def get_password_hash(password: str) -> str:
-    """Hash password using bcrypt"""
-    return pwd_context.hash(password)
+    """Hash password with the configured scheme (blocking, see app.utils.passwords)"""
+    return passwords.hash_password(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verify password against hash (blocking, see app.utils.passwords)"""
+    return passwords.verify_password(plain_password, hashed_password)
+
 
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    """
+    Authenticate user with email and password
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    """Authenticate user with email and password"""
+    Verification runs on the password hashing pool; an outdated hash is
+    replaced by one with the current scheme and parameters.
+    """
     user = db.query(User).filter(User.email == email).first()
     if not user:
         return None
-    if not verify_password(password, str(user.hashed_password)):
+    hashed_password = str(user.hashed_password)
+    # End the read transaction: a burst of logins waiting for the hashing pool
+    # must not hold (and exhaust) the connection pool meanwhile
+    db.commit()
+    valid, new_hash = await passwords.verify_and_update(password, hashed_password)
+    if not valid:
         return None
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        db.commit()
+        logger.info(f"Password hash upgraded for user {user.id}")
     return user
 
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify JWT token and return user ID"""
+def decode_token(token: str) -> Optional[dict]:
+    """Verify JWT token and return its claims, ``None`` if invalid or expired"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-        return user_id
     except JWTError:
         return None
+    if payload.get("sub") is None:
+        return None
+    return payload
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
-    """Get current authenticated user"""
-    credentials_exception = HTTPException(
+def verify_token(token: str) -> Optional[str]:
+    """Verify JWT token and return user ID"""
+    payload = decode_token(token)
+    return payload["sub"] if payload is not None else None
+
+
+def _load_user(db: Session, user_id: str) -> User:
+    """User of a token's ``sub`` claim; 401 if it does not exist"""
+    try:
+        user = db.query(User).filter(User.id == UUID(user_id)).first()
+    except ValueError:
+        user = None
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Nie można zweryfikować poświadczeń",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        token = credentials.credentials
-        user_id = verify_token(token)
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
+def _inactive_user_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Nieaktywny użytkownik"
+    )
+
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """
+    Get the current authenticated principal
+
+    For endpoints that only need the user's id, role and companies: tokens
+    seen before are resolved from the principal cache without a database
+    query (the session is only connected on a miss).
+    """
+    payload = decode_token(credentials.credentials)
+    if payload is None:
+        raise _credentials_exception()
+
+    token_id = payload.get("jti") if settings.AUTH_CACHE_ENABLED else None
+    principal = principal_cache.get(token_id) if token_id else None
+    if principal is None:
+        user = _load_user(db, payload["sub"])
+        principal = Principal.from_user(user, db)
+        ttl = cache_ttl(payload.get("exp", 0))
+        if token_id and ttl > 0:
+            principal_cache.set(token_id, principal, ttl)
+
+    if not principal.is_active:
+        raise _inactive_user_exception()
+    return principal
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> User:
+    """Get current authenticated user (the ORM object, for writes)"""
+    user_id = verify_token(credentials.credentials)
+    if user_id is None:
+        raise _credentials_exception()
 
+    user = _load_user(db, user_id)
     if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Nieaktywny użytkownik"
-        )
+        raise _inactive_user_exception()
 
     return user
 
@@ -120,7 +178,5 @@ def get_current_user(
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user"""
     if not current_user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Nieaktywny użytkownik"
-        )
+        raise _inactive_user_exception()
     return current_user
@@ -0,0 +1,129 @@
+"""Password hashing on a small dedicated thread pool
+
+bcrypt and argon2 take 100-300ms of CPU per hash by design. Run inline in an
+async handler, every login stalls the whole worker for that long, so hashing
+and verification run on ``PASSWORD_HASH_WORKERS`` threads instead (both
+libraries release the GIL while hashing). At most ``PASSWORD_HASH_MAX_PENDING``
+operations may be in flight; beyond that ``PasswordHashingBusy`` is raised, so
+a login burst is shed rather than queued for minutes.
+
+New hashes use ``PASSWORD_HASH_SCHEME`` (``bcrypt`` or ``argon2id``, the latter
+needs argon2-cffi). Hashes made with another scheme or weaker parameters still
+verify, and ``needs_rehash`` tells the login to store a fresh one.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import bcrypt
+
+from app.config import settings
+
+# bcrypt only looks at the first 72 bytes; newer releases raise instead of
+# truncating, so truncate as the hashes stored so far were made
+BCRYPT_MAX_BYTES = 72
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+class PasswordHashingBusy(Exception):
+    """Too many hashing operations are already waiting"""
+
+
+def _argon2():
+    try:
+        from argon2 import PasswordHasher
+    except ImportError as e:
+        raise RuntimeError(
+            "PASSWORD_HASH_SCHEME=argon2id requires the argon2-cffi package"
+        ) from e
+    return PasswordHasher(
+        time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+        memory_cost=settings.PASSWORD_ARGON2_MEMORY_KIB,
+        parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+    )
+
+
+def _bcrypt_secret(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+
+def hash_password(password: str) -> str:
+    """Hash a password with the configured scheme (blocking)"""
+    if settings.PASSWORD_HASH_SCHEME == "argon2id":
+        return _argon2().hash(password)
+    salt = bcrypt.gensalt(rounds=settings.PASSWORD_BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_bcrypt_secret(password), salt).decode("ascii")
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Check a password against a bcrypt or argon2id hash (blocking)"""
+    if hashed.startswith("$argon2"):
+        from argon2.exceptions import VerificationError
+
+        try:
+            return _argon2().verify(hashed, password)
+        except VerificationError:
+            return False
+    try:
+        return bcrypt.checkpw(_bcrypt_secret(password), hashed.encode("ascii"))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Whether a hash was made with another scheme or other parameters"""
+    if settings.PASSWORD_HASH_SCHEME == "argon2id":
+        return not hashed.startswith("$argon2id$") or _argon2().check_needs_rehash(
+            hashed
+        )
+    # $2b$12$...: the cost is the second field
+    parts = hashed.split("$")
+    return (
+        len(parts) < 3
+        or parts[1] not in ("2a", "2b", "2y")
+        or parts[2] != f"{settings.PASSWORD_BCRYPT_ROUNDS:02d}"
+    )
+
+
+async def _run(func, *args):
+    """Run a hashing function on the pool, refusing to queue without bound"""
+    global _pending
+    with _pending_lock:
+        if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise PasswordHashingBusy()
+        _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """``hash_password`` on the hashing pool"""
+    return await _run(hash_password, password)
+
+
+async def verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if its hash is outdated
+
+    Returns:
+        Whether the password matches, and the new hash to store (``None`` if
+        the current one is fine)
+    """
+
+    def check() -> Tuple[bool, Optional[str]]:
+        if not verify_password(password, hashed):
+            return False, None
+        return True, hash_password(password) if needs_rehash(hashed) else None
+
+    return await _run(check)
@@ -0,0 +1,253 @@
+"""Cached principals of access tokens
+
+Resolving a bearer token to its user used to cost a ``users`` query on every
+request. A ``Principal`` is the part of the user that authorization needs (id,
+role, active flag, company memberships); it is cached under the token's
+``jti``, so a request with a cached token does not touch the database at all.
+
+Entries expire after ``AUTH_CACHE_TTL_SECONDS`` and never outlive the token
+itself. Committing a change to a user's active flag or role, deleting the
+user, or adding or removing one of its company memberships drops all of that
+user's entries. Bulk ``query.update()`` calls bypass the ORM events; call
+``principal_cache.invalidate_user`` after them.
+
+With ``AUTH_CACHE_BACKEND=redis`` all workers share the cache, so an
+invalidation reaches every worker. The per-process memory cache only reaches
+the worker that committed the change; it keeps entries for at most
+``AUTH_CACHE_MEMORY_TTL_SECONDS``, so the other workers (gunicorn runs
+``WEB_CONCURRENCY`` of them) pick up a deactivation within seconds.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.company import UserCompany
+from app.models.user import ROLE_HIERARCHY, User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as far as authorization is concerned"""
+
+    id: UUID
+    email: str
+    role: str
+    is_active: bool
+    company_ids: FrozenSet[UUID]
+
+    @classmethod
+    def from_user(cls, user: User, db: Session) -> "Principal":
+        company_ids = db.query(UserCompany.company_id).filter(
+            UserCompany.user_id == user.id
+        )
+        return cls(
+            id=UUID(str(user.id)),
+            email=user.email,
+            role=user.role,
+            is_active=bool(user.is_active),
+            company_ids=frozenset(UUID(str(row.company_id)) for row in company_ids),
+        )
+
+    def has_company_access(self, company_id: Union[UUID, str]) -> bool:
+        """Check if the user has access to a specific company"""
+        try:
+            return UUID(str(company_id)) in self.company_ids
+        except ValueError:
+            return False
+
+    def has_role(self, required_role: str) -> bool:
+        """Check if the user has the required role or higher"""
+        return ROLE_HIERARCHY.get(self.role, 0) >= ROLE_HIERARCHY.get(required_role, 0)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "id": str(self.id),
+                "email": self.email,
+                "role": self.role,
+                "is_active": self.is_active,
+                "company_ids": sorted(str(c) for c in self.company_ids),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: Union[str, bytes]) -> "Principal":
+        fields = json.loads(data)
+        return cls(
+            id=UUID(fields["id"]),
+            email=fields["email"],
+            role=fields["role"],
+            is_active=fields["is_active"],
+            company_ids=frozenset(UUID(c) for c in fields["company_ids"]),
+        )
+
+
+class MemoryPrincipalCache:
+    """Principals in process memory, at most ``max_entries`` of them"""
+
+    def __init__(self, max_entries: int, max_ttl: Optional[float] = None) -> None:
+        self.max_entries = max_entries
+        # Other workers cannot invalidate these entries, so they stay short
+        self.max_ttl = (
+            max_ttl if max_ttl is not None else settings.AUTH_CACHE_MEMORY_TTL_SECONDS
+        )
+        # Token id -> (expiry on the monotonic clock, principal)
+        self._entries: Dict[str, Tuple[float, Principal]] = {}
+        self._by_user: Dict[UUID, Set[str]] = {}
+        # Sync dependencies run on the thread pool
+        self._lock = threading.Lock()
+
+    def get(self, token_id: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(token_id)
+                return None
+            return entry[1]
+
+    def set(self, token_id: str, principal: Principal, ttl: float) -> None:
+        ttl = min(ttl, self.max_ttl)
+        with self._lock:
+            if token_id not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[token_id] = (time.monotonic() + ttl, principal)
+            self._by_user.setdefault(principal.id, set()).add(token_id)
+
+    def invalidate_user(self, user_id: UUID) -> None:
+        with self._lock:
+            for token_id in self._by_user.pop(user_id, set()):
+                self._entries.pop(token_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _drop(self, token_id: str) -> None:
+        _, principal = self._entries.pop(token_id)
+        tokens = self._by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token_id)
+            if not tokens:
+                del self._by_user[principal.id]
+
+    def _evict(self) -> None:
+        """Drop expired entries, or the oldest tenth if none has expired"""
+        now = time.monotonic()
+        expired = [t for t, (expires, _) in self._entries.items() if expires <= now]
+        # Dicts keep insertion order, so the first entries are the oldest
+        victims = expired or list(self._entries)[: max(1, self.max_entries // 10)]
+        for token_id in victims:
+            self._drop(token_id)
+
+
+class RedisPrincipalCache:
+    """Principals in Redis, shared by all workers; errors count as misses"""
+
+    def __init__(self, url: str) -> None:
+        from redis import Redis
+
+        self._redis = Redis.from_url(url, socket_timeout=0.5)
+
+    def get(self, token_id: str) -> Optional[Principal]:
+        try:
+            data = self._redis.get(f"principal:{token_id}")
+        except Exception as e:
+            logger.warning(f"Principal cache unavailable: {str(e)}")
+            return None
+        return Principal.from_json(data) if data is not None else None
+
+    def set(self, token_id: str, principal: Principal, ttl: float) -> None:
+        seconds = max(1, int(ttl))
+        user_key = f"principal-user:{principal.id}"
+        try:
+            pipe = self._redis.pipeline()
+            pipe.set(f"principal:{token_id}", principal.to_json(), ex=seconds)
+            pipe.sadd(user_key, token_id)
+            # Entries expire on their own; the index only has to outlive them
+            pipe.expire(user_key, settings.AUTH_CACHE_TTL_SECONDS + 1)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Principal cache unavailable: {str(e)}")
+
+    def invalidate_user(self, user_id: UUID) -> None:
+        user_key = f"principal-user:{user_id}"
+        try:
+            token_ids = self._redis.smembers(user_key)
+            keys = [f"principal:{t.decode()}" for t in token_ids]
+            self._redis.delete(user_key, *keys)
+        except Exception as e:
+            # The entries still expire after AUTH_CACHE_TTL_SECONDS
+            logger.error(f"Could not invalidate principals of user {user_id}: {e}")
+
+    def clear(self) -> None:
+        try:
+            for key in self._redis.scan_iter("principal*"):
+                self._redis.delete(key)
+        except Exception as e:
+            logger.warning(f"Principal cache unavailable: {str(e)}")
+
+
+def _create_cache() -> Any:
+    if settings.AUTH_CACHE_BACKEND == "redis":
+        return RedisPrincipalCache(settings.REDIS_URL)
+    return MemoryPrincipalCache(settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+principal_cache = _create_cache()
+
+
+def cache_ttl(expires_at: float, now: Optional[float] = None) -> float:
+    """Seconds to cache the principal of a token expiring at ``expires_at``"""
+    remaining = expires_at - (now if now is not None else time.time())
+    return min(float(settings.AUTH_CACHE_TTL_SECONDS), remaining)
+
+
+# --- Invalidation -------------------------------------------------------------
+
+_PENDING_KEY = "principal_invalidations"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context) -> None:
+    """Remember users whose principal a flush changed, until the commit"""
+    changed: Set[UUID] = session.info.setdefault(_PENDING_KEY, set())
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(
+                state.attrs[name].history.has_changes()
+                for name in ("is_active", "role")
+            ):
+                changed.add(UUID(str(obj.id)))
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(UUID(str(obj.id)))
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, UserCompany) and obj.user_id is not None:
+            changed.add(UUID(str(obj.user_id)))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    # Only after the commit: a request in between would cache the old state
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,45 @@
+"""Celery application and job queue configuration"""
+
+from pathlib import Path
+
+from celery import Celery
+from kombu import Queue
+
+from app.config import settings
+
+KSEF_QUEUE = "ksef"
+DEAD_LETTER_QUEUE = "ksef.dead_letter"
+
+
+def broker_url() -> str:
+    """Broker for the configured backend: Redis in production, SQLite locally"""
+    if settings.JOB_QUEUE_BACKEND == "sqlite":
+        path = Path(settings.JOB_QUEUE_SQLITE_PATH).resolve()
+        return f"sqla+sqlite:///{path}"
+    if settings.JOB_QUEUE_BACKEND == "eager":
+        return "memory://"
+    return settings.REDIS_URL
+
+
+celery_app = Celery("polcomply", broker=broker_url(), include=["app.workers.tasks"])
+
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    task_ignore_result=True,
+    # Durability: a job is acknowledged only after it finished, and is
+    # redelivered if the worker process dies mid-flight.
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # One reserved job per process so slow KSeF calls don't starve others
+    worker_prefetch_multiplier=1,
+    worker_concurrency=settings.WORKER_CONCURRENCY,
+    task_default_queue=KSEF_QUEUE,
+    task_queues=(Queue(KSEF_QUEUE), Queue(DEAD_LETTER_QUEUE)),
+    task_routes={"ksef.dead_letter": {"queue": DEAD_LETTER_QUEUE}},
+    # Redis: redeliver unacknowledged jobs after the longest possible backoff
+    broker_transport_options={
+        "visibility_timeout": settings.JOB_RETRY_BACKOFF_MAX_SECONDS * 2
+    },
+    task_always_eager=settings.JOB_QUEUE_BACKEND == "eager",
+)
@@ -0,0 +1,53 @@
+"""
+KSeF status poller entry point
+
+One poller serves every pending submission; several can run side by side
+(due rows are leased, and claimed with SKIP LOCKED on PostgreSQL)::
+
+    python -m app.workers.poller
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import List, Optional
+
+from app.config import settings
+from app.services.ksef_client import close_http_clients
+from app.services.ksef_poller import KSeFStatusPoller
+
+
+async def _run(poller: KSeFStatusPoller) -> None:
+    try:
+        await poller.run()
+    finally:
+        await close_http_clients()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="PolComply KSeF status poller")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.KSEF_POLL_BATCH_SIZE,
+        help="Submissions claimed per polling round",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=settings.KSEF_POLL_RATE_PER_SECOND,
+        help="Maximum KSeF status calls per second",
+    )
+    parser.add_argument("--loglevel", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.loglevel)
+    poller = KSeFStatusPoller(batch_size=args.batch_size, rate_per_second=args.rate)
+    try:
+        asyncio.run(_run(poller))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,216 @@
 """Background tasks for invoice processing"""
 
-from typing import Any
+from typing import Any, Dict, Optional
+from uuid import UUID
+import asyncio
 import logging
 
+from celery import Task
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.company import Company
+from app.models.invoice import Invoice
+from app.models.ksef import KSeFSubmission
+from app.services import ksef_submissions
+from app.services.fa3_xml import InvoiceXMLError, invoice_xml
+from app.services.invoice_service import InvoiceService
+from app.services.ksef_client import KSeFClient, KSeFTransientError
+from app.services.ksef_poller import schedule_first_poll
+from app.workers.celery_app import DEAD_LETTER_QUEUE, celery_app
+
 logger = logging.getLogger(__name__)
 
-# For now, we'll use a simple mock implementation
-# In production, this would be connected to Redis/RabbitMQ
+# Statuses after which an invoice must not be sent to KSeF again; ``unknown``
+# (polling timed out) needs reconciling, a resubmit could duplicate it in KSeF
+FINAL_KSEF_STATUSES = {"submitted", "accepted", "rejected", "unknown"}
+
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_async(coro):
+    """
+    Run a coroutine on this worker process's long-lived event loop, so the
+    pooled KSeF connections and cached sessions survive between jobs.
+    """
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
+    return _event_loop.run_until_complete(coro)
+
+
+class DeadLetterTask(Task):
+    """Task base that parks jobs in the dead-letter queue once retries run out"""
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        logger.error(f"Job {self.name}[{task_id}] failed permanently: {exc}")
+        dead_letter_task.apply_async(
+            args=(self.name, list(args), dict(kwargs), str(exc)),
+            queue=DEAD_LETTER_QUEUE,
+        )
+
+
+def _invoice_payload(invoice: Invoice, company: Company) -> Dict[str, Any]:
+    """Invoice fields passed to ``KSeFClient.submit_invoice``"""
+    return {
+        "xml_content": invoice_xml(invoice, company).decode("utf-8"),
+        "invoice_id": str(invoice.id),
+        "invoice_number": invoice.invoice_number,
+        "issue_date": invoice.issue_date.isoformat() if invoice.issue_date else None,
+        "contractor_data": invoice.contractor_data,
+        "items": invoice.items,
+        "net_amount": str(invoice.net_amount),
+        "vat_amount": str(invoice.vat_amount),
+        "gross_amount": str(invoice.gross_amount),
+        "payment_method": invoice.payment_method,
+    }
+
+
+@celery_app.task(
+    base=DeadLetterTask,
+    name="ksef.submit_invoice",
+    autoretry_for=(KSeFTransientError,),
+    max_retries=settings.JOB_MAX_RETRIES,
+    retry_backoff=settings.JOB_RETRY_BACKOFF_SECONDS,
+    retry_backoff_max=settings.JOB_RETRY_BACKOFF_MAX_SECONDS,
+    retry_jitter=True,
+    rate_limit=settings.KSEF_SUBMIT_RATE_LIMIT,
+)
+def submit_invoice_task(invoice_id: str, company_id: str) -> Dict[str, Any]:
+    """
+    Submit invoice to KSeF.
+
+    Transient KSeF failures raise ``KSeFTransientError`` and are retried with
+    exponential backoff; rejections are final and stored on the invoice.
+    """
+    db = SessionLocal()
+    try:
+        invoice = db.query(Invoice).filter(Invoice.id == UUID(invoice_id)).first()
+        company = db.query(Company).filter(Company.id == UUID(company_id)).first()
+        if invoice is None or company is None:
+            logger.error(f"Invoice {invoice_id} or company {company_id} not found")
+            return {"status": "missing", "invoice_id": invoice_id}
+
+        if invoice.ksef_status in FINAL_KSEF_STATUSES:
+            # Redelivered job (acks_late) for an invoice that already went out
+            return {"status": invoice.ksef_status, "invoice_id": invoice_id}
+
+        service = InvoiceService(db)
+        try:
+            payload = _invoice_payload(invoice, company)
+        except InvoiceXMLError as e:
+            # Sending again would build the same document
+            logger.error(f"Cannot build FA(3) XML of invoice {invoice_id}: {e}")
+            service.update_invoice_status(invoice.id, "rejected", error=str(e))
+            return {"status": "rejected", "invoice_id": invoice_id}
+
+        logger.info(f"Submitting invoice {invoice_id} for company {company_id}")
+        client = KSeFClient(company)
+        result = run_async(client.submit_invoice(payload))
+
+        if result.get("success"):
+            if result.get("reference_number"):
+                # The status poller fetches the UPO once KSeF has processed it
+                submission = ksef_submissions.create_submission(
+                    db,
+                    invoice_id=invoice.id,
+                    company_id=company.id,
+                    nip=company.nip,
+                    environment=company.ksef_environment,
+                    reference_number=result["reference_number"],
+                    xml_content=payload["xml_content"],
+                )
+                schedule_first_poll(submission)
+            service.update_invoice_status(
+                invoice.id, result.get("status", "submitted"), upo=result.get("upo")
+            )
+        elif result.get("status") == "rejected":
+            service.update_invoice_status(
+                invoice.id, "rejected", error=result.get("error")
+            )
+        else:
+            raise KSeFTransientError(result.get("error") or result.get("message"))
+
+        return {"status": result.get("status"), "invoice_id": invoice_id}
+    finally:
+        db.close()
+
+
+@celery_app.task(
+    base=DeadLetterTask,
+    name="ksef.send_submission",
+    autoretry_for=(KSeFTransientError,),
+    max_retries=settings.JOB_MAX_RETRIES,
+    retry_backoff=settings.JOB_RETRY_BACKOFF_SECONDS,
+    retry_backoff_max=settings.JOB_RETRY_BACKOFF_MAX_SECONDS,
+    retry_jitter=True,
+    rate_limit=settings.KSEF_SUBMIT_RATE_LIMIT,
+)
+def send_submission_task(submission_id: str) -> Dict[str, Any]:
+    """
+    Send the XML of a ``/ksef/send`` submission to KSeF.
 
+    On success the element reference is stored and the status poller takes
+    over; rejections are final and marked as ``ERROR``.
+    """
+    db = SessionLocal()
+    try:
+        submission = (
+            db.query(KSeFSubmission)
+            .filter(KSeFSubmission.id == UUID(submission_id))
+            .first()
+        )
+        if submission is None or submission.status != "PENDING":
+            return {"status": "missing", "submission_id": submission_id}
+        if submission.reference_number:
+            # Redelivered job (acks_late) for a document that already went out
+            return {"status": submission.status, "submission_id": submission_id}
 
-class MockTask:
-    """Mock task class for development"""
+        company = db.query(Company).filter(Company.id == submission.company_id).first()
+        xml_content = ksef_submissions.payload_xml(db, submission)
+        # Retrying cannot bring back a deleted company or a purged payload
+        if company is None:
+            failure = "Firma nie istnieje"  # Company was deleted
+        elif xml_content is None:
+            failure = "Brak treści XML zgłoszenia"  # Payload was purged
+        else:
+            failure = None
+        if failure is not None:
+            logger.error(f"Cannot send KSeF submission {submission_id}: {failure}")
+            ksef_submissions.set_status(db, submission, "ERROR")
+            submission.details = failure
+            db.commit()
+            return {"status": submission.status, "submission_id": submission_id}
 
-    def delay(self, *args, **kwargs):
-        """Mock delay method"""
-        logger.info(f"Mock task called with args: {args}, kwargs: {kwargs}")
-        return self
+        client = KSeFClient(company)
+        result = run_async(client.submit_invoice({"xml_content": xml_content}))
 
-    def apply_async(self, *args, **kwargs):
-        """Mock apply_async method"""
-        logger.info(f"Mock task apply_async called with args: {args}, kwargs: {kwargs}")
-        return self
+        if result.get("success"):
+            submission.reference_number = result.get("reference_number")
+            schedule_first_poll(submission)
+        elif result.get("status") == "rejected":
+            ksef_submissions.set_status(db, submission, "ERROR")
+            submission.details = result.get("error")
+        else:
+            raise KSeFTransientError(result.get("error") or result.get("message"))
 
+        db.commit()
+        return {"status": submission.status, "submission_id": submission_id}
+    finally:
+        db.close()
 
-def _submit_invoice_task(invoice_id: str, company_id: str) -> Any:
-    """Submit invoice to KSeF - mock implementation"""
-    logger.info(f"Submitting invoice {invoice_id} for company {company_id}")
-    # In production, this would submit to KSeF API
-    return {"status": "submitted", "invoice_id": invoice_id}
 
+@celery_app.task(name="ksef.dead_letter")
+def dead_letter_task(
+    task_name: str, args: list, kwargs: dict, error: str
+) -> Dict[str, Any]:
+    """
+    Replay a dead-lettered job.
 
-# Create mock task instances
-submit_invoice_task = MockTask()
+    Jobs wait in the ``ksef.dead_letter`` queue, which regular workers do not
+    consume. After the cause is fixed, drain it with
+    ``python -m app.workers.worker --queues ksef.dead_letter``.
+    """
+    logger.warning(f"Replaying dead-lettered {task_name}{tuple(args)} ({error})")
+    celery_app.send_task(task_name, args=args, kwargs=kwargs)
+    return {"replayed": task_name}
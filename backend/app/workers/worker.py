@@ -0,0 +1,43 @@
+"""
+Worker process entry point
+
+Runs KSeF submission jobs outside the API processes; scale throughput by
+starting more workers (or raising ``--concurrency``)::
+
+    python -m app.workers.worker --concurrency 8
+    python -m app.workers.worker --queues ksef.dead_letter  # replay DLQ
+"""
+
+import argparse
+from typing import List, Optional
+
+from app.config import settings
+from app.workers.celery_app import KSEF_QUEUE, celery_app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="PolComply background worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.WORKER_CONCURRENCY,
+        help="Number of jobs executed in parallel by this worker",
+    )
+    parser.add_argument(
+        "--queues", default=KSEF_QUEUE, help="Comma-separated queues to consume"
+    )
+    parser.add_argument("--loglevel", default="INFO")
+    args = parser.parse_args(argv)
+
+    celery_app.worker_main(
+        [
+            "worker",
+            f"--concurrency={args.concurrency}",
+            f"--queues={args.queues}",
+            f"--loglevel={args.loglevel}",
+        ]
+    )
+
+
+if __name__ == "__main__":
+    main()
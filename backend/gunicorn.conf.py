@@ -0,0 +1,37 @@
+"""
+Gunicorn configuration for the PolComply API
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app is imported once in the master (``preload_app``), which also compiles
+the FA schemas; workers are forked afterwards and share them copy-on-write.
+
+Set ``PROMETHEUS_MULTIPROC_DIR`` to an empty directory so ``/metrics``
+aggregates the samples of all workers (see ``app.metrics``).
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+preload_app = True
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's reach, so GC passes
+    # in the workers don't write to (and so copy) the shared pages
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of a dead worker; its counters stay in the totals
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
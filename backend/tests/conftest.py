@@ -1,16 +1,35 @@
 """Pytest configuration and fixtures"""
 
+from datetime import datetime, timedelta
+
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 from app.main import app
+from app.config import settings
 from app.database import get_db, Base
 from app.models.user import User
 from app.models.company import Company, UserCompany
+from app.models.invoice import Invoice
 from app.utils.auth import create_access_token
 
 
+# Models use PostgreSQL UUID columns; store them as hex strings on SQLite
+@compiles(UUID, "sqlite")
+def _compile_uuid_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+# Tests hit the API far faster than any client may; test_rate_limit.py opts in
+settings.RATE_LIMIT_ENABLED = False
+
+# No background probes of Redis and the broker; test_health.py opts in
+settings.HEALTH_CHECKS_ENABLED = False
+
+
 # Test database setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(
@@ -64,7 +83,7 @@ def test_user(db_session):
     """Create test user"""
     user = User(
         email="test@example.com",
-        password_hash="hashed_password",
+        hashed_password="hashed_password",
         first_name="Test",
         last_name="User",
         role="accountant",
@@ -94,6 +113,53 @@ def test_company(db_session):
     return company
 
 
+@pytest.fixture
+def make_company(db_session):
+    """Factory of committed companies, sellers by default"""
+
+    def make(nip="5260305408", name="Seller", **fields):
+        company = Company(nip=nip, name=name, address={"city": "Warszawa"}, **fields)
+        db_session.add(company)
+        db_session.commit()
+        return company
+
+    return make
+
+
+@pytest.fixture
+def make_invoice(db_session, test_user):
+    """Factory of invoices created by ``test_user``; flushed, not committed"""
+
+    def make(
+        company,
+        invoice_number="FV/2024/001",
+        issue_date=datetime(2024, 1, 15),
+        contractor_nip="7792439665",
+        items=(),
+        ksef_status="pending",
+    ):
+        invoice = Invoice(
+            company_id=company.id,
+            invoice_number=invoice_number,
+            issue_date=issue_date,
+            sale_date=issue_date,
+            due_date=issue_date + timedelta(days=31),
+            contractor_data={"nip": contractor_nip, "name": "Kontrahent"},
+            items=list(items),
+            net_amount=0,
+            vat_amount=0,
+            gross_amount=0,
+            payment_method="transfer",
+            created_by=test_user.id,
+            ksef_status=ksef_status,
+        )
+        db_session.add(invoice)
+        db_session.flush()
+        return invoice
+
+    return make
+
+
 @pytest.fixture
 def test_user_company(db_session, test_user, test_company):
     """Create user-company relationship"""
@@ -0,0 +1,112 @@
+"""Tests for the background health monitor and the health endpoints"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main
+import app.routers.validate
+from app.config import settings
+from app.health import HealthMonitor
+
+
+class Probes:
+    """Fake probes counting their calls; ``failing`` ones raise"""
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = set()
+
+    def probe(self, name, details=None):
+        def run():
+            self.calls += 1
+            if name in self.failing:
+                raise RuntimeError(f"{name} down")
+            return details
+
+        return run
+
+    def monitor(self) -> HealthMonitor:
+        return HealthMonitor(
+            {
+                "database": self.probe("database", {}),
+                "redis": self.probe("redis"),  # not configured: skipped
+                "schemas": self.probe("schemas", {"versions": ["FA-3"]}),
+                "queue": self.probe("queue", {"depth": {"ksef": 0}}),
+            },
+            interval=5.0,
+        )
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    monkeypatch.setattr(settings, "HEALTH_CHECKS_ENABLED", True)
+    return Probes()
+
+
+@pytest.fixture
+def client(probes, monkeypatch):
+    monitor = probes.monitor()
+    asyncio.run(monitor.check())
+    monkeypatch.setattr(app.main, "health_monitor", monitor)
+    monkeypatch.setattr(app.routers.validate, "health_monitor", monitor)
+    return TestClient(app.main.app)
+
+
+def test_health_answers_from_cached_results(client, probes) -> None:
+    calls = probes.calls
+
+    responses = [client.get("/health") for _ in range(5)]
+
+    assert probes.calls == calls
+    body = responses[-1].json()
+    assert responses[-1].status_code == 200
+    assert body["status"] == "healthy"
+    assert body["database"] == "connected"
+    assert body["redis"] == "not configured"
+    assert body["checks"]["queue"]["depth"] == {"ksef": 0}
+
+    validate = client.get("/api/validate/health").json()
+    assert validate["schema_available"] is True
+    assert validate["schema_versions"] == ["FA-3"]
+
+
+@pytest.mark.parametrize(
+    "failing, status, code",
+    [({"queue"}, "degraded", 200), ({"database"}, "unhealthy", 503)],
+)
+def test_failed_probes(client, probes, failing, status, code) -> None:
+    probes.failing = failing
+    asyncio.run(app.main.health_monitor.check())
+
+    response = client.get("/health")
+
+    assert response.status_code == code
+    assert response.json()["status"] == status
+    name = next(iter(failing))
+    assert response.json()["checks"][name]["error"] == f"{name} down"
+
+
+def test_timeouts_and_stale_results(probes) -> None:
+    def hang():
+        time.sleep(0.5)
+
+    monitor = HealthMonitor({"database": hang}, interval=5.0, timeout=0.05)
+    assert monitor.status() == "starting"
+
+    async def two_rounds():
+        first = await monitor.check()
+        return first["database"], (await monitor.check())["database"]
+
+    first, second = asyncio.run(two_rounds())
+    assert first.status == "failed"
+    assert "Timed out" in first.error
+    # The hanging probe's thread is not started again while it is busy
+    assert second.error == "Previous probe still running"
+
+    monitor = probes.monitor()
+    asyncio.run(monitor.check())
+    assert monitor.status() == "healthy"
+    assert monitor.status(now=time.time() + 60) == "unhealthy"
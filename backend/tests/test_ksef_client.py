@@ -0,0 +1,162 @@
+"""Tests for KSeFClient against a local KSeF stand-in server"""
+
+import asyncio
+import base64
+from collections import Counter
+
+import httpx
+import pytest
+from fastapi import FastAPI, Header, HTTPException, Request
+
+from app.models.company import Company
+from app.services import ksef_client
+from app.services.ksef_client import KSeFClient, KSeFError
+
+
+def make_standin() -> tuple[FastAPI, Counter]:
+    """Minimal stand-in for the KSeF interactive session API"""
+    standin = FastAPI()
+    calls: Counter = Counter()
+
+    @standin.post("/api/online/Session/AuthorisationChallenge")
+    async def challenge():
+        calls["challenge"] += 1
+        return {"timestamp": "2024-01-15T10:00:00.000Z", "challenge": "C-1"}
+
+    @standin.post("/api/online/Session/InitToken")
+    async def init_token(request: Request):
+        calls["init"] += 1
+        body = (await request.body()).decode("utf-8")
+        token = body.split("<Token>")[1].split("</Token>")[0]
+        assert base64.b64decode(token).decode().startswith("secret-token|")
+        return {
+            "referenceNumber": f"S-{calls['init']}",
+            "sessionToken": {"token": f"session-{calls['init']}"},
+        }
+
+    @standin.put("/api/online/Invoice/Send")
+    async def send(request: Request, sessiontoken: str = Header(None)):
+        calls["send"] += 1
+        if sessiontoken is None:
+            raise HTTPException(status_code=401)
+        payload = await request.json()
+        body = base64.b64decode(payload["invoicePayload"]["invoiceBody"])
+        if b"BROKEN" in body:
+            raise HTTPException(status_code=400, detail="invalid FA(3)")
+        return {"elementReferenceNumber": f"E-{calls['send']}"}
+
+    @standin.get("/api/online/Invoice/Status/{reference}")
+    async def invoice_status(reference: str):
+        return {"processingCode": 200, "invoiceStatus": {"ksefReferenceNumber": "K-1"}}
+
+    @standin.get("/api/online/Session/Terminate")
+    async def terminate():
+        calls["terminate"] += 1
+        return {"processingCode": 200}
+
+    return standin, calls
+
+
+@pytest.fixture(autouse=True)
+def clear_sessions():
+    ksef_client._sessions.clear()
+    ksef_client._session_locks.clear()
+    yield
+    ksef_client._sessions.clear()
+    ksef_client._session_locks.clear()
+
+
+def _company() -> Company:
+    return Company(nip="5260305408", ksef_token="secret-token", ksef_environment="test")
+
+
+def _run(coro_factory):
+    standin, calls = make_standin()
+
+    async def main():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=standin), base_url="http://ksef.local"
+        ) as http:
+            return await coro_factory(KSeFClient(_company(), http_client=http))
+
+    return asyncio.run(main()), calls
+
+
+def test_session_is_reused_across_invoices():
+    async def scenario(client):
+        first = await client.submit_invoice({"xml_content": "<Faktura/>"})
+        second = await client.submit_invoice({"xml_content": b"<Faktura/>"})
+        return first, second
+
+    (first, second), calls = _run(scenario)
+
+    assert first["status"] == second["status"] == "submitted"
+    assert first["reference_number"] != second["reference_number"]
+    assert calls["init"] == 1
+    assert calls["send"] == 2
+
+
+def test_batch_submission_uses_one_session():
+    async def scenario(client):
+        invoices = [{"xml_content": f"<Faktura n='{i}'/>"} for i in range(10)]
+        invoices.append({"xml_content": "<Faktura>BROKEN</Faktura>"})
+        return await client.submit_invoices(invoices)
+
+    results, calls = _run(scenario)
+
+    assert [r["status"] for r in results] == ["submitted"] * 10 + ["rejected"]
+    assert calls["challenge"] == calls["init"] == 1
+    assert calls["terminate"] == 1
+    assert ksef_client._sessions == {}
+
+
+def test_batch_leaves_the_cached_session_open():
+    async def scenario(client):
+        # Another job sends in the cached session before and during the batch
+        await client.submit_invoice({"xml_content": "<Faktura/>"})
+        shared = ksef_client._sessions[(client.environment, client.nip)]
+        batch, single = await asyncio.gather(
+            client.submit_invoices([{"xml_content": "<Faktura/>"}] * 3),
+            client.submit_invoice({"xml_content": "<Faktura/>"}),
+        )
+        after = await client.submit_invoice({"xml_content": "<Faktura/>"})
+        return shared, batch, single, after
+
+    (shared, batch, single, after), calls = _run(scenario)
+
+    assert [r["status"] for r in batch] == ["submitted"] * 3
+    assert single["status"] == after["status"] == "submitted"
+    # The batch had a session of its own and closed only that one
+    assert calls["init"] == 2
+    assert calls["terminate"] == 1
+    assert list(ksef_client._sessions.values()) == [shared]
+
+
+def test_status_and_missing_xml():
+    async def scenario(client):
+        status = await client.get_invoice_status("E-1")
+        with pytest.raises(KSeFError):
+            await client.submit_invoice({"invoice_number": "FV/1"})
+        return status
+
+    status, _ = _run(scenario)
+
+    assert status["status"] == "accepted"
+    assert status["upo"] == "K-1"
+
+
+def test_unreachable_server_is_transient():
+    async def scenario(client):
+        return await client.submit_invoice({"xml_content": "<Faktura/>"})
+
+    async def main():
+        transport = httpx.MockTransport(
+            lambda request: (_ for _ in ()).throw(httpx.ConnectError("refused"))
+        )
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://ksef.local"
+        ) as http:
+            return await scenario(KSeFClient(_company(), http_client=http))
+
+    result = asyncio.run(main())
+    assert result["status"] == "error"
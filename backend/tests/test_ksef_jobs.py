@@ -0,0 +1,200 @@
+"""Tests for the KSeF submission job queue"""
+
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import httpx
+import pytest
+from lxml import etree
+
+from app.config import settings
+from app.models.company import Company
+from app.models.ksef import KSeFSubmission
+from app.services import ksef_client, ksef_submissions
+from app.services.ksef_client import KSeFClient
+from app.services.ksef_poller import KSeFStatusPoller
+from app.workers import tasks
+from app.workers.celery_app import DEAD_LETTER_QUEUE, celery_app
+
+
+@pytest.fixture
+def eager_queue(db_session, monkeypatch):
+    """Run jobs in-process against the test database session"""
+    monkeypatch.setitem(celery_app.conf, "task_always_eager", True)
+    monkeypatch.setattr(tasks, "SessionLocal", lambda: db_session)
+    monkeypatch.setattr(db_session, "close", lambda: None)
+
+
+@pytest.fixture
+def invoice(db_session, make_company, make_invoice):
+    invoice = make_invoice(make_company())
+    db_session.commit()
+    return invoice
+
+
+def _fake_submit(results):
+    async def submit_invoice(self, invoice_data):
+        return results.pop(0)
+
+    return submit_invoice
+
+
+def test_submit_retries_transient_errors(eager_queue, invoice, monkeypatch):
+    results = [
+        {"success": False, "status": "error", "error": "503"},
+        {"success": True, "status": "accepted", "upo": "UPO-1"},
+    ]
+    monkeypatch.setattr(KSeFClient, "submit_invoice", _fake_submit(results))
+
+    tasks.submit_invoice_task.delay(str(invoice.id), str(invoice.company_id))
+
+    assert results == []
+    assert invoice.ksef_status == "accepted"
+    assert invoice.ksef_upo == "UPO-1"
+
+
+def test_rejection_is_final(eager_queue, invoice, monkeypatch):
+    results = [{"success": False, "status": "rejected", "error": "Błąd FA(3)"}]
+    monkeypatch.setattr(KSeFClient, "submit_invoice", _fake_submit(results))
+
+    tasks.submit_invoice_task.delay(str(invoice.id), str(invoice.company_id))
+    # Redelivery of the same job must not submit twice
+    tasks.submit_invoice_task.delay(str(invoice.id), str(invoice.company_id))
+
+    assert invoice.ksef_status == "rejected"
+    assert invoice.ksef_error == "Błąd FA(3)"
+
+
+def test_exhausted_retries_go_to_dead_letter_queue(eager_queue, invoice, monkeypatch):
+    results = [{"success": False, "status": "error", "error": "timeout"}] * 20
+    monkeypatch.setattr(KSeFClient, "submit_invoice", _fake_submit(list(results)))
+    dead_letters = []
+    monkeypatch.setattr(
+        tasks.dead_letter_task,
+        "apply_async",
+        lambda args, queue: dead_letters.append((args, queue)),
+    )
+
+    tasks.submit_invoice_task.delay(str(invoice.id), str(invoice.company_id))
+
+    assert len(dead_letters) == 1
+    (task_name, args, _kwargs, error), queue = dead_letters[0]
+    assert task_name == "ksef.submit_invoice"
+    assert args == [str(invoice.id), str(invoice.company_id)]
+    assert error == "timeout"
+    assert queue == DEAD_LETTER_QUEUE
+    assert invoice.ksef_status == "pending"
+
+
+def test_submit_sends_fa3_xml_of_the_invoice(
+    eager_queue, invoice, db_session, monkeypatch
+):
+    sent = []
+
+    def ksef(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/api/online/Session/AuthorisationChallenge":
+            return httpx.Response(
+                200, json={"timestamp": "1705312800000", "challenge": "C-1"}
+            )
+        if path == "/api/online/Session/InitToken":
+            return httpx.Response(
+                200,
+                json={"referenceNumber": "S-1", "sessionToken": {"token": "T-1"}},
+            )
+        if path == "/api/online/Invoice/Send":
+            assert request.headers["SessionToken"] == "T-1"
+            payload = json.loads(request.content)
+            sent.append(base64.b64decode(payload["invoicePayload"]["invoiceBody"]))
+            return httpx.Response(200, json={"elementReferenceNumber": "E-1"})
+        return httpx.Response(404)
+
+    http = httpx.AsyncClient(
+        transport=httpx.MockTransport(ksef), base_url="http://ksef.local"
+    )
+    monkeypatch.setattr(ksef_client, "get_http_client", lambda base_url: http)
+    monkeypatch.setattr(ksef_client, "_sessions", {})
+    monkeypatch.setattr(ksef_client, "_session_locks", {})
+    db_session.get(Company, invoice.company_id).ksef_token = "secret-token"
+    db_session.commit()
+
+    tasks.submit_invoice_task.delay(str(invoice.id), str(invoice.company_id))
+
+    assert invoice.ksef_status == "submitted"
+    assert len(sent) == 1
+    document = etree.fromstring(sent[0])
+    ns = {"tns": "http://crd.gov.pl/wzor/2023/06/21/12348/"}
+    assert document.tag == f"{{{ns['tns']}}}Faktura"
+    assert document.findtext("tns:Naglowek/tns:P_1", namespaces=ns) == "FV/2024/001"
+    assert (
+        document.findtext("tns:Nabywca/tns:DaneIdentyfikacyjne/tns:NIP", namespaces=ns)
+        == "7792439665"
+    )
+    # The document sent is kept with the submission the poller follows
+    submission = db_session.query(KSeFSubmission).one()
+    assert submission.reference_number == "E-1"
+    assert ksef_submissions.payload_xml(db_session, submission).encode() == sent[0]
+
+
+@pytest.mark.parametrize("missing", ["company", "payload"])
+def test_unsendable_submission_fails_without_retry(
+    eager_queue, invoice, db_session, monkeypatch, missing
+):
+    monkeypatch.setattr(KSeFClient, "submit_invoice", _fake_submit([]))
+    submission = ksef_submissions.create_submission(
+        db_session,
+        xml_content=None if missing == "payload" else "<Faktura/>",
+        company_id=uuid4() if missing == "company" else invoice.company_id,
+        nip="5260305408",
+    )
+    db_session.commit()
+
+    result = tasks.send_submission_task.delay(str(submission.id)).get()
+
+    assert result["status"] == "ERROR"
+    assert submission.status == "ERROR"
+    assert submission.details
+    assert ksef_submissions.status_counts(db_session) == {"ERROR": 1}
+
+
+def test_redelivery_after_poll_timeout_does_not_resubmit(
+    eager_queue, invoice, db_session, monkeypatch
+):
+    class Processing:
+        def __init__(self, company):
+            pass
+
+        async def get_invoice_status(self, reference_number):
+            return {"success": True, "status": "processing"}
+
+    invoice.ksef_status = "submitted"
+    ksef_submissions.create_submission(
+        db_session,
+        invoice_id=invoice.id,
+        company_id=invoice.company_id,
+        nip="5260305408",
+        reference_number="E-1",
+        poll_attempts=settings.KSEF_POLL_MAX_ATTEMPTS - 1,
+        next_poll_at=datetime.utcnow() - timedelta(seconds=1),
+    )
+    db_session.commit()
+    poller = KSeFStatusPoller(
+        session_factory=lambda: db_session,
+        rate_per_second=1000,
+        client_factory=Processing,
+    )
+    assert asyncio.run(poller.poll_once()) == 1
+    db_session.refresh(invoice)
+    assert invoice.ksef_status == "unknown"
+
+    # The original job is delivered again (acks_late) after the timeout
+    monkeypatch.setattr(KSeFClient, "submit_invoice", _fake_submit([]))
+    result = tasks.submit_invoice_task.delay(
+        str(invoice.id), str(invoice.company_id)
+    ).get()
+
+    assert result["status"] == "unknown"
+    assert invoice.ksef_status == "unknown"
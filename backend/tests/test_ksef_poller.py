@@ -0,0 +1,175 @@
+"""Tests for the central KSeF status poller"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.config import settings
+from app.models.invoice import Invoice
+from app.models.ksef import KSeFSubmission
+from app.services import ksef_submissions, vat_aggregates
+from app.services.ksef_poller import (
+    KSeFStatusPoller,
+    next_poll_delay,
+    recheck_timed_out,
+)
+from tests.conftest import engine
+
+
+class FakeClient:
+    """Answers status checks from a reference -> result map"""
+
+    statuses = {}
+    calls = []
+
+    def __init__(self, company):
+        self.company = company
+
+    async def get_invoice_status(self, reference_number):
+        FakeClient.calls.append(reference_number)
+        return FakeClient.statuses[reference_number]
+
+
+@pytest.fixture
+def poller(db_session, monkeypatch):
+    monkeypatch.setattr(db_session, "close", lambda: None)
+    FakeClient.calls = []
+    return KSeFStatusPoller(
+        session_factory=lambda: db_session,
+        rate_per_second=1000,
+        client_factory=FakeClient,
+    )
+
+
+def _due(db_session):
+    """Make every pending submission due now"""
+    past = datetime.utcnow() - timedelta(seconds=1)
+    for submission in db_session.query(KSeFSubmission):
+        submission.next_poll_at = past
+    db_session.commit()
+
+
+def test_poll_interval_backs_off_to_cap():
+    delays = [next_poll_delay(n) for n in range(12)]
+
+    assert delays[0] == settings.KSEF_POLL_INITIAL_INTERVAL_SECONDS
+    assert delays == sorted(delays)
+    assert delays[-1] == settings.KSEF_POLL_MAX_INTERVAL_SECONDS
+
+
+def test_demo_submission_gets_upo(client, db_session, poller):
+    response = client.post(
+        "/ksef/send", json={"xml_content": "<Faktura/>", "nip": "1234567890"}
+    )
+    submission_id = response.json()["submission_id"]
+    assert client.get("/ksef/health").json()["active_submissions"] == 1
+
+    _due(db_session)
+    assert asyncio.run(poller.poll_once()) == 1
+
+    data = client.get("/ksef/status", params={"submission_id": submission_id}).json()
+    assert data["status"] == "UPO"
+    assert data["upo_reference"] == f"UPO-{submission_id[:8].upper()}"
+    assert client.get("/ksef/health").json()["active_submissions"] == 0
+    assert FakeClient.calls == []
+    assert client.get("/ksef/status", params={"submission_id": "x"}).status_code == 404
+
+
+def test_batch_outcomes_are_written_back(
+    db_session, poller, make_company, make_invoice
+):
+    company = make_company(ksef_token="t")
+
+    submissions = {}
+    for reference in ("E-ACC", "E-WAIT", "E-REJ"):
+        invoice = make_invoice(company, f"FV/{reference}", ksef_status="submitted")
+        submissions[reference] = KSeFSubmission(
+            invoice_id=invoice.id,
+            company_id=company.id,
+            nip=company.nip,
+            reference_number=reference,
+        )
+    db_session.add_all(submissions.values())
+    db_session.commit()
+    _due(db_session)
+
+    FakeClient.statuses = {
+        "E-ACC": {"success": True, "status": "accepted", "upo": "K-1"},
+        "E-WAIT": {"success": True, "status": "processing"},
+        "E-REJ": {"success": False, "status": "rejected", "error": "Błąd FA(3)"},
+    }
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert asyncio.run(poller.poll_once()) == 3
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    # The batch is claimed with one query, not reloaded row by row
+    reads = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len([s for s in reads if "FROM ksef_submissions" in s]) == 1
+
+    # Nothing is due again until the pending reference's backoff elapses
+    assert asyncio.run(poller.poll_once()) == 0
+
+    accepted, waiting, rejected = (submissions[r] for r in ("E-ACC", "E-WAIT", "E-REJ"))
+    assert accepted.status == "UPO"
+    assert accepted.upo_reference == "K-1"
+    assert db_session.get(Invoice, accepted.invoice_id).ksef_upo == "K-1"
+
+    assert waiting.status == "PENDING"
+    assert waiting.poll_attempts == 1
+    assert waiting.next_poll_at > datetime.utcnow()
+
+    assert rejected.status == "ERROR"
+    invoice = db_session.get(Invoice, rejected.invoice_id)
+    assert invoice.ksef_status == "rejected"
+    assert invoice.ksef_error == "Błąd FA(3)"
+    assert sorted(FakeClient.calls) == ["E-ACC", "E-REJ", "E-WAIT"]
+
+
+def test_polling_timeout_keeps_invoice_and_can_be_rechecked(
+    db_session, poller, make_company, make_invoice
+):
+    company = make_company(ksef_token="t")
+    items = [{"vat_rate": 23, "net_amount": 100, "vat_amount": 23}]
+    invoice = make_invoice(company, "FV/E-SLOW", items=items, ksef_status="submitted")
+    vat_aggregates.on_invoice_created(db_session, invoice)
+    submission = ksef_submissions.create_submission(
+        db_session,
+        invoice_id=invoice.id,
+        company_id=company.id,
+        nip=company.nip,
+        reference_number="E-SLOW",
+        poll_attempts=settings.KSEF_POLL_MAX_ATTEMPTS - 1,
+    )
+    db_session.commit()
+    _due(db_session)
+
+    FakeClient.statuses = {"E-SLOW": {"success": True, "status": "processing"}}
+    assert asyncio.run(poller.poll_once()) == 1
+
+    assert submission.status == "TIMEOUT"
+    assert db_session.get(Invoice, invoice.id).ksef_status == "unknown"
+    summary = vat_aggregates.get_period_summary(db_session, company.id, "2024-01")
+    assert summary["vat_due"] == 23.0
+    assert ksef_submissions.status_counts(db_session) == {"TIMEOUT": 1}
+
+    assert recheck_timed_out(db_session) == 1
+    assert submission.status == "PENDING"
+    assert submission.poll_attempts == 0
+    assert db_session.get(Invoice, invoice.id).ksef_status == "submitted"
+    assert ksef_submissions.status_counts(db_session) == {"PENDING": 1}
+
+    FakeClient.statuses = {
+        "E-SLOW": {"success": False, "status": "rejected", "error": "Błąd FA(3)"}
+    }
+    assert asyncio.run(poller.poll_once()) == 1
+    assert submission.status == "ERROR"
+    summary = vat_aggregates.get_period_summary(db_session, company.id, "2024-01")
+    assert summary["vat_due"] == 0.0
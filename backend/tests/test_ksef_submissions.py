@@ -0,0 +1,52 @@
+"""Tests for the shared KSeF submission store"""
+
+from datetime import datetime, timedelta
+
+from app.models.ksef import KSeFPayload, KSeFSubmission
+from app.services import ksef_submissions
+
+
+def test_payloads_are_stored_once_per_hash(client, db_session):
+    ids = [
+        client.post(
+            "/ksef/send", json={"xml_content": "<Faktura/>", "nip": "1234567890"}
+        ).json()["submission_id"]
+        for _ in range(3)
+    ]
+
+    assert db_session.query(KSeFPayload).count() == 1
+    submission = ksef_submissions.get_submission(
+        db_session, db_session.query(KSeFSubmission).first().id
+    )
+    assert ksef_submissions.payload_xml(db_session, submission) == "<Faktura/>"
+    assert ksef_submissions.status_counts(db_session) == {"PENDING": 3}
+    health = client.get("/ksef/health").json()
+    assert health["active_submissions"] == 3
+    assert len(set(ids)) == 3
+
+
+def test_purge_evicts_expired_submissions_and_orphan_payloads(db_session):
+    old = ksef_submissions.create_submission(
+        db_session, xml_content="<Faktura n='1'/>", nip="1234567890"
+    )
+    shared_old = ksef_submissions.create_submission(
+        db_session, xml_content="<Faktura n='2'/>", nip="1234567890"
+    )
+    fresh = ksef_submissions.create_submission(
+        db_session, xml_content="<Faktura n='2'/>", nip="1234567890"
+    )
+    db_session.flush()
+    ksef_submissions.set_status(db_session, fresh, "UPO")
+    old.expires_at = shared_old.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+    old_id = old.id
+
+    # Expired rows are invisible before the purge runs
+    assert ksef_submissions.get_submission(db_session, old_id) is None
+
+    assert ksef_submissions.purge_expired(db_session, batch_size=1) == 2
+
+    assert db_session.query(KSeFSubmission).all() == [fresh]
+    assert [p.sha256 for p in db_session.query(KSeFPayload)] == [fresh.payload_sha256]
+    assert ksef_submissions.status_counts(db_session) == {"UPO": 1}
+    assert ksef_submissions.recount(db_session) == {"UPO": 1}
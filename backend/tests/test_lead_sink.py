@@ -0,0 +1,91 @@
+"""Tests for the batched lead capture sink"""
+
+import asyncio
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.lead_sink import LeadSink, lead_sink
+
+LEAD = {
+    "first_name": "Anna",
+    "last_name": "Nowak",
+    "email": "anna@example.com",
+    "phone": "",
+    "company": "Firma",
+    "company_size": "10-50",
+    "marketing": "true",
+}
+
+
+def _rows(path, table="leads"):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(
+            f"SELECT email, company FROM {table} ORDER BY id"
+        ).fetchall()
+    finally:
+        connection.close()
+
+
+def test_endpoint_queues_and_shutdown_flushes(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(lead_sink, "path", tmp_path / "leads.db")
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/lead",
+            data={"firstName": "Anna", "email": "anna@example.com", "company": "Firma"},
+        )
+        assert response.json() == {"ok": True}
+
+    assert _rows(tmp_path / "leads.db") == [("anna@example.com", "Firma")]
+
+
+def test_concurrent_writers_share_the_table(tmp_path) -> None:
+    path = tmp_path / "leads.db"
+    # Two sinks on one file, as two workers have
+    sinks = [LeadSink(path), LeadSink(path)]
+
+    async def run() -> None:
+        for i in range(50):
+            for n, sink in enumerate(sinks):
+                sink.submit({**LEAD, "email": f"{n}-{i}@example.com"})
+        await asyncio.gather(*(sink.flush() for sink in sinks))
+        for sink in sinks:
+            await sink.stop()
+
+    asyncio.run(run())
+
+    emails = [email for email, _ in _rows(path)]
+    assert sorted(emails) == sorted(
+        f"{n}-{i}@example.com" for n in (0, 1) for i in range(50)
+    )
+
+
+def test_rotates_by_size(tmp_path) -> None:
+    path = tmp_path / "leads.db"
+    sink = LeadSink(path, checkpoint_interval=1e-9, rotate_bytes=1)
+
+    async def run() -> None:
+        sink.submit(LEAD)
+        await sink.flush()
+        await sink.stop()
+
+    asyncio.run(run())
+
+    archives = list(tmp_path.glob("leads-*.db"))
+    assert len(archives) == 1
+    assert _rows(archives[0]) == [("anna@example.com", "Firma")]
+    assert _rows(path) == []
+
+
+def test_bounded_queue_and_failed_writes_are_kept(tmp_path) -> None:
+    (tmp_path / "not-a-dir").write_text("")
+    sink = LeadSink(tmp_path / "not-a-dir" / "leads.db", max_pending=2)
+
+    assert sink.submit(LEAD) and sink.submit(LEAD)
+    assert not sink.submit(LEAD)
+
+    assert asyncio.run(sink.flush()) == 0
+    assert len(sink._pending) == 2
@@ -0,0 +1,55 @@
+"""Tests for the Prometheus metrics endpoint"""
+
+from fastapi.testclient import TestClient
+
+from app import metrics as app_metrics
+from app.database import get_db
+from app.main import app
+from tests.conftest import override_get_db
+
+client = TestClient(app)
+
+INVALID_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Faktura xmlns="http://crd.gov.pl/wzor/2023/06/21/12348/"><Naglowek/></Faktura>"""
+
+
+def _sample(body: str, prefix: str) -> float:
+    """Value of the first exposition line starting with ``prefix``"""
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_count_validations_and_stages(test_db, monkeypatch) -> None:
+    monkeypatch.setattr(app_metrics, "queue_depths", lambda: {"ksef": 3})
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        before = client.get("/metrics").text
+        response = client.post(
+            "/api/validate/xml",
+            files={"file": ("invoice.xml", INVALID_XML, "text/xml")},
+        )
+        assert response.status_code == 200
+        assert not response.json()["ok"]
+
+        metrics = client.get("/metrics")
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    body = metrics.text
+
+    invalid = 'polcomply_documents_validated_total{result="invalid",'
+    assert _sample(body, invalid) == _sample(before, invalid) + 1
+    for stage in ("upload_read", "xml_parse", "xsd_validate", "serialize"):
+        assert f'polcomply_stage_seconds_count{{stage="{stage}"}}' in body
+    assert "polcomply_validation_errors_total{code=" in body
+    assert (
+        'polcomply_http_request_seconds_count{method="POST",'
+        'route="/api/validate/xml",status="200"}' in body
+    )
+    # Gauges are read at scrape time
+    assert "# TYPE polcomply_ksef_submissions gauge" in body
+    assert 'polcomply_queue_depth{queue="ksef"} 3.0' in body
@@ -0,0 +1,92 @@
+"""Tests for password hashing and rehash-on-login"""
+
+import pytest
+
+from app.config import settings
+from app.models.user import User
+from app.utils import passwords
+
+
+@pytest.fixture(autouse=True)
+def fast_bcrypt(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_BCRYPT_ROUNDS", 4)
+
+
+def _user(db_session, hashed_password: str) -> User:
+    user = User(
+        email="login@example.com",
+        hashed_password=hashed_password,
+        first_name="Test",
+        last_name="User",
+        role="accountant",
+    )
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def _login(client, password: str):
+    return client.post(
+        "/v1/auth/login",
+        data={"username": "login@example.com", "password": password},
+    )
+
+
+def test_hash_and_verify() -> None:
+    long_password = "ź" * 50  # 100 bytes, beyond bcrypt's 72
+
+    hashed = passwords.hash_password(long_password)
+
+    assert hashed.startswith("$2b$04$")
+    assert passwords.verify_password(long_password, hashed)
+    assert not passwords.verify_password("wrong", hashed)
+    assert not passwords.verify_password("secret", "not-a-hash")
+
+
+def test_needs_rehash_follows_settings(monkeypatch) -> None:
+    hashed = passwords.hash_password("secret")
+    assert not passwords.needs_rehash(hashed)
+
+    monkeypatch.setattr(settings, "PASSWORD_BCRYPT_ROUNDS", 5)
+    assert passwords.needs_rehash(hashed)
+
+
+def test_login_upgrades_outdated_hash(client, db_session, monkeypatch) -> None:
+    user = _user(db_session, passwords.hash_password("secret"))
+    monkeypatch.setattr(settings, "PASSWORD_BCRYPT_ROUNDS", 5)
+
+    assert _login(client, "wrong").status_code == 401
+    assert user.hashed_password.startswith("$2b$04$")
+
+    response = _login(client, "secret")
+
+    assert response.status_code == 200
+    db_session.refresh(user)
+    assert user.hashed_password.startswith("$2b$05$")
+    assert passwords.verify_password("secret", user.hashed_password)
+
+
+def test_login_is_shed_when_hashing_is_saturated(
+    client, db_session, monkeypatch
+) -> None:
+    _user(db_session, passwords.hash_password("secret"))
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 0)
+
+    response = _login(client, "secret")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_argon2id_upgrade_from_bcrypt(monkeypatch) -> None:
+    pytest.importorskip("argon2")
+    bcrypt_hash = passwords.hash_password("secret")
+    monkeypatch.setattr(settings, "PASSWORD_HASH_SCHEME", "argon2id")
+    monkeypatch.setattr(settings, "PASSWORD_ARGON2_MEMORY_KIB", 1024)
+
+    assert passwords.needs_rehash(bcrypt_hash)
+    argon2_hash = passwords.hash_password("secret")
+    assert argon2_hash.startswith("$argon2id$")
+    assert passwords.verify_password("secret", argon2_hash)
+    assert passwords.verify_password("secret", bcrypt_hash)
+    assert not passwords.needs_rehash(argon2_hash)
@@ -0,0 +1,156 @@
+"""Tests for the cached principal of access tokens"""
+
+import time
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import event
+
+from app.config import settings
+from app.utils import auth
+from app.utils.auth import create_access_token
+from app.utils.principals import (
+    MemoryPrincipalCache,
+    Principal,
+    cache_ttl,
+    principal_cache,
+)
+from tests.conftest import engine
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture
+def user_queries():
+    """Statements reading the users table, as they are executed"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def _summary(client, company, headers):
+    return client.get(
+        "/v1/vat/summary",
+        params={"company_id": str(company.id), "period": "2024-01"},
+        headers=headers,
+    )
+
+
+def test_repeated_requests_skip_users_table(
+    client, test_company, test_user_company, auth_headers, user_queries
+) -> None:
+    assert _summary(client, test_company, auth_headers).status_code == 200
+    assert len(user_queries) == 1
+
+    for _ in range(3):
+        assert _summary(client, test_company, auth_headers).status_code == 200
+    assert len(user_queries) == 1
+
+
+def test_deactivation_invalidates(
+    client, db_session, test_user, test_company, test_user_company, auth_headers
+) -> None:
+    assert _summary(client, test_company, auth_headers).status_code == 200
+
+    test_user.is_active = False
+    db_session.commit()
+
+    response = _summary(client, test_company, auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Nieaktywny użytkownik"
+
+
+def test_deactivation_reaches_other_workers(
+    client,
+    db_session,
+    test_user,
+    test_company,
+    test_user_company,
+    auth_headers,
+    monkeypatch,
+) -> None:
+    # A second worker's cache, which the commit below cannot invalidate
+    other_worker = MemoryPrincipalCache(max_entries=10)
+    monkeypatch.setattr(auth, "principal_cache", other_worker)
+    assert _summary(client, test_company, auth_headers).status_code == 200
+
+    test_user.is_active = False
+    db_session.commit()
+
+    # Served from its cache until the memory TTL runs out
+    assert _summary(client, test_company, auth_headers).status_code == 200
+    later = time.monotonic() + other_worker.max_ttl
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+    response = _summary(client, test_company, auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Nieaktywny użytkownik"
+
+
+def test_membership_change_invalidates(
+    client, db_session, test_user, test_company, test_user_company, auth_headers
+) -> None:
+    assert _summary(client, test_company, auth_headers).status_code == 200
+
+    db_session.delete(test_user_company)
+    db_session.commit()
+
+    assert _summary(client, test_company, auth_headers).status_code == 403
+
+
+def test_ttl_is_bounded_by_token_expiry(monkeypatch) -> None:
+    now = time.time()
+    assert cache_ttl(now + 60, now=now) == 60
+    assert cache_ttl(now + 3600, now=now) == 300
+    assert cache_ttl(now - 1, now=now) < 0
+
+    principal = Principal(uuid4(), "a@example.com", "owner", True, frozenset())
+    cache = MemoryPrincipalCache(max_entries=10)
+    cache.set("expiring", principal, ttl=0.0)
+    assert cache.get("expiring") is None
+    assert settings.AUTH_CACHE_MEMORY_TTL_SECONDS < settings.AUTH_CACHE_TTL_SECONDS
+    cache.set("capped", principal, ttl=300)
+    expires_at, _ = cache._entries["capped"]
+    assert expires_at <= time.monotonic() + settings.AUTH_CACHE_MEMORY_TTL_SECONDS
+
+
+def test_memory_cache_is_bounded() -> None:
+    cache = MemoryPrincipalCache(max_entries=10)
+    users = [uuid4() for _ in range(25)]
+    for i, user_id in enumerate(users):
+        principal = Principal(user_id, f"{i}@example.com", "owner", True, frozenset())
+        cache.set(f"token-{i}", principal, ttl=60)
+
+    assert len(cache._entries) <= 10
+    assert cache.get("token-24") is not None
+    assert cache.get("token-0") is None
+
+    cache.invalidate_user(users[24])
+    assert cache.get("token-24") is None
+
+
+def test_tokens_get_unique_ids(test_user) -> None:
+    from jose import jwt
+
+    from app.utils.auth import ALGORITHM, SECRET_KEY
+
+    claims = [
+        jwt.decode(
+            create_access_token({"sub": str(test_user.id)}, timedelta(minutes=5)),
+            SECRET_KEY,
+            algorithms=[ALGORITHM],
+        )
+        for _ in range(2)
+    ]
+    assert claims[0]["jti"] != claims[1]["jti"]
@@ -0,0 +1,83 @@
+"""Tests for the slow request profiler"""
+
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.config import settings
+
+
+def _busy_endpoint() -> None:
+    deadline = time.perf_counter() + 0.3
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILE_SLOW_REQUEST_SECONDS", 0.1)
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_INTERVAL_SECONDS", 0.01)
+
+    app = FastAPI()
+
+    @app.get("/fast")
+    def fast():
+        return {"ok": True}
+
+    @app.get("/slow")
+    def slow():
+        _busy_endpoint()
+        return {"ok": True}
+
+    profiling.setup_profiling(app)
+    return TestClient(app)
+
+
+def test_token_signature_and_expiry() -> None:
+    token = profiling.profile_token(ttl_seconds=60, now=1000)
+
+    assert profiling.verify_token(token, now=1030)
+    assert not profiling.verify_token(token, now=1061)
+    assert not profiling.verify_token(token[:-1] + "0", now=1030)
+    assert not profiling.verify_token("garbage")
+
+
+def test_only_slow_requests_are_profiled(client, tmp_path) -> None:
+    assert client.get("/fast").status_code == 200
+    assert list(tmp_path.iterdir()) == []
+
+    assert client.get("/slow").status_code == 200
+
+    (profile,) = tmp_path.glob("*-GET-slow-*ms.folded")
+    folded = profile.read_text(encoding="utf-8")
+    assert "_busy_endpoint (tests/test_profiling.py" in folded
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+
+
+def test_signed_header_profiles_any_request(client, tmp_path) -> None:
+    invalid = client.get("/fast", headers={profiling.PROFILE_HEADER: "1.bad"})
+    response = client.get(
+        "/fast", headers={profiling.PROFILE_HEADER: profiling.profile_token()}
+    )
+
+    assert profiling.PROFILE_FILE_HEADER not in invalid.headers
+    name = response.headers[profiling.PROFILE_FILE_HEADER]
+    assert [p.name for p in tmp_path.iterdir()] == [name]
+
+
+def test_retention_keeps_newest_profiles(client, tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "PROFILE_MAX_FILES", 2)
+    token = profiling.profile_token()
+
+    names = [
+        client.get("/fast", headers={profiling.PROFILE_HEADER: token}).headers[
+            profiling.PROFILE_FILE_HEADER
+        ]
+        for _ in range(3)
+    ]
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(names[1:])
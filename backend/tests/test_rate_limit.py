@@ -0,0 +1,126 @@
+"""Tests for per-client rate limiting and fair queuing"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.rate_limit import (
+    AUTHENTICATED,
+    FREE,
+    FairQueue,
+    MemoryBuckets,
+    RateLimitMiddleware,
+    route_class,
+)
+from app.utils.auth import create_access_token
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(settings, "RATE_LIMIT_FREE_PER_MINUTE", 2)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 5)
+
+    app = FastAPI()
+
+    @app.post("/api/validate/xml")
+    def validate():
+        return {"ok": True}
+
+    @app.get("/v1/invoices/")
+    def invoices():
+        return []
+
+    @app.get("/health")
+    def health():
+        return {"status": "healthy"}
+
+    @app.get("/api/validate/health")
+    def validate_health():
+        return {"status": "healthy"}
+
+    app.add_middleware(RateLimitMiddleware)
+    return TestClient(app)
+
+
+def test_route_classes() -> None:
+    assert route_class("/api/validate/xml") == "validate"
+    assert route_class("/v1/auth/login") == "login"
+    assert route_class("/v1/invoices/") == route_class("/ksef/send") == "api"
+    assert route_class("/health") is route_class("/static/app.js") is None
+    # Health checks and metrics are exempt even below a limited prefix
+    assert route_class("/api/validate/health") is None
+    assert route_class("/ksef/health") is route_class("/metrics") is None
+
+
+def test_free_validation_is_limited_per_client(client) -> None:
+    statuses = [client.post("/api/validate/xml").status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 429]
+    limited = client.post("/api/validate/xml")
+    assert int(limited.headers["Retry-After"]) >= 1
+    # Other route classes and unlimited paths have their own budget
+    assert client.get("/v1/invoices/").status_code == 200
+    assert all(client.get("/health").status_code == 200 for _ in range(10))
+    assert all(client.get("/api/validate/health").status_code == 200 for _ in range(10))
+
+
+def test_authenticated_clients_get_their_own_larger_bucket(client) -> None:
+    token = create_access_token({"sub": "user-1"})
+    headers = {"Authorization": f"Bearer {token}"}
+    forged = {"Authorization": "Bearer not-a-token"}
+
+    assert [client.post("/api/validate/xml").status_code for _ in range(3)][-1] == 429
+    # A forged token counts as the anonymous client
+    assert client.post("/api/validate/xml", headers=forged).status_code == 429
+    statuses = [
+        client.post("/api/validate/xml", headers=headers).status_code for _ in range(6)
+    ]
+    assert statuses == [200] * 5 + [429]
+
+
+def test_memory_buckets_refill() -> None:
+    async def scenario():
+        buckets = MemoryBuckets()
+        waits = [await buckets.take("k", 60) for _ in range(61)]
+        return waits
+
+    waits = asyncio.run(scenario())
+
+    assert waits[:60] == [0.0] * 60
+    assert 0 < waits[60] <= 1.0
+
+
+def test_fair_queue_shares_slots_by_weight() -> None:
+    async def scenario():
+        queue = FairQueue(1, {AUTHENTICATED: 4, FREE: 1}, max_waiting=10)
+        assert await queue.acquire(FREE)
+        order = []
+
+        async def request(kind):
+            await queue.acquire(kind)
+            order.append(kind)
+
+        # The free flood arrives first, customers after it
+        tasks = [asyncio.create_task(request(FREE)) for _ in range(10)]
+        tasks += [asyncio.create_task(request(AUTHENTICATED)) for _ in range(8)]
+        await asyncio.sleep(0)
+        overflow = await queue.acquire(FREE)
+        for _ in range(10):
+            queue.release()
+            await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return order, overflow, queue.waiting(FREE), queue.waiting(AUTHENTICATED)
+
+    order, overflow, free_waiting, authenticated_waiting = asyncio.run(scenario())
+
+    assert overflow is False
+    assert order.count(AUTHENTICATED) == 8
+    assert order[:5].count(AUTHENTICATED) == 4
+    assert free_waiting == authenticated_waiting == 0
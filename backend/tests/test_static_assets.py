@@ -0,0 +1,111 @@
+"""Tests for precompressed static assets and selective runtime gzip"""
+
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compression import SelectiveGZipMiddleware
+from app.main import app, static_assets
+
+UPLOAD_PAGE = (
+    Path(__file__).resolve().parents[1] / "static" / "upload.html"
+).read_bytes()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_upload_page_is_precompressed_and_revalidated(client) -> None:
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.content == UPLOAD_PAGE
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"] == "text/html; charset=utf-8"
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    plain = client.get("/static/upload.html", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.content == UPLOAD_PAGE
+    assert plain.headers["etag"] != response.headers["etag"]
+
+
+def test_if_none_match(client) -> None:
+    etag = client.get("/", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+
+    response = client.get(
+        "/", headers={"Accept-Encoding": "gzip", "If-None-Match": f"W/{etag}"}
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_hashed_url_is_immutable(client) -> None:
+    url = static_assets.url("upload.html")
+    assert url.startswith("/static/upload.") and url.endswith(".html")
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert client.get("/static/missing.js").status_code == 404
+    assert client.post(url).status_code == 405
+    head = client.head(url, headers={"Accept-Encoding": "identity"})
+    assert head.content == b""
+    assert head.headers["content-length"] == str(len(UPLOAD_PAGE))
+
+
+def test_brotli_is_preferred(client) -> None:
+    pytest.importorskip("brotli")
+
+    response = client.get("/", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["content-encoding"] == "br"
+
+
+def test_runtime_gzip_skips_large_and_streamed_json() -> None:
+    small = {"items": ["x" * 100] * 20}
+    large = {"items": ["x" * 100] * 2000}
+    api = FastAPI()
+    api.add_middleware(SelectiveGZipMiddleware, minimum_size=500, max_json_bytes=10_000)
+
+    @api.get("/small")
+    def small_json():
+        return JSONResponse(small)
+
+    @api.get("/large")
+    def large_json():
+        return JSONResponse(large)
+
+    @api.get("/stream")
+    def stream_json():
+        return StreamingResponse(
+            iter([b'{"items": [', b'"x", ' * 500, b'"x"]}']),
+            media_type="application/json",
+        )
+
+    @api.get("/text")
+    def text():
+        return PlainTextResponse("x" * 20_000)
+
+    client = TestClient(api)
+    encodings = {
+        path: client.get(path, headers={"Accept-Encoding": "gzip"}).headers.get(
+            "content-encoding"
+        )
+        for path in ("/small", "/large", "/stream", "/text")
+    }
+    assert encodings == {
+        "/small": "gzip",
+        "/large": None,
+        "/stream": None,
+        "/text": "gzip",
+    }
@@ -0,0 +1,92 @@
+"""Tests for the request body limit and gzip request decoding"""
+
+import gzip
+import hashlib
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from app.main import app as main_app
+from app.uploads import RequestBodyLimitMiddleware
+
+LIMIT = 1000
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile):
+        return {"size": len(await file.read())}
+
+    @app.post("/raw")
+    async def raw(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(RequestBodyLimitMiddleware, max_bytes=LIMIT)
+    return TestClient(app)
+
+
+def test_declared_length_over_limit_is_rejected(client) -> None:
+    response = client.post("/raw", content=b"x" * (LIMIT + 1))
+
+    assert response.status_code == 413
+    assert client.post("/raw", content=b"x" * LIMIT).json() == {"size": LIMIT}
+
+
+def test_streamed_body_over_limit_is_rejected(client) -> None:
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 200
+
+    # No Content-Length: the limit is enforced while the body arrives
+    assert client.post("/raw", content=chunks()).status_code == 413
+    # Multipart parsing errors are replaced by the 413 as well
+    response = client.post("/upload", files={"file": ("a.xml", b"x" * 2000)})
+    assert response.status_code == 413
+
+
+def test_gzip_bodies_are_decoded_and_capped(client) -> None:
+    headers = {"Content-Encoding": "gzip"}
+
+    ok = client.post("/raw", content=gzip.compress(b"x" * 900), headers=headers)
+    bomb = client.post("/raw", content=gzip.compress(b"x" * 100_000), headers=headers)
+    broken = client.post("/raw", content=b"not gzip", headers=headers)
+    truncated = client.post(
+        "/raw", content=gzip.compress(b"x" * 900)[:-8], headers=headers
+    )
+
+    assert ok.json() == {"size": 900}
+    assert bomb.status_code == 413
+    assert broken.status_code == truncated.status_code == 400
+    assert (
+        client.post(
+            "/raw", content=b"x", headers={"Content-Encoding": "br"}
+        ).status_code
+        == 415
+    )
+
+
+def test_validate_xml_accepts_gzip_multipart_and_hashes_document() -> None:
+    document = (Path(__file__).parent.parent / "test_invoice.xml").read_bytes()
+    request = TestClient(main_app).build_request(
+        "POST",
+        "/api/validate/xml",
+        files={"file": ("invoice.xml", document, "text/xml")},
+    )
+    body = gzip.compress(request.read())
+    headers = {
+        "Content-Type": request.headers["Content-Type"],
+        "Content-Encoding": "gzip",
+    }
+
+    response = TestClient(main_app).post(
+        "/api/validate/xml", content=body, headers=headers
+    )
+
+    assert response.status_code == 200
+    assert response.json()["ok"] is True
+    assert response.json()["summary"]["sha256"] == hashlib.sha256(document).hexdigest()
@@ -118,3 +118,17 @@ def test_validate_xml_invalid_nip() -> None:
 def test_validate_endpoint_no_file() -> None:
     response = client.post("/api/validate/xml")
     assert response.status_code == 422
+
+
+def test_validate_xml_report_is_escaped_html() -> None:
+    truncated_xml = b'<Faktura xmlns="http://crd.gov.pl/wzor/2023/06/21/12348/">'
+
+    response = client.post(
+        "/api/validate/xml/report",
+        files={"file": ("<b>.xml", truncated_xml, "text/xml")},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+    assert "&lt;b&gt;.xml" in response.text
+    assert "<b>.xml" not in response.text
+    assert "XML_SYNTAX_ERROR" in response.text
@@ -0,0 +1,84 @@
+"""Tests for materialized VAT period aggregates"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.models.vat import VatPeriodAggregate
+from app.services import vat_aggregates
+from app.services.invoice_service import InvoiceService
+
+
+ITEMS = [
+    {"quantity": "2", "net_price": "100.00", "vat_rate": 23},
+    {"quantity": "1", "net_price": "50.00", "vat_rate": 8},
+]
+
+
+@pytest.fixture
+def add_invoice(db_session, make_invoice):
+    """Commit an invoice together with its aggregate updates"""
+
+    def add(company, number, contractor_nip, issued):
+        invoice = make_invoice(company, number, issued, contractor_nip, ITEMS)
+        vat_aggregates.on_invoice_created(db_session, invoice)
+        db_session.commit()
+        return invoice
+
+    return add
+
+
+def test_create_updates_seller_and_buyer_aggregates(
+    db_session, make_company, add_invoice
+):
+    seller = make_company()
+    buyer = make_company("7792439665", "Buyer")
+
+    add_invoice(seller, "FV/1", buyer.nip, datetime(2024, 1, 15))
+    add_invoice(seller, "FV/2", buyer.nip, datetime(2024, 1, 20))
+
+    summary = vat_aggregates.get_period_summary(db_session, seller.id, "2024-01")
+    assert summary["vat_due"] == 2 * (46.00 + 4.00)
+    assert summary["vat_deductible"] == 0
+    assert summary["invoice_count"] == 2
+    assert summary["deadline"] == "2024-02-25"
+    assert [r["vat_rate"] for r in summary["rates"]] == [8, 23]
+
+    purchases = vat_aggregates.get_period_summary(db_session, buyer.id, "2024-01")
+    assert purchases["vat_deductible"] == 100.00
+    assert purchases["net_vat"] == -100.00
+    assert purchases["invoice_count"] == 0
+
+
+def test_status_change_to_rejected_removes_invoice(
+    db_session, make_company, add_invoice
+):
+    seller = make_company()
+    invoice = add_invoice(seller, "FV/1", "1234567890", datetime(2024, 3, 1))
+
+    service = InvoiceService(db_session)
+    service.update_invoice_status(invoice.id, "rejected", error="FA(3)")
+    summary = vat_aggregates.get_period_summary(db_session, seller.id, "2024-03")
+    assert summary["vat_due"] == 0
+    assert summary["invoice_count"] == 0
+
+    service.update_invoice_status(invoice.id, "accepted", upo="UPO-1")
+    summary = vat_aggregates.get_period_summary(db_session, seller.id, "2024-03")
+    assert summary["vat_due"] == 50.00
+    assert summary["invoice_count"] == 1
+
+
+def test_rebuild_matches_incremental(db_session, make_company, add_invoice):
+    seller = make_company()
+    add_invoice(seller, "FV/1", "1234567890", datetime(2024, 12, 31))
+
+    db_session.query(VatPeriodAggregate).update(
+        {VatPeriodAggregate.vat_due: Decimal("999")}
+    )
+    count = vat_aggregates.rebuild(db_session, seller.id)
+
+    summary = vat_aggregates.get_period_summary(db_session, seller.id, "2024-12")
+    assert count == 1
+    assert summary["vat_due"] == 50.00
+    assert summary["deadline"] == "2025-01-25"
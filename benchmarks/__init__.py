@@ -0,0 +1,10 @@
+"""
+Performance benchmarks for PolComply
+
+Run from the repository root::
+
+    python -m benchmarks.run
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
@@ -0,0 +1,288 @@
+"""
+Benchmark cases for validation, mapping and the API hot paths
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import asyncio
+import atexit
+import logging
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from .generators import fa3_xml, invoice_data, write_csv
+from .run import benchmark
+
+ROOT = Path(__file__).resolve().parents[1]
+FA3_CONFIG = ROOT / "polcomply" / "mapping" / "fa3.yaml"
+
+# Inputs written by the mapping cases, removed at exit
+_workdir = tempfile.TemporaryDirectory(prefix="polcomply-bench-")
+atexit.register(_workdir.cleanup)
+
+
+def _backend() -> None:
+    """Make the backend's ``app`` package importable"""
+    backend = str(ROOT / "backend")
+    if backend not in sys.path:
+        sys.path.insert(0, backend)
+
+
+def _fa3_validator() -> Any:
+    from polcomply.validators.paths import get_fa3_schema_or_fail
+    from polcomply.validators.xsd import XSDValidator
+
+    return XSDValidator(get_fa3_schema_or_fail())
+
+
+# --- XSD validation --------------------------------------------------------------
+
+
+def _xsd_case(items: int, invalid: bool) -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        validator = _fa3_validator()
+        document = fa3_xml(items, invalid=invalid)
+        expected = 2 + items if invalid else 0
+
+        def validate() -> None:
+            errors = validator.validate(document)
+            assert len(errors) == expected, errors[:3]
+
+        return validate
+
+    return setup
+
+
+benchmark("xsd.validate.small.valid")(_xsd_case(1, invalid=False))
+benchmark("xsd.validate.small.invalid")(_xsd_case(1, invalid=True))
+benchmark("xsd.validate.huge.valid")(_xsd_case(10_000, invalid=False))
+benchmark("xsd.validate.huge.invalid")(_xsd_case(10_000, invalid=True))
+benchmark("xsd.validate.100k_items.valid", suites=("full",))(
+    _xsd_case(100_000, invalid=False)
+)
+
+
+@benchmark("registry.validate.small")
+def registry_validate() -> Callable[[], Any]:
+    from polcomply.validators.registry import fa_schema_registry
+
+    registry = fa_schema_registry()
+    document = fa3_xml(1)
+    return lambda: registry.validate(document)
+
+
+# --- Backend business rules ------------------------------------------------------
+
+
+def _invoice_case(items: int, invalid: bool) -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        _backend()
+        from app.services.fa3_validator import FA3Validator
+
+        validator = FA3Validator(strict=True)
+        data = invoice_data(items, invalid=invalid)
+        return lambda: validator.validate_invoice(data)
+
+    return setup
+
+
+benchmark("fa3_validator.validate_invoice.valid")(_invoice_case(10, invalid=False))
+benchmark("fa3_validator.validate_invoice.invalid")(_invoice_case(10, invalid=True))
+benchmark("fa3_validator.validate_invoice.1k_items")(_invoice_case(1000, invalid=False))
+
+
+def _normalize_case(count: int) -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        _backend()
+        from app.schemas.invoice import ValidationError
+        from app.services.fa3_validator import _normalize_errors
+
+        codes = [
+            "FA3_001",
+            "FA3_017",
+            "FA3_023",
+            "FA3_027",
+            "FA3_028",
+            "FA3_031",
+            "SCHEMAV_CVC_PATTERN_VALID",
+            "SCHEMAV_ELEMENT_MISSING",
+        ]
+        paths = ["invoice_number", "net_amount", "vat_amount", "gross_amount"]
+        errors = [
+            ValidationError(
+                path=paths[i % 4] if i % 3 else f"items[{i}].quantity",
+                code=codes[i % len(codes)],
+                message="Błąd",
+                fix_hint="Popraw",
+            )
+            for i in range(count)
+        ]
+        return lambda: _normalize_errors(errors)
+
+    return setup
+
+
+benchmark("fa3_validator.normalize_errors.1k")(_normalize_case(1_000))
+benchmark("fa3_validator.normalize_errors.100k", suites=("full",))(
+    _normalize_case(100_000)
+)
+
+
+# --- CSV to FA-3 mapping ---------------------------------------------------------
+
+
+def _mapping_case(rows: int) -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        from polcomply.mapping.csv_to_fa import CSVToFAMapper
+
+        workdir = Path(_workdir.name)
+        csv_path = write_csv(workdir / f"invoices_{rows}.csv", rows)
+        output = workdir / f"invoices_{rows}.xml"
+        mapper = CSVToFAMapper(FA3_CONFIG)
+        # Large inputs are streamed, as ``map batch`` does for big exports
+        chunksize = 50_000 if rows > 50_000 else None
+
+        def convert() -> None:
+            errors = mapper.convert_file(csv_path, output, chunksize=chunksize)
+            assert errors == [], errors[:3]
+
+        return convert
+
+    return setup
+
+
+benchmark("mapping.csv_to_fa.1k")(_mapping_case(1_000))
+benchmark("mapping.csv_to_fa.100k", suites=("full",))(_mapping_case(100_000))
+benchmark("mapping.csv_to_fa.1m", suites=("full",))(_mapping_case(1_000_000))
+
+
+# --- API -------------------------------------------------------------------------
+
+
+def _api_case(concurrency: int) -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        _backend()
+        from httpx import ASGITransport, AsyncClient
+
+        from app.config import settings
+        from app.main import app
+
+        # The benchmark client is one IP sending far more than the free limit
+        settings.RATE_LIMIT_ENABLED = False
+        # One INFO line per request would dominate the timings
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        document = fa3_xml(10)
+
+        async def burst() -> None:
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://bench"
+            ) as client:
+                responses = await asyncio.gather(
+                    *(
+                        client.post(
+                            "/api/validate/xml",
+                            files={"file": ("invoice.xml", document, "text/xml")},
+                        )
+                        for _ in range(concurrency)
+                    )
+                )
+            assert all(r.status_code == 200 and r.json()["ok"] for r in responses)
+
+        return lambda: asyncio.run(burst())
+
+    return setup
+
+
+benchmark("api.validate_xml.concurrent_50")(_api_case(50))
+benchmark("api.validate_xml.concurrent_500", suites=("full",))(_api_case(500))
+
+
+@benchmark("api.login.concurrent_20")
+def login_burst() -> Callable[[], Any]:
+    _backend()
+    from httpx import ASGITransport, AsyncClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.dialects.postgresql import UUID
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.orm import sessionmaker
+
+    from app.config import settings
+    from app.database import Base, get_db
+    from app.main import app
+    from app.models.user import User
+    from app.utils.passwords import hash_password
+
+    @compiles(UUID, "sqlite")
+    def _uuid_as_hex(type_, compiler, **kw):
+        return "CHAR(32)"
+
+    settings.RATE_LIMIT_ENABLED = False
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    engine = create_engine(
+        f"sqlite:///{Path(_workdir.name) / 'login.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    started = time.perf_counter()
+    hashed_password = hash_password("bench-password")
+    # Run inline, a single hash would stall the loop at least this long
+    one_hash = time.perf_counter() - started
+    with Session() as db:
+        db.add(
+            User(
+                email="bench@example.com",
+                hashed_password=hashed_password,
+                first_name="Bench",
+                last_name="User",
+                role="accountant",
+            )
+        )
+        db.commit()
+
+    def session():
+        with Session() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = session
+
+    async def burst() -> None:
+        # Logins must not stall the loop: a 10ms ticker keeps ticking on time
+        lag = 0.0
+        done = asyncio.Event()
+
+        async def ticker() -> None:
+            nonlocal lag
+            loop = asyncio.get_running_loop()
+            while not done.is_set():
+                expected = loop.time() + 0.01
+                await asyncio.sleep(0.01)
+                lag = max(lag, loop.time() - expected)
+
+        heartbeat = asyncio.create_task(ticker())
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+            responses = await asyncio.gather(
+                *(
+                    client.post(
+                        "/v1/auth/login",
+                        data={
+                            "username": "bench@example.com",
+                            "password": "bench-password",
+                        },
+                    )
+                    for _ in range(20)
+                )
+            )
+        done.set()
+        await heartbeat
+        assert all(r.status_code == 200 for r in responses)
+        assert lag < one_hash, f"event loop stalled for {lag:.3f}s"
+
+    return lambda: asyncio.run(burst())
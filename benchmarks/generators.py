@@ -0,0 +1,175 @@
+"""
+Synthetic FA-3 inputs of configurable size
+
+Documents follow ``backend/test_invoice.xml`` and validate against the bundled
+FA-3 schema; CSV rows follow ``polcomply/examples/basic_invoice.csv``.
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import csv
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+FA3_NAMESPACE = "http://crd.gov.pl/wzor/2023/06/21/12348/"
+
+CSV_TEMPLATE = (
+    Path(__file__).resolve().parents[1] / "polcomply" / "examples" / "basic_invoice.csv"
+)
+
+_HEADER = f"""<?xml version="1.0" encoding="UTF-8"?>
+<Faktura xmlns="{FA3_NAMESPACE}">
+    <Naglowek>
+        <KodFormularza>
+            <Kod>FA</Kod>
+            <WersjaSchemy>1-0E</WersjaSchemy>
+        </KodFormularza>
+        <WariantFormularza>1</WariantFormularza>
+        <DataWystawienia>2024-01-15</DataWystawienia>
+        <MiejsceWystawienia>Warszawa</MiejsceWystawienia>
+        <DataSprzedazy>2024-01-15</DataSprzedazy>
+        <KodWaluty>{{currency}}</KodWaluty>
+        <P_1>FV/2024/001</P_1>
+        <P_2>FV/2024/001</P_2>
+    </Naglowek>
+    <Sprzedawca>
+        <DaneIdentyfikacyjne>
+            <NIP>1234567890</NIP>
+            <Nazwa>Test Company Sp. z o.o.</Nazwa>
+        </DaneIdentyfikacyjne>
+        <Adres>
+            <KodKraju>PL</KodKraju>
+            <Miejscowosc>Warszawa</Miejscowosc>
+            <KodPocztowy>00-001</KodPocztowy>
+            <Poczta>Warszawa</Poczta>
+        </Adres>
+    </Sprzedawca>
+    <Nabywca>
+        <DaneIdentyfikacyjne>
+            <NIP>0987654321</NIP>
+            <Nazwa>Client Company Sp. z o.o.</Nazwa>
+        </DaneIdentyfikacyjne>
+        <Adres>
+            <KodKraju>PL</KodKraju>
+            <Miejscowosc>Kraków</Miejscowosc>
+            <KodPocztowy>30-001</KodPocztowy>
+            <Poczta>Kraków</Poczta>
+        </Adres>
+    </Nabywca>
+    <Pozycje>
+"""
+
+_ITEM = """        <Pozycja>
+            <LpSprzedazy>{number}</LpSprzedazy>
+            <Nazwa>Product {number}</Nazwa>
+            <Miara>szt.</Miara>
+            <Ilosc>{quantity}</Ilosc>
+            <CenaJednostkowa>100.00</CenaJednostkowa>
+            <WartoscNetto>200.00</WartoscNetto>
+            <StawkaPodatku>23</StawkaPodatku>
+            <KwotaPodatku>46.00</KwotaPodatku>
+            <WartoscBrutto>246.00</WartoscBrutto>
+        </Pozycja>
+"""
+
+_FOOTER = """    </Pozycje>
+    <Podsumowanie>
+        <LiczbaPozycji>{items}</LiczbaPozycji>
+        <WartoscNetto>{net}</WartoscNetto>
+        <KwotaPodatku>{vat}</KwotaPodatku>
+        <WartoscBrutto>{gross}</WartoscBrutto>
+    </Podsumowanie>
+</Faktura>
+"""
+
+
+def fa3_xml(items: int = 1, invalid: bool = False) -> bytes:
+    """
+    FA-3 invoice with ``items`` line items
+
+    Args:
+        items: Number of ``Pozycja`` elements
+        invalid: Break the currency code and every item's quantity, so the
+            document yields ``2 + items`` schema errors
+
+    Returns:
+        XML document as bytes
+    """
+    quantity = "two" if invalid else "2"
+    parts = [_HEADER.format(currency="PLNX" if invalid else "PLN")]
+    parts.extend(_ITEM.format(number=i, quantity=quantity) for i in range(1, items + 1))
+    parts.append(
+        _FOOTER.format(
+            items=items,
+            net=f"{200 * items:.2f}",
+            vat=f"{46 * items:.2f}",
+            gross=f"{246 * items:.2f}",
+        )
+    )
+    return "".join(parts).encode("utf-8")
+
+
+def invoice_data(items: int = 1, invalid: bool = False) -> dict[str, Any]:
+    """
+    Invoice dictionary for the backend ``FA3Validator``
+
+    Args:
+        items: Number of line items
+        invalid: Use a malformed NIP, bad dates and wrong totals
+    """
+    line = {
+        "name": "Test Product",
+        "quantity": Decimal("2"),
+        "unit": "szt.",
+        "net_price": Decimal("100.00"),
+        "vat_rate": 23,
+    }
+    net = Decimal("200.00") * items
+    vat = Decimal("46.00") * items
+    return {
+        "invoice_number": "FV/2024/001",
+        "issue_date": "2024-13-45" if invalid else "2024-01-15",
+        "sale_date": "2024-01-15",
+        "due_date": "2024-02-15",
+        "contractor_data": {
+            "nip": "12345" if invalid else "1234567890",
+            "name": "Test Company Sp. z o.o.",
+            "address": {
+                "street": "ul. Testowa 1",
+                "city": "Warszawa",
+                "postal_code": "00-001",
+                "country": "PL",
+            },
+        },
+        "items": [dict(line) for _ in range(items)],
+        "payment_method": "transfer",
+        "net_amount": net + (1 if invalid else 0),
+        "vat_amount": vat,
+        "gross_amount": net + vat,
+        "currency": "PLN",
+    }
+
+
+def write_csv(path: Path, rows: int) -> Path:
+    """
+    Write a CSV export with ``rows`` invoices
+
+    Args:
+        path: Output CSV path
+        rows: Number of data rows (one invoice each)
+
+    Returns:
+        ``path``
+    """
+    with open(CSV_TEMPLATE, encoding="utf-8", newline="") as f:
+        header, template = list(csv.reader(f))[:2]
+    number = header.index("Numer faktury")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for i in range(1, rows + 1):
+            template[number] = f"FA/2024/{i:07d}"
+            writer.writerow(template)
+    return path
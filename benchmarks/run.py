@@ -0,0 +1,224 @@
+"""
+Benchmark runner with baseline comparison
+
+Cases are registered with ``@benchmark``; each one is a setup function that
+prepares its input and returns the callable to time. Like asv, the runner
+calibrates how many calls make up one sample, takes several samples and
+reports per-call statistics::
+
+    python -m benchmarks.run                        # quick suite
+    python -m benchmarks.run --suite full -k mapping
+    python -m benchmarks.run -o baseline.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.25
+
+With ``--compare`` the run exits with status 1 if any case's median is more
+than ``threshold`` slower than in the baseline.
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+SUITES = ("quick", "full")
+
+# Target duration of one sample; fast calls are repeated to reach it
+SAMPLE_SECONDS = 0.1
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """A named case and the suites it runs in"""
+
+    name: str
+    setup: Callable[[], Callable[[], Any]]
+    suites: tuple[str, ...]
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(
+    name: str, suites: tuple[str, ...] = SUITES
+) -> Callable[[Callable[[], Callable[[], Any]]], Callable[[], Callable[[], Any]]]:
+    """Register a setup function returning the callable to time"""
+
+    def register(
+        setup: Callable[[], Callable[[], Any]],
+    ) -> Callable[[], Callable[[], Any]]:
+        BENCHMARKS.append(Benchmark(name, setup, suites))
+        return setup
+
+    return register
+
+
+def measure(func: Callable[[], Any], repeat: int) -> dict[str, Any]:
+    """
+    Time a callable
+
+    Args:
+        func: Callable to time
+        repeat: Number of samples
+
+    Returns:
+        Per-call ``median``, ``min`` and ``max`` seconds, ``stdev``, and the
+        calls per sample (``number``)
+    """
+    # The first call warms caches and calibrates the sample size
+    started = time.perf_counter()
+    func()
+    first = time.perf_counter() - started
+    number = max(1, int(SAMPLE_SECONDS / first)) if first > 0 else 1000
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(suite: str, pattern: str | None, repeat: int) -> dict[str, Any]:
+    """Run the selected cases and return the results document"""
+    results: dict[str, Any] = {}
+    for case in BENCHMARKS:
+        if suite not in case.suites or (pattern and pattern not in case.name):
+            continue
+        func = case.setup()
+        stats = measure(func, repeat)
+        results[case.name] = stats
+        print(
+            f"{case.name:<45} {_format(stats['median']):>10} "
+            f"(min {_format(stats['min'])}, {stats['number']}x{repeat})",
+            flush=True,
+        )
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "suite": suite,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """
+    Compare medians against a baseline
+
+    Args:
+        results: Results document of this run
+        baseline: Results document to compare against
+        threshold: Allowed slowdown, e.g. ``0.25`` for 25%
+
+    Returns:
+        Names of the cases that regressed
+    """
+    regressions = []
+    print(f"\n{'benchmark':<45} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, stats in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<45} {'-':>10} {_format(stats['median']):>10}")
+            continue
+        ratio = stats["median"] / base["median"]
+        mark = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            mark = "  REGRESSION"
+        elif ratio < 1 / (1 + threshold):
+            mark = "  faster"
+        print(
+            f"{name:<45} {_format(base['median']):>10} "
+            f"{_format(stats['median']):>10} {ratio:>6.2f}x{mark}"
+        )
+    return regressions
+
+
+def _format(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run", description="Run PolComply benchmarks"
+    )
+    parser.add_argument(
+        "--suite",
+        choices=SUITES,
+        default="quick",
+        help="quick: small inputs; full: adds 100k/1M-row and huge-document cases",
+    )
+    parser.add_argument("-k", dest="pattern", help="Only cases containing this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per case")
+    parser.add_argument("-o", "--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed median slowdown against the baseline (default: 0.25)",
+    )
+    args = parser.parse_args(argv)
+
+    from . import cases  # noqa: F401  (registers the cases)
+
+    results = run(args.suite, args.pattern, args.repeat)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults saved to: {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    # Cases register with the importable module, not with ``__main__``
+    from benchmarks.run import main as run_main
+
+    sys.exit(run_main())
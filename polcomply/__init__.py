@@ -1,16 +1,32 @@
 """
 PolComply SDK - Polish KSeF compliance toolkit
 
+Public classes are imported on first access (PEP 562), so ``import polcomply``
+and the CLI stay cheap until pandas or lxml are actually needed.
+
 Licensed under the Business Source License 1.1 (BSL).
 See LICENSE file for full terms.
 """
 
+from typing import TYPE_CHECKING
+
+from ._lazy import lazy_attributes
+
 __version__ = "0.1.0"
 __author__ = "e1washere"
 __email__ = "e1washere@example.com"
 
-from .mapping.csv_to_fa import CSVToFAMapper, MappingError
-from .validators.xsd import ValidationError, XSDValidator
+if TYPE_CHECKING:
+    from .mapping.csv_to_fa import CSVToFAMapper, MappingError
+    from .validators.xsd import ValidationError, XSDValidator
+
+# Public name -> module defining it
+_LAZY_ATTRIBUTES = {
+    "XSDValidator": ".validators.xsd",
+    "ValidationError": ".validators.xsd",
+    "CSVToFAMapper": ".mapping.csv_to_fa",
+    "MappingError": ".mapping.csv_to_fa",
+}
 
 __all__ = [
     "XSDValidator",
@@ -18,3 +34,5 @@ __all__ = [
     "CSVToFAMapper",
     "MappingError",
 ]
+
+__getattr__, __dir__ = lazy_attributes(globals(), _LAZY_ATTRIBUTES)
@@ -0,0 +1,39 @@
+"""
+Module attributes imported on first access (PEP 562)
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+from collections.abc import Callable
+from importlib import import_module
+from typing import Any
+
+
+def lazy_attributes(
+    namespace: dict[str, Any], attributes: dict[str, str]
+) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """
+    Build a package's ``__getattr__`` and ``__dir__`` for lazy exports
+
+    Args:
+        namespace: The package's ``globals()``; loaded names are cached there
+        attributes: Public name -> module defining it, relative to the package
+
+    Returns:
+        ``(__getattr__, __dir__)`` for the package to assign
+    """
+    package = namespace["__name__"]
+
+    def __getattr__(name: str) -> Any:
+        module = attributes.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(import_module(module, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted([*namespace, *attributes])
+
+    return __getattr__, __dir__
@@ -6,6 +6,7 @@ See LICENSE file for full terms.
 """
 
 from .map import map_command
+from .schema import schema_command
 from .validate import validate_command
 
-__all__ = ["validate_command", "map_command"]
+__all__ = ["validate_command", "map_command", "schema_command"]
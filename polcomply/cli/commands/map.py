@@ -14,7 +14,11 @@ from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
 
-from ...mapping.csv_to_fa import CSVToFAMapper, MappingError
+from ..profiling import PROFILE_OPTION, start_profile
+from ..stages import stage_table
+
+# The mapping modules (pandas, lxml) are imported inside the commands, so
+# loading the CLI (e.g. for ``--help``) stays fast
 
 console = Console()
 
@@ -25,6 +29,12 @@ map_command = typer.Typer(
 )
 
 
+@map_command.callback()
+def profile(ctx: typer.Context, profile: Path | None = PROFILE_OPTION) -> None:
+    """Profile support for all subcommands"""
+    start_profile(ctx, profile)
+
+
 @map_command.command("csv-to-fa")
 def map_csv_to_fa(
     input_file: Path = typer.Argument(..., help="Path to input CSV/Excel file"),
@@ -54,6 +64,8 @@ def map_csv_to_fa(
     Example:
         polcomply map csv-to-fa input.csv --output invoice.xml --schema schemas/FA-3.xsd
     """
+    from ...mapping.csv_to_fa import CSVToFAMapper, MappingError
+
     try:
         console.print("[yellow]Mapping CSV to FA-3 XML...[/yellow]")
         console.print(f"Input: [blue]{input_file}[/blue]")
@@ -63,24 +75,24 @@ def map_csv_to_fa(
         # Initialize mapper
         mapper = CSVToFAMapper(config_file)
 
-        # Process CSV
-        xml_content = mapper.process_csv(input_file, output_file)
+        # Validate against schema if provided, in the same pass as writing
+        validator = None
+        if validate and schema_file and schema_file.exists():
+            from ...validators.xsd import XSDValidator
+
+            validator = XSDValidator(schema_file)
+
+        # Read the input once; stream invoices to the output file
+        df_mapped = mapper.load_mapped(input_file)
+        errors = mapper.write_file(df_mapped, output_file, validator=validator)
 
         if verbose:
             # Show mapping report
-            df = mapper.read_csv(input_file)
-            df_mapped = mapper.map_columns(df)
             report = mapper.get_missing_fields_report(df_mapped)
 
             _show_mapping_report(report)
 
-        # Validate against schema if provided
-        if validate and schema_file and schema_file.exists():
-            from polcomply.validators.xsd import XSDValidator
-
-            validator = XSDValidator(schema_file)
-            errors = validator.validate(xml_content.encode("utf-8"))
-
+        if validator is not None:
             if errors:
                 console.print(
                     f"[red]✗[/red] [bold red]XML validation failed with {len(errors)} errors:[/bold red]"
@@ -111,6 +123,110 @@ def map_csv_to_fa(
         raise typer.Exit(1)
 
 
+@map_command.command("batch")
+def map_batch(
+    inputs: list[Path] = typer.Argument(
+        ..., help="Input CSV/Excel files or directories containing them"
+    ),
+    output_dir: Path = typer.Option(
+        ..., "--output-dir", "-o", help="Directory for generated XML files"
+    ),
+    config_file: Path = typer.Option(
+        Path("mapping/fa3.yaml"),
+        "--config",
+        "-c",
+        help="Path to mapping configuration YAML",
+    ),
+    schema_file: Path
+    | None = typer.Option(
+        None, "--schema", "-s", help="Path to FA-3 XSD schema for validation"
+    ),
+    workers: int = typer.Option(
+        0, "--workers", "-w", help="Worker processes (0 = one per CPU)"
+    ),
+    report_file: Path
+    | None = typer.Option(
+        None,
+        "--report",
+        "-r",
+        help="Path to JSON report (default: <output-dir>/report.json)",
+    ),
+) -> None:
+    """
+    Map many CSV/Excel files to FA-3 XML in parallel
+
+    Example:
+        polcomply map batch exports/ --output-dir out/ --schema schemas/FA-3.xsd
+    """
+    from ...mapping.batch import collect_inputs, map_files
+    from ...mapping.csv_to_fa import MappingError
+    from ...validators.xsd import ValidationError
+
+    try:
+        files = collect_inputs(inputs)
+    except FileNotFoundError as e:
+        console.print(f"[red]✗[/red] [bold red]File not found:[/bold red] {e}")
+        raise typer.Exit(1)
+    if not files:
+        console.print("[red]✗[/red] [bold red]No CSV/Excel files to map[/bold red]")
+        raise typer.Exit(1)
+    if schema_file is not None and not schema_file.exists():
+        console.print(
+            f"[red]✗[/red] [bold red]File not found:[/bold red] {schema_file}"
+        )
+        raise typer.Exit(1)
+
+    report_file = report_file or output_dir / "report.json"
+    console.print(f"[yellow]Mapping {len(files)} files to FA-3 XML...[/yellow]")
+
+    try:
+        report = map_files(
+            files,
+            output_dir,
+            config_file,
+            schema_path=schema_file,
+            workers=workers or None,
+            report_path=report_file,
+        )
+    except MappingError as e:
+        console.print(f"[red]✗[/red] [bold red]Mapping error:[/bold red] {e}")
+        raise typer.Exit(1)
+    except ValidationError as e:
+        console.print(f"[red]✗[/red] [bold red]Schema error:[/bold red] {e}")
+        raise typer.Exit(1)
+
+    table = Table(title="Batch Mapping")
+    table.add_column("Input", style="blue")
+    table.add_column("Status")
+    table.add_column("Invoices", justify="right")
+    table.add_column("Errors", justify="right")
+    styles = {"ok": "green", "invalid": "yellow", "failed": "red"}
+    for entry in report["files"]:
+        status = entry["status"]
+        table.add_row(
+            entry["input"],
+            f"[{styles[status]}]{status}[/{styles[status]}]",
+            str(entry["invoices"]),
+            str(entry["error_count"]),
+        )
+    console.print(table)
+    console.print(stage_table(report["stages"]))
+
+    summary = report["summary"]
+    console.print(
+        f"{summary['ok']} ok, {summary['invalid']} invalid, "
+        f"{summary['failed']} failed in {report['seconds']}s "
+        f"({report['workers']} workers)"
+    )
+    console.print(f"Report: [blue]{report_file}[/blue]")
+
+    if summary["ok"] != summary["files"]:
+        raise typer.Exit(1)
+    console.print(
+        "[green]✓[/green] [bold green]Batch mapping completed successfully![/bold green]"
+    )
+
+
 @map_command.command("invoice")
 def map_invoice(
     input_file: Path = typer.Argument(..., help="Path to input file"),
@@ -209,6 +325,7 @@ def list_formats() -> None:
 
     formats_text.append("Mapping Commands:\n", style="bold magenta")
     formats_text.append("• csv-to-fa - CSV/Excel to FA-3 XML\n")
+    formats_text.append("• batch - Many CSV/Excel files to FA-3 XML in parallel\n")
     formats_text.append("• invoice - General invoice mapping\n")
 
     panel = Panel(formats_text, title="Supported Formats", border_style="blue")
@@ -0,0 +1,68 @@
+"""
+Schema command for PolComply CLI
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+from pathlib import Path
+
+import typer
+from rich.console import Console
+
+console = Console()
+
+schema_command = typer.Typer(
+    name="schema",
+    help="Manage XSD schemas",
+    rich_markup_mode="rich",
+)
+
+
+@schema_command.command("bundle")
+def bundle_schema(
+    schema_file: Path
+    | None = typer.Argument(
+        None, help="Path to XSD schema (auto-resolve FA-3 if not provided)"
+    ),
+    output_file: Path
+    | None = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="Path to bundle file (default: <schema>.bundle, picked up by "
+        "FA-3 auto-resolution)",
+    ),
+) -> None:
+    """
+    Build a self-contained schema bundle for fast validator start-up
+
+    Example:
+        polcomply schema bundle schemas/FA-3.xsd
+    """
+    from ...validators.bundle import write_bundle
+    from ...validators.paths import resolve_fa3_schema
+    from ...validators.xsd import ValidationError, XSDValidator
+
+    if schema_file is None:
+        schema_file = resolve_fa3_schema()
+        if schema_file is None or schema_file.suffix != ".xsd":
+            console.print(
+                "[red]❌ FA-3 schema not found. Please provide the XSD path[/red]"
+            )
+            raise typer.Exit(1)
+        console.print(f"[dim]Using auto-resolved schema: {schema_file}[/dim]")
+
+    try:
+        info = write_bundle(schema_file, output_file)
+        # Make sure the bundle compiles before anyone relies on it
+        XSDValidator(Path(info["path"]))
+    except (FileNotFoundError, ValidationError) as e:
+        console.print(f"[red]✗[/red] [bold red]Bundle failed:[/bold red] {e}")
+        raise typer.Exit(1)
+
+    console.print(
+        f"[green]✓[/green] [bold green]Schema bundle written:[/bold green] {info['path']}"
+    )
+    console.print(f"Fingerprint: [cyan]{info['fingerprint']}[/cyan]")
+    console.print(f"Documents: {', '.join(info['documents'])}")
@@ -6,15 +6,19 @@ See LICENSE file for full terms.
 """
 
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
 from rich.console import Console
-from rich.syntax import Syntax
 from rich.table import Table
 
-from ...reporting.html_report import generate_html_report
-from ...validators.paths import resolve_fa3_schema
-from ...validators.xsd import ValidationError, XSDValidator
+from ..profiling import PROFILE_OPTION, start_profile
+from ..stages import stage_table
+
+# lxml and the report module are imported inside the commands, so loading
+# the CLI (e.g. for ``--help``) stays fast
+if TYPE_CHECKING:
+    from ...validators.xsd import ValidationError
 
 console = Console()
 
@@ -25,6 +29,12 @@ validate_command = typer.Typer(
 )
 
 
+@validate_command.callback()
+def profile(ctx: typer.Context, profile: Path | None = PROFILE_OPTION) -> None:
+    """Profile support for all subcommands"""
+    start_profile(ctx, profile)
+
+
 @validate_command.command("invoice")
 def validate_invoice(
     xml_file: Path = typer.Argument(..., help="Path to XML invoice file"),
@@ -32,7 +42,7 @@ def validate_invoice(
         None,
         "--schema",
         "-s",
-        help="Path to XSD schema file (auto-resolve FA-3 if not provided)",
+        help="Path to XSD schema file (auto-resolve FA schemas by namespace if not provided)",
     ),
     output_format: str = typer.Option(
         "table", "--format", "-f", help="Output format: table, json, summary"
@@ -53,24 +63,34 @@ def validate_invoice(
     Example:
         polcomply validate invoice.xml --schema schemas/FA-3.xsd
     """
+    from ...validators.registry import fa_schema_registry
+    from ...validators.xsd import XSDValidator
+
     try:
-        # Auto-resolve schema if not provided
         if schema is None:
-            schema = resolve_fa3_schema()
-            if schema is None:
+            # Auto-resolve schemas; the invoice's namespace picks the version
+            registry = fa_schema_registry()
+            if not len(registry):
                 console.print(
                     "[red]❌ FA-3 schema not found. Please provide --schema or place FA-3.xsd in schemas/[/red]"
                 )
                 raise typer.Exit(1)
-            console.print(f"[dim]Using auto-resolved schema: {schema}[/dim]")
-
-        # Validate XML file
-        validator = XSDValidator(schema)
-        errors = validator.validate_file(xml_file)
+            version, errors = registry.validate_file(xml_file)
+            if version:
+                console.print(f"[dim]Validated against auto-resolved {version}[/dim]")
+        else:
+            # Validate XML file
+            validator = XSDValidator(schema)
+            errors = validator.validate_file(xml_file)
+            version = schema.stem
 
         # Generate HTML report if requested
         if report:
-            generate_html_report(errors, str(xml_file.name), report)
+            from ...reporting.html_report import write_html_report
+
+            write_html_report(
+                errors, xml_file.name, report, schema_version=version or "FA-3"
+            )
             console.print(f"[green]✓[/green] HTML report saved to: {report}")
 
         if output_format == "json":
@@ -105,6 +125,8 @@ def validate_xml(
     Example:
         polcomply validate xml document.xml --schema schemas/document.xsd
     """
+    from ...validators.xsd import XSDValidator
+
     try:
         # Validate XML file
         validator = XSDValidator(schema)
@@ -125,8 +147,76 @@ def validate_xml(
         raise typer.Exit(1)
 
 
+@validate_command.command("batch")
+def validate_batch(
+    inputs: list[Path] = typer.Argument(
+        ..., help="XML files or directories containing them"
+    ),
+    report_dir: Path = typer.Option(
+        ..., "--report-dir", "-o", help="Directory for the JSON and HTML reports"
+    ),
+    schema: Path
+    | None = typer.Option(
+        None,
+        "--schema",
+        "-s",
+        help="Path to XSD schema file (auto-resolve FA schemas by namespace if not provided)",
+    ),
+    workers: int = typer.Option(
+        0, "--workers", "-w", help="Worker processes (0 = one per CPU)"
+    ),
+) -> None:
+    """
+    Validate many XML files in parallel into one consolidated report
+
+    Example:
+        polcomply validate batch invoices/ --report-dir reports/
+    """
+    from ...validators.batch import collect_xml_files, validate_files
+    from ...validators.xsd import ValidationError
+
+    try:
+        files = collect_xml_files(inputs)
+    except FileNotFoundError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(1)
+    if not files:
+        console.print("[red]Error: No XML files to validate[/red]")
+        raise typer.Exit(1)
+
+    console.print(f"[yellow]Validating {len(files)} files...[/yellow]")
+    try:
+        report = validate_files(
+            files, report_dir, schema_path=schema, workers=workers or None
+        )
+    except (FileNotFoundError, ValidationError) as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(1)
+
+    summary = report.summary
+    table = Table(title="Errors by Code")
+    table.add_column("Code", style="red")
+    table.add_column("Errors", justify="right")
+    table.add_column("Files", justify="right")
+    for code, count in report.codes.most_common(10):
+        table.add_row(code, str(count), str(report.code_files[code]))
+    if report.codes:
+        console.print(table)
+    console.print(stage_table(report.timings.to_dict()))
+
+    console.print(
+        f"{summary['ok']} valid, {summary['invalid']} invalid, "
+        f"{summary['failed']} failed ({summary['errors']} errors)"
+    )
+    console.print(f"Report: [blue]{report_dir / 'index.html'}[/blue]")
+
+    if summary["ok"] != summary["files"]:
+        raise typer.Exit(1)
+    console.print(f"[green]✓ All {summary['files']} files are valid[/green]")
+
+
 def _output_table(
-    errors: list[ValidationError], xml_file: Path, verbose: bool, show_xml: bool
+    errors: "list[ValidationError]", xml_file: Path, verbose: bool, show_xml: bool
 ) -> None:
     """Output validation results as a table"""
 
@@ -163,6 +253,8 @@ def _output_table(
             with open(xml_file, encoding="utf-8") as f:
                 xml_content = f.read()
 
+            from rich.syntax import Syntax
+
             syntax = Syntax(xml_content, "xml", theme="monokai", line_numbers=True)
             console.print("\n[bold]XML Content:[/bold]")
             console.print(syntax)
@@ -172,7 +264,7 @@ def _output_table(
             )
 
 
-def _output_json(errors: list[ValidationError], xml_file: Path) -> None:
+def _output_json(errors: "list[ValidationError]", xml_file: Path) -> None:
     """Output validation results as JSON"""
     import json
 
@@ -186,7 +278,7 @@ def _output_json(errors: list[ValidationError], xml_file: Path) -> None:
     console.print(json.dumps(result, indent=2))
 
 
-def _output_summary(errors: list[ValidationError], xml_file: Path) -> None:
+def _output_summary(errors: "list[ValidationError]", xml_file: Path) -> None:
     """Output validation results as summary"""
 
     if not errors:
@@ -11,6 +11,7 @@ from rich.panel import Panel
 from rich.text import Text
 
 from .commands.map import map_command
+from .commands.schema import schema_command
 from .commands.validate import validate_command
 
 app = typer.Typer(
@@ -27,6 +28,7 @@ app.add_typer(
     validate_command, name="validate", help="Validate XML documents against XSD schemas"
 )
 app.add_typer(map_command, name="map", help="Map invoice data between formats")
+app.add_typer(schema_command, name="schema", help="Manage XSD schemas")
 
 
 @app.command()
@@ -0,0 +1,77 @@
+"""
+``--profile`` support for CLI command groups
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+# Functions listed after the run, by time spent in the function itself
+TOP_FUNCTIONS = 15
+
+console = Console(stderr=True)
+
+PROFILE_OPTION = typer.Option(
+    None,
+    "--profile",
+    help=(
+        "Profile the command with cProfile and save the stats to this file "
+        "(open with snakeviz or python -m pstats); with --workers above 1 only "
+        "the parent process is profiled"
+    ),
+)
+
+
+def start_profile(ctx: typer.Context, output: Path | None) -> None:
+    """
+    Profile the rest of the command, saving and summarizing it on exit
+
+    Args:
+        ctx: Context of the command group; the profile is written when it closes
+        output: Stats file; nothing is profiled if ``None``
+    """
+    if output is None:
+        return
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+
+    def finish() -> None:
+        profiler.disable()
+        output.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(output)
+        console.print(profile_table(output))
+        console.print(f"Profile saved to: [blue]{output}[/blue]")
+
+    ctx.call_on_close(finish)
+    profiler.enable()
+
+
+def profile_table(stats_path: Path, limit: int = TOP_FUNCTIONS) -> Table:
+    """Functions that took the most time themselves, from a stats file"""
+    import pstats
+
+    stats = pstats.Stats(str(stats_path))
+    table = Table(title="Profile (top functions by own time)")
+    table.add_column("Function", style="cyan")
+    table.add_column("Own (s)", justify="right")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("Calls", justify="right")
+    functions = stats.get_stats_profile().func_profiles
+    rows = sorted(functions.items(), key=lambda item: item[1].tottime, reverse=True)
+    for name, function in rows[:limit]:
+        line = function.line_number
+        location = "/".join(Path(function.file_name).parts[-2:])
+        table.add_row(
+            f"{name} ({location}:{line})" if line else name,
+            f"{function.tottime:.3f}",
+            f"{function.cumtime:.3f}",
+            function.ncalls,
+        )
+    return table
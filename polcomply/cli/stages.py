@@ -0,0 +1,37 @@
+"""
+Stage-time breakdown table for batch commands
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+from typing import Any
+
+from rich.table import Table
+
+
+def stage_table(timings: dict[str, Any]) -> Table:
+    """
+    Table of time spent per pipeline stage (see ``polcomply.timing``)
+
+    Args:
+        timings: ``Timings.to_dict()`` result, summed over all workers
+
+    Returns:
+        Rich table, slowest stage first
+    """
+    stages = timings.get("stages", {})
+    total = sum(s["seconds"] for s in stages.values()) or 1.0
+    table = Table(title="Time by Stage (all workers)")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("Share", justify="right")
+    table.add_column("Calls", justify="right")
+    for name, stats in stages.items():
+        table.add_row(
+            name,
+            f"{1000 * stats['seconds']:.1f}",
+            f"{100 * stats['seconds'] / total:.0f}%",
+            str(stats["calls"]),
+        )
+    return table
@@ -5,6 +5,21 @@ Licensed under the Business Source License 1.1 (BSL).
 See LICENSE file for full terms.
 """
 
-from .csv_to_fa import CSVToFAMapper, MappingError
+from typing import TYPE_CHECKING
 
-__all__ = ["CSVToFAMapper", "MappingError"]
+from .._lazy import lazy_attributes
+
+if TYPE_CHECKING:
+    from .batch import map_files
+    from .csv_to_fa import CSVToFAMapper, MappingError
+
+# Loaded on first access (PEP 562): the mapper pulls in pandas
+_LAZY_ATTRIBUTES = {
+    "CSVToFAMapper": ".csv_to_fa",
+    "MappingError": ".csv_to_fa",
+    "map_files": ".batch",
+}
+
+__all__ = ["CSVToFAMapper", "MappingError", "map_files"]
+
+__getattr__, __dir__ = lazy_attributes(globals(), _LAZY_ATTRIBUTES)
@@ -0,0 +1,232 @@
+"""
+Parallel CSV/Excel to FA-3 XML batch mapping
+
+Each worker process loads the mapping config (and XSD schema) once, then
+reads, maps, validates and streams every input it is given exactly once.
+Results are collected into one JSON-serializable report.
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from ..timing import Timings, collect
+from ..validators.xsd import XSDValidator
+from .csv_to_fa import CSVToFAMapper, MappingError
+from .excel import EXCEL_SUFFIXES
+
+logger = logging.getLogger(__name__)
+
+INPUT_SUFFIXES = (".csv", *EXCEL_SUFFIXES)
+
+# Errors kept per file in the report; totals are always exact
+MAX_REPORTED_ERRORS = 100
+
+# Per-process state, set up once by ``_init_worker``
+_mapper: CSVToFAMapper | None = None
+_validator: XSDValidator | None = None
+
+
+def collect_inputs(paths: Iterable[Path]) -> list[Path]:
+    """
+    Expand files and directories into the list of inputs to map
+
+    Args:
+        paths: Input files, or directories whose CSV/Excel files are mapped
+
+    Returns:
+        Input files in a stable order, without duplicates
+
+    Raises:
+        FileNotFoundError: If a path does not exist
+    """
+    inputs: list[Path] = []
+    for path in paths:
+        if path.is_dir():
+            inputs.extend(
+                sorted(
+                    p
+                    for p in path.iterdir()
+                    if p.is_file() and p.suffix.lower() in INPUT_SUFFIXES
+                )
+            )
+        elif path.is_file():
+            inputs.append(path)
+        else:
+            raise FileNotFoundError(f"Input not found: {path}")
+    return list(dict.fromkeys(inputs))
+
+
+def output_paths(inputs: list[Path], output_dir: Path) -> list[Path]:
+    """Name one XML file per input, suffixing stems that would collide"""
+    seen: Counter[str] = Counter()
+    outputs = []
+    for path in inputs:
+        stem = path.stem
+        seen[stem] += 1
+        if seen[stem] > 1:
+            stem = f"{stem}_{seen[stem]}"
+        outputs.append(output_dir / f"{stem}.xml")
+    return outputs
+
+
+def _init_worker(config_path: Path, schema_path: Path | None) -> None:
+    """Build the mapper and validator once per worker process"""
+    global _mapper, _validator
+    _mapper = CSVToFAMapper(config_path)
+    _validator = XSDValidator(schema_path) if schema_path else None
+
+
+def _mapping_error(error: MappingError) -> dict[str, Any]:
+    return {"message": error.message, "field": error.field, "row": error.row}
+
+
+def map_file(input_path: Path, output_path: Path) -> dict[str, Any]:
+    """
+    Map one input with this worker's mapper; never raises
+
+    Args:
+        input_path: CSV/Excel file to map
+        output_path: FA-3 XML file to write
+
+    Returns:
+        Per-file report entry with status ``ok``, ``invalid`` (XML written but
+        rejected by the schema) or ``failed`` (no XML written), and the time
+        spent per stage (``stages``)
+    """
+    if _mapper is None:
+        raise RuntimeError("Batch worker is not initialized")
+
+    started = time.perf_counter()
+    result: dict[str, Any] = {
+        "input": str(input_path),
+        "output": None,
+        "status": "failed",
+        "invoices": 0,
+        "error_count": 0,
+        "errors": [],
+        "missing_required": [],
+    }
+    with collect() as timings:
+        try:
+            df = _mapper.map_columns(_mapper.read_csv(input_path))
+            result["invoices"] = len(df)
+            result["missing_required"] = [
+                f["field"]
+                for f in _mapper.get_missing_fields_report(df)["missing_required"]
+            ]
+
+            data_errors = _mapper.validate_data(df)
+            if data_errors:
+                result["error_count"] = len(data_errors)
+                result["errors"] = [
+                    _mapping_error(e) for e in data_errors[:MAX_REPORTED_ERRORS]
+                ]
+            else:
+                schema_errors = _mapper.write_file(
+                    df, output_path, validator=_validator
+                )
+                result["output"] = str(output_path)
+                result["status"] = "invalid" if schema_errors else "ok"
+                result["error_count"] = len(schema_errors)
+                result["errors"] = [
+                    e.to_dict() for e in schema_errors[:MAX_REPORTED_ERRORS]
+                ]
+        except MappingError as e:
+            result["error_count"] = 1
+            result["errors"] = [_mapping_error(e)]
+        except Exception as e:
+            logger.exception(f"Batch mapping failed for {input_path}")
+            result["error_count"] = 1
+            result["errors"] = [{"message": f"Unexpected error: {e}"}]
+
+    result["stages"] = timings.to_dict()
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def _map_pair(paths: tuple[Path, Path]) -> dict[str, Any]:
+    return map_file(*paths)
+
+
+def map_files(
+    inputs: list[Path],
+    output_dir: Path,
+    config_path: Path,
+    schema_path: Path | None = None,
+    workers: int | None = None,
+    report_path: Path | None = None,
+) -> dict[str, Any]:
+    """
+    Map many CSV/Excel files to FA-3 XML in a process pool
+
+    Args:
+        inputs: Input files (see ``collect_inputs``)
+        output_dir: Directory for the generated XML files
+        config_path: Path to mapping configuration YAML
+        schema_path: Validate every invoice against this XSD (optional)
+        workers: Worker processes (default: CPU count); 1 maps in-process
+        report_path: Also write the report to this JSON file (optional)
+
+    Returns:
+        Consolidated report with a ``summary``, the time per ``stages`` summed
+        over all workers, and one entry per input, in input order
+
+    Raises:
+        MappingError: If the mapping config cannot be loaded
+        ValidationError: If the XSD schema is invalid
+    """
+    started = time.perf_counter()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(inputs) or 1))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    jobs = list(zip(inputs, output_paths(inputs, output_dir), strict=True))
+
+    # Fail fast on a broken config or schema instead of in every worker
+    _init_worker(config_path, schema_path)
+    if workers == 1:
+        files = [_map_pair(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(config_path, schema_path),
+        ) as pool:
+            files = list(pool.map(_map_pair, jobs))
+
+    statuses = Counter(f["status"] for f in files)
+    timings = Timings()
+    for entry in files:
+        timings.merge(entry.pop("stages"))
+    report = {
+        "config": str(config_path),
+        "schema": str(schema_path) if schema_path else None,
+        "workers": workers,
+        "seconds": round(time.perf_counter() - started, 4),
+        "summary": {
+            "files": len(files),
+            "ok": statuses["ok"],
+            "invalid": statuses["invalid"],
+            "failed": statuses["failed"],
+            "invoices": sum(f["invoices"] for f in files if f["output"]),
+        },
+        "stages": timings.to_dict(),
+        "files": files,
+    }
+
+    if report_path is not None:
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(
+            json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+        logger.info(f"Batch report saved to: {report_path}")
+
+    return report
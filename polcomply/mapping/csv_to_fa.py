@@ -6,18 +6,203 @@ See LICENSE file for full terms.
 """
 
 import logging
+import os
 import re
-import xml.etree.ElementTree as ET
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from dataclasses import dataclass
 from datetime import date, datetime
-from decimal import Decimal, InvalidOperation
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from io import BytesIO
+from itertools import repeat
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
 
+import numpy as np
 import pandas as pd
 import yaml
+from lxml import etree
+
+from ..timing import record, timed
+from ..validators.xsd import ValidationError, XSDValidator
+from .excel import DEFAULT_CHUNKSIZE, EXCEL_SUFFIXES, iter_excel, read_excel
 
 logger = logging.getLogger(__name__)
 
+# Layout of one ``Faktura``: (tag, field, default) leaves and (tag, [children])
+# groups. Groups are always written; leaves only when a value or default exists.
+INVOICE_LAYOUT: list[Any] = [
+    ("tns:NrFaktury", "invoice_number", None),
+    ("tns:DataWystawienia", "issue_date", None),
+    ("tns:DataSprzedazy", "sale_date", None),
+    ("tns:TerminPlatnosci", "due_date", None),
+    (
+        "tns:Sprzedawca",
+        [
+            ("tns:NIP", "seller_nip", None),
+            ("tns:Nazwa", "seller_name", None),
+            (
+                "tns:Adres",
+                [
+                    ("tns:Ulica", "seller_street", None),
+                    ("tns:Miejscowosc", "seller_city", None),
+                    ("tns:KodPocztowy", "seller_postal_code", None),
+                    ("tns:Kraj", "seller_country", "PL"),
+                ],
+            ),
+        ],
+    ),
+    (
+        "tns:Nabywca",
+        [
+            ("tns:NIP", "buyer_nip", None),
+            ("tns:Nazwa", "buyer_name", None),
+            (
+                "tns:Adres",
+                [
+                    ("tns:Ulica", "buyer_street", None),
+                    ("tns:Miejscowosc", "buyer_city", None),
+                    ("tns:KodPocztowy", "buyer_postal_code", None),
+                    ("tns:Kraj", "buyer_country", "PL"),
+                ],
+            ),
+        ],
+    ),
+    (
+        "tns:PozycjeFaktury",
+        [
+            # One item per row
+            (
+                "tns:PozycjaFaktury",
+                [
+                    ("tns:Nazwa", "item_name", None),
+                    ("tns:Ilosc", "item_quantity", None),
+                    ("tns:JednostkaMiary", "item_unit", "szt"),
+                    ("tns:CenaJednostkowa", "item_net_price", None),
+                    ("tns:StawkaPodatku", "item_vat_rate", None),
+                    ("tns:WartoscNetto", "item_net_amount", None),
+                    ("tns:WartoscVAT", "item_vat_amount", None),
+                    ("tns:WartoscBrutto", "item_gross_amount", None),
+                ],
+            )
+        ],
+    ),
+    (
+        "tns:Podsumowanie",
+        [
+            ("tns:WartoscNetto", "total_net_amount", None),
+            ("tns:WartoscVAT", "total_vat_amount", None),
+            ("tns:WartoscBrutto", "total_gross_amount", None),
+        ],
+    ),
+    (
+        "tns:Platnosc",
+        [
+            ("tns:FormaPlatnosci", "payment_method", "P"),
+            ("tns:TerminPlatnosci", "payment_due_date", None),
+        ],
+    ),
+    ("tns:RodzajFaktury", "invoice_type", "VAT"),
+    ("tns:Waluta", "currency", "PLN"),
+]
+
+
+# Scenario used when the config defines no ``scenarios``
+DEFAULT_SCENARIO = "default"
+
+
+def layout_from_xpaths(fields: dict[str, dict[str, Any]]) -> list[Any]:
+    """
+    Build an ``INVOICE_LAYOUT``-style tree from scenario field xpaths
+
+    Paths are relative to ``Faktura``; groups appear in the order their first
+    field is declared. Fields with a fixed ``value`` become constant leaves.
+
+    Args:
+        fields: Scenario ``fields`` section of the mapping config
+
+    Returns:
+        Nested layout of ``(tag, field, default)`` leaves and
+        ``(tag, [children])`` groups
+    """
+    root: list[Any] = []
+    groups: dict[tuple[str, ...], list[Any]] = {(): root}
+
+    for field_name, field_config in fields.items():
+        xpath = field_config.get("xpath")
+        if not xpath:
+            continue
+        steps = [step for step in xpath.strip("/").split("/") if step]
+        for depth in range(1, len(steps)):
+            path = tuple(steps[:depth])
+            if path not in groups:
+                groups[path] = []
+                groups[path[:-1]].append((steps[depth - 1], groups[path]))
+
+        parent = groups[tuple(steps[:-1])]
+        if "value" in field_config:
+            parent.append((steps[-1], None, str(field_config["value"])))
+        else:
+            parent.append((steps[-1], field_name, field_config.get("default")))
+
+    return root
+
+
+@dataclass(frozen=True, slots=True)
+class _Leaf:
+    """Compiled leaf: pre-rendered tags, position in the row tuple, default"""
+
+    tag: str  # lxml ``{uri}Name``
+    start: str  # indentation and start tag
+    end: str
+    column: int  # -1 when the input has no such column
+    default: str | None  # already escaped
+    raw_default: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class _Group:
+    """Compiled group element: pre-rendered tags and its children"""
+
+    tag: str
+    start: str
+    end: str
+    empty: str  # self-closing form, used when no child was written
+    children: tuple["_Leaf | _Group", ...]
+
+
+_PlanNode = _Leaf | _Group
+
+
+@dataclass(frozen=True, slots=True)
+class _Plan:
+    """Compiled scenarios for one column set, sharing one row tuple layout"""
+
+    fields: tuple[str, ...]  # formatted columns, in row tuple order
+    selector: int  # row tuple position of the discriminator, -1 if absent
+    by_value: dict[str, tuple[_PlanNode, ...]]  # upper-cased value -> nodes
+    default: tuple[_PlanNode, ...]
+
+    def nodes_for(self, values: tuple[str | None, ...]) -> tuple[_PlanNode, ...]:
+        """Nodes of the scenario selected by a row's discriminator value"""
+        if self.selector < 0:
+            return self.default
+        key = values[self.selector]
+        if key is None:
+            return self.default
+        return self.by_value.get(key.strip().upper(), self.default)
+
+
+# Text escaping as done by lxml's serializer
+_XML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", "\r": "&#13;"})
+_XML_INVALID_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_XML_DECLARATION = b"<?xml version='1.0' encoding='utf-8'?>\n"
+
+
+def _escape(text: str) -> str:
+    return text.translate(_XML_ESCAPES)
+
 
 class MappingError(Exception):
     """Exception raised for mapping errors"""
@@ -55,6 +240,40 @@ class CSVToFAMapper:
         self.fields = self.config.get("fields", {})
         self.csv_columns = self.config.get("csv_columns", {}).get("default_mapping", {})
         self.validation_rules = self.config.get("validation", {})
+        self.scenarios = self.config.get("scenarios", {}) or {}
+        self.scenario_selection = self.config.get("scenario_selection", {}) or {}
+
+        # Field types from every scenario; top-level ``fields`` take precedence
+        self.field_types: dict[str, str] = {}
+        for scenario in self.scenarios.values():
+            for field_name, field_config in scenario.get("fields", {}).items():
+                self.field_types.setdefault(
+                    field_name, field_config.get("type", "string")
+                )
+        for field_name, field_config in self.fields.items():
+            self.field_types[field_name] = field_config.get("type", "string")
+
+        # Decimal fields with ``decimal_places`` (amounts) are rounded half up
+        # to that exponent; other decimals keep their exact text
+        self.decimal_exponents: dict[str, Decimal] = {}
+        field_sections = [s.get("fields", {}) for s in self.scenarios.values()]
+        for fields in [*field_sections, self.fields]:
+            for field_name, field_config in fields.items():
+                places = field_config.get("decimal_places")
+                if places is not None:
+                    self.decimal_exponents[field_name] = Decimal(1).scaleb(-places)
+
+        self._layouts: dict[str, list[Any]] = (
+            {
+                name: layout_from_xpaths(scenario.get("fields", {}))
+                for name, scenario in self.scenarios.items()
+            }
+            if self.scenarios
+            else {DEFAULT_SCENARIO: INVOICE_LAYOUT}
+        )
+        self._qnames: dict[str, str] = {}
+        self._invoice_tags: dict[bool, tuple[str, str]] = {}
+        self._plans: dict[tuple[Any, ...], _Plan] = {}
 
         logger.info(f"FA-3 mapper initialized with config: {config_path}")
 
@@ -67,34 +286,103 @@ class CSVToFAMapper:
         except Exception as e:
             raise MappingError(f"Failed to load mapping config: {e}")
 
-    def read_csv(self, csv_path: Path, **kwargs: Any) -> pd.DataFrame:
+    def _text_columns(self, column_mapping: dict[str, str] | None) -> dict[str, Any]:
+        """Input columns mapped to string fields, to be read as text"""
+        return {
+            column: str
+            for column, field_name in (column_mapping or self.csv_columns).items()
+            if self.field_types.get(field_name) == "string"
+        }
+
+    def _loaded(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Convert string fields to string type to prevent pandas from auto-converting
+        for field_name, field_config in self.fields.items():
+            if field_config.get("type") == "string" and field_name in df.columns:
+                df[field_name] = df[field_name].astype(str)
+        return df
+
+    @timed("read")
+    def read_csv(
+        self,
+        csv_path: Path,
+        column_mapping: dict[str, str] | None = None,
+        **kwargs: Any,
+    ) -> pd.DataFrame:
         """
         Read CSV file with pandas
 
+        Excel workbooks are read with the fast engine from ``mapping.excel``
+        (mapped columns only, Parquet sidecar cache) unless pandas arguments
+        are given.
+
         Args:
             csv_path: Path to CSV file
+            column_mapping: Mapping the data will be mapped with (optional)
             **kwargs: Additional arguments for pandas.read_csv
 
         Returns:
             DataFrame with CSV data
         """
+        # Keep text columns (NIPs, postal codes) as read, e.g. leading zeros
+        text_columns = self._text_columns(column_mapping)
+        excel = csv_path.suffix.lower() in EXCEL_SUFFIXES
+
         try:
-            # Try to detect file format
-            if csv_path.suffix.lower() in [".xlsx", ".xls"]:
-                df = pd.read_excel(csv_path, **kwargs)
+            if excel and not kwargs:
+                columns = list(column_mapping or self.csv_columns) or None
+                df = read_excel(csv_path, columns=columns, text_columns=text_columns)
             else:
-                df = pd.read_csv(csv_path, **kwargs)
-
-            # Convert string fields to string type to prevent pandas from auto-converting
-            for field_name, field_config in self.fields.items():
-                if field_config.get("type") == "string" and field_name in df.columns:
-                    df[field_name] = df[field_name].astype(str)
+                if text_columns:
+                    kwargs.setdefault("dtype", text_columns)
+                if excel:
+                    df = pd.read_excel(csv_path, **kwargs)
+                else:
+                    df = pd.read_csv(csv_path, **kwargs)
 
+            df = self._loaded(df)
             logger.info(f"Loaded CSV with {len(df)} rows and {len(df.columns)} columns")
             return df
         except Exception as e:
             raise MappingError(f"Failed to read CSV file: {e}")
 
+    def iter_chunks(
+        self,
+        csv_path: Path,
+        column_mapping: dict[str, str] | None = None,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read a CSV/Excel file as DataFrame chunks of ``chunksize`` rows
+
+        Args:
+            csv_path: Path to CSV/Excel file
+            column_mapping: Mapping the data will be mapped with (optional)
+            chunksize: Rows per chunk
+
+        Yields:
+            Unmapped DataFrames, indexed by row number in the file
+        """
+        text_columns = self._text_columns(column_mapping)
+        try:
+            if csv_path.suffix.lower() in EXCEL_SUFFIXES:
+                chunks: Iterable[pd.DataFrame] = iter_excel(
+                    csv_path,
+                    columns=list(column_mapping or self.csv_columns) or None,
+                    text_columns=text_columns,
+                    chunksize=chunksize,
+                )
+            else:
+                chunks = pd.read_csv(
+                    csv_path, dtype=text_columns or None, chunksize=chunksize
+                )
+            for df in chunks:
+                yield self._loaded(df)
+        except MappingError:
+            raise
+        except Exception as e:
+            raise MappingError(f"Failed to read CSV file: {e}")
+
+    @timed("map")
     def map_columns(
         self, df: pd.DataFrame, column_mapping: dict[str, str] | None = None
     ) -> pd.DataFrame:
@@ -127,6 +415,7 @@ class CSVToFAMapper:
         logger.info(f"Mapped {len(mapping)} columns")
         return df_mapped
 
+    @timed("check")
     def validate_data(self, df: pd.DataFrame) -> list[MappingError]:
         """
         Validate DataFrame data according to mapping rules
@@ -298,6 +587,101 @@ class CSVToFAMapper:
 
         return errors
 
+    def _qname(self, tag: str) -> str:
+        """Resolve a ``prefix:Name`` tag from the config to lxml's ``{uri}Name``"""
+        qname = self._qnames.get(tag)
+        if qname is None:
+            prefix, _, local = tag.rpartition(":")
+            uri = self.namespaces.get(prefix) if prefix else None
+            qname = f"{{{uri}}}{local}" if uri else local
+            self._qnames[tag] = qname
+        return qname
+
+    def write_xml(
+        self,
+        df: pd.DataFrame | Iterable[pd.DataFrame],
+        sink: BinaryIO | Path | str,
+        validator: XSDValidator | None = None,
+    ) -> list[ValidationError]:
+        """
+        Stream FA-3 XML for a DataFrame to a binary sink
+
+        Each ``Faktura`` is rendered from text templates, optionally validated
+        and written before the next row is read, so memory use is bounded by
+        a single invoice. With a validator each invoice is also built as an
+        element and validated, so nothing is parsed back. The prolog and root
+        tags are written directly; invoices inherit the root's namespaces.
+
+        Args:
+            df: DataFrame with mapped data, or an iterable of mapped chunks
+                (see ``iter_mapped``)
+            sink: Binary file object or path to write UTF-8 XML to
+            validator: Validate every ``Faktura`` against this schema while
+                writing (optional)
+
+        Returns:
+            Validation errors of all invoices (empty if valid or not validated)
+        """
+        errors: list[ValidationError] = []
+        frames = [df] if isinstance(df, pd.DataFrame) else df
+        # Summed per row and reported once; chunks are read between rows
+        render_seconds = validate_seconds = 0.0
+        root_start, root_end = self._tags(
+            self.config.get("root_element", "tns:FA"), declare=True
+        )
+
+        try:
+            with ExitStack() as stack:
+                stream: BinaryIO = (
+                    stack.enter_context(open(sink, "wb"))
+                    if isinstance(sink, str | os.PathLike)
+                    else sink
+                )
+                stream.write(_XML_DECLARATION)
+                stream.write(f"{root_start}\n".encode())
+                for frame in frames:
+                    started = time.perf_counter()
+                    plan = self._compile_plan(frame)
+                    rows = self._formatted_rows(frame, escape=validator is None)
+                    for values in rows:
+                        nodes = plan.nodes_for(values)
+                        if validator is not None:
+                            # Built from the raw values; rendered once escaped
+                            invoice = self._build_invoice(nodes, values)
+                            rendered = time.perf_counter()
+                            render_seconds += rendered - started
+                            errors.extend(validator.validate_element(invoice))
+                            started = time.perf_counter()
+                            validate_seconds += started - rendered
+                            values = tuple(
+                                None if value is None else _escape(value)
+                                for value in values
+                            )
+                        stream.write(self._render_invoice(nodes, values).encode())
+                    render_seconds += time.perf_counter() - started
+                stream.write(root_end.encode())
+        finally:
+            record("render_xml", render_seconds)
+            if validator is not None:
+                record("xsd_validate", validate_seconds)
+
+        logger.info("FA-3 XML generated successfully")
+        return errors
+
+    def generate_xml_bytes(self, df: pd.DataFrame) -> bytes:
+        """
+        Generate FA-3 XML from DataFrame as UTF-8 bytes
+
+        Args:
+            df: DataFrame with mapped data
+
+        Returns:
+            XML document as bytes, ready for ``XSDValidator.validate``
+        """
+        buffer = BytesIO()
+        self.write_xml(df, buffer)
+        return buffer.getvalue()
+
     def generate_xml(self, df: pd.DataFrame) -> str:
         """
         Generate FA-3 XML from DataFrame
@@ -308,178 +692,291 @@ class CSVToFAMapper:
         Returns:
             XML string
         """
-        # Create root element
-        root_tag = self.config.get("root_element", "tns:FA")
-        root = ET.Element(root_tag)
-
-        # Add namespace declarations
-        for prefix, uri in self.namespaces.items():
-            root.set(f"xmlns:{prefix}", uri)
-
-        # Process each row (assuming single invoice per CSV for now)
-        for idx, row in df.iterrows():
-            self._process_invoice_row(
-                root,
-                row,
-                (
-                    int(idx)
-                    if isinstance(idx, int | str) and str(idx).isdigit()
-                    else None
-                ),
-            )
+        return self.generate_xml_bytes(df).decode("utf-8")
 
-        # Convert to string
-        ET.indent(root, space="  ", level=0)
-        xml_str = ET.tostring(root, encoding="unicode", xml_declaration=True)
+    def iter_invoice_documents(self, df: pd.DataFrame) -> Iterator[bytes]:
+        """
+        Generate one standalone FA-3 document per row
 
-        logger.info("FA-3 XML generated successfully")
-        return xml_str
+        KSeF takes a single ``Faktura`` per submission, so each document has
+        the invoice as its root instead of the ``root_element`` wrapper.
 
-    def _process_invoice_row(
-        self, root: ET.Element, row: pd.Series, row_idx: int | None
-    ) -> None:
-        """Process single invoice row"""
-        # Create invoice structure based on FA-3 schema
-        faktura = ET.SubElement(root, "tns:Faktura")
-
-        # Map basic fields
-        self._map_field(faktura, row, "invoice_number", "tns:NrFaktury")
-        self._map_field(faktura, row, "issue_date", "tns:DataWystawienia")
-        self._map_field(faktura, row, "sale_date", "tns:DataSprzedazy")
-        self._map_field(faktura, row, "due_date", "tns:TerminPlatnosci")
-
-        # Map seller information
-        seller = ET.SubElement(faktura, "tns:Sprzedawca")
-        self._map_field(seller, row, "seller_nip", "tns:NIP")
-        self._map_field(seller, row, "seller_name", "tns:Nazwa")
-
-        seller_address = ET.SubElement(seller, "tns:Adres")
-        self._map_field(seller_address, row, "seller_street", "tns:Ulica")
-        self._map_field(seller_address, row, "seller_city", "tns:Miejscowosc")
-        self._map_field(seller_address, row, "seller_postal_code", "tns:KodPocztowy")
-        self._map_field(seller_address, row, "seller_country", "tns:Kraj", default="PL")
-
-        # Map buyer information
-        buyer = ET.SubElement(faktura, "tns:Nabywca")
-        self._map_field(buyer, row, "buyer_nip", "tns:NIP")
-        self._map_field(buyer, row, "buyer_name", "tns:Nazwa")
-
-        buyer_address = ET.SubElement(buyer, "tns:Adres")
-        self._map_field(buyer_address, row, "buyer_street", "tns:Ulica")
-        self._map_field(buyer_address, row, "buyer_city", "tns:Miejscowosc")
-        self._map_field(buyer_address, row, "buyer_postal_code", "tns:KodPocztowy")
-        self._map_field(buyer_address, row, "buyer_country", "tns:Kraj", default="PL")
-
-        # Map invoice items
-        self._map_invoice_items(faktura, row)
-
-        # Map totals
-        self._map_totals(faktura, row)
-
-        # Map payment information
-        self._map_payment_info(faktura, row)
-
-        # Map invoice type
-        self._map_field(
-            faktura, row, "invoice_type", "tns:RodzajFaktury", default="VAT"
-        )
+        Args:
+            df: DataFrame with mapped data
 
-        # Map currency
-        self._map_field(faktura, row, "currency", "tns:Waluta", default="PLN")
+        Yields:
+            UTF-8 XML document of each row's ``Faktura``
+        """
+        plan = self._compile_plan(df)
+        for values in self._formatted_rows(df):
+            nodes = plan.nodes_for(values)
+            invoice = self._render_invoice(nodes, values, standalone=True)
+            yield _XML_DECLARATION + invoice.encode()
 
-    def _map_field(
-        self,
-        parent: ET.Element,
-        row: pd.Series,
-        field_name: str,
-        xml_tag: str,
-        default: str | None = None,
-    ) -> None:
-        """Map a single field to XML element"""
-        value = row.get(field_name)
+    def _compile_plan(self, df: pd.DataFrame) -> _Plan:
+        """
+        Compile every scenario layout into templates for a DataFrame's columns
 
-        if pd.isna(value) or value is None:
-            if default is not None:
-                value = default
-            else:
-                return  # Skip if no value and no default
+        Tags, indentation and defaults are rendered once; per row only the
+        pre-formatted values are filled in. All scenarios read one shared row
+        tuple, so a mixed file is formatted and rendered in a single pass.
+        Plans are cached per column set.
+        """
+        key = tuple(df.columns)
+        cached = self._plans.get(key)
+        if cached is not None:
+            return cached
+
+        available = set(df.columns)
+        fields: list[str] = []
+        positions: dict[str, int] = {}
+
+        def position(field_name: str | None) -> int:
+            if field_name is None or field_name not in available:
+                return -1
+            if field_name not in positions:
+                positions[field_name] = len(fields)
+                fields.append(field_name)
+            return positions[field_name]
+
+        def compile_nodes(nodes: list[Any], depth: int) -> tuple[_PlanNode, ...]:
+            indent = "  " * depth
+            compiled: list[_PlanNode] = []
+            for tag, spec, *rest in nodes:
+                name = self._prefixed(tag)
+                if isinstance(spec, list):
+                    compiled.append(
+                        _Group(
+                            self._qname(tag),
+                            f"{indent}<{name}>\n",
+                            f"{indent}</{name}>\n",
+                            f"{indent}<{name}/>\n",
+                            compile_nodes(spec, depth + 1),
+                        )
+                    )
+                    continue
+                raw = rest[0]
+                compiled.append(
+                    _Leaf(
+                        self._qname(tag),
+                        f"{indent}<{name}>",
+                        f"</{name}>\n",
+                        position(spec),
+                        _escape(raw) if raw is not None else None,
+                        raw,
+                    )
+                )
+            return tuple(compiled)
 
-        # Format value based on field type
-        field_config = self.fields.get(field_name, {})
-        field_type = field_config.get("type", "string")
+        compiled = {
+            name: compile_nodes(layout, 1) for name, layout in self._layouts.items()
+        }
+        default_name = self.scenario_selection.get("default") or next(iter(compiled))
+        if default_name not in compiled:
+            raise MappingError(f"Unknown default scenario '{default_name}'")
+
+        by_value: dict[str, tuple[_PlanNode, ...]] = {}
+        for value, name in (self.scenario_selection.get("values") or {}).items():
+            if name not in compiled:
+                raise MappingError(f"Unknown scenario '{name}' for value '{value}'")
+            by_value[str(value).strip().upper()] = compiled[name]
+
+        selector = position(self.scenario_selection.get("field"))
+        plan = _Plan(
+            fields=tuple(fields),
+            selector=selector,
+            by_value=by_value,
+            default=compiled[default_name],
+        )
+        self._plans[key] = plan
+        return plan
+
+    def _prefixed(self, tag: str) -> str:
+        """Serialized name of a config tag (prefix kept only if it is declared)"""
+        prefix, _, local = tag.rpartition(":")
+        return tag if prefix and prefix in self.namespaces else local
+
+    def _tags(self, tag: str, declare: bool = False) -> tuple[str, str]:
+        """Start and end tag of a config tag, declaring the namespaces if asked"""
+        name = self._prefixed(tag)
+        if not declare:
+            return f"<{name}>", f"</{name}>"
+        element = etree.Element(self._qname(tag), nsmap=self.namespaces or None)
+        empty = etree.tostring(element, encoding="unicode")
+        return empty[:-2] + ">", f"</{name}>"
+
+    def _format_column(
+        self, field_name: str, series: pd.Series, escape: bool = True
+    ) -> list[str | None]:
+        """
+        Pre-format one column to XML text (``None`` where empty)
 
-        if field_type == "date" and isinstance(value, str):
-            # Keep date as string for XML
-            pass
-        elif field_type == "decimal":
-            try:
-                value = str(Decimal(str(value)))
-            except (InvalidOperation, ValueError):
-                logger.warning(f"Invalid decimal value for {field_name}: {value}")
-                return
+        Each distinct value is formatted once; rows then pick their text by
+        their code from ``pd.factorize``.
+        """
+        codes, uniques = pd.factorize(series)
+        formatted = self._format_values(field_name, uniques, escape)
+        # Code -1 marks a missing value and picks the trailing None
+        formatted.append(None)
+        return list(np.array(formatted, dtype=object)[codes])
+
+    def _format_values(
+        self, field_name: str, values: pd.Index, escape: bool
+    ) -> list[str | None]:
+        """XML text of distinct, non-missing values of one field"""
+        field_type = self.field_types.get(field_name, "string")
+        if field_type == "decimal":
+            return [self._format_decimal(field_name, value) for value in values]
+
+        if field_type == "date" and isinstance(values, pd.DatetimeIndex):
+            texts = values.strftime("%Y-%m-%d")
+        else:
+            texts = values.astype(str)
+        invalid = texts.str.contains(_XML_INVALID_CHARS)
+        if invalid.any():
+            raise MappingError(
+                f"Value '{texts[invalid][0]!r}' contains characters not allowed in XML",
+                field=field_name,
+            )
+        if escape:
+            texts = texts.str.translate(_XML_ESCAPES)
+        return list(texts)
 
-        # Create XML element
-        element = ET.SubElement(parent, xml_tag)
-        element.text = str(value)
-
-    def _map_invoice_items(self, faktura: ET.Element, row: pd.Series) -> None:
-        """Map invoice items"""
-        pozycje = ET.SubElement(faktura, "tns:PozycjeFaktury")
-
-        # For now, assume single item per row
-        # In a real implementation, you might have multiple items in a single row
-        pozycja = ET.SubElement(pozycje, "tns:PozycjaFaktury")
-
-        self._map_field(pozycja, row, "item_name", "tns:Nazwa")
-        self._map_field(pozycja, row, "item_quantity", "tns:Ilosc")
-        self._map_field(pozycja, row, "item_unit", "tns:JednostkaMiary", default="szt")
-        self._map_field(pozycja, row, "item_net_price", "tns:CenaJednostkowa")
-        self._map_field(pozycja, row, "item_vat_rate", "tns:StawkaPodatku")
-        self._map_field(pozycja, row, "item_net_amount", "tns:WartoscNetto")
-        self._map_field(pozycja, row, "item_vat_amount", "tns:WartoscVAT")
-        self._map_field(pozycja, row, "item_gross_amount", "tns:WartoscBrutto")
-
-    def _map_totals(self, faktura: ET.Element, row: pd.Series) -> None:
-        """Map invoice totals"""
-        podsumowanie = ET.SubElement(faktura, "tns:Podsumowanie")
-
-        self._map_field(podsumowanie, row, "total_net_amount", "tns:WartoscNetto")
-        self._map_field(podsumowanie, row, "total_vat_amount", "tns:WartoscVAT")
-        self._map_field(podsumowanie, row, "total_gross_amount", "tns:WartoscBrutto")
-
-    def _map_payment_info(self, faktura: ET.Element, row: pd.Series) -> None:
-        """Map payment information"""
-        platnosc = ET.SubElement(faktura, "tns:Platnosc")
-
-        self._map_field(
-            platnosc, row, "payment_method", "tns:FormaPlatnosci", default="P"
+    def _format_decimal(self, field_name: str, value: Any) -> str | None:
+        try:
+            number = Decimal(str(value))
+            exponent = self.decimal_exponents.get(field_name)
+            if exponent is not None:
+                number = number.quantize(exponent, rounding=ROUND_HALF_UP)
+            return str(number)
+        except (InvalidOperation, ValueError):
+            logger.warning(f"Invalid decimal value for {field_name}: {value}")
+            return None
+
+    def _formatted_rows(self, df: pd.DataFrame, escape: bool = True) -> Any:
+        """Iterate row tuples of pre-formatted values in plan column order"""
+        fields = self._compile_plan(df).fields
+        if not fields:
+            return repeat((), len(df))
+        return zip(
+            *(self._format_column(f, df[f], escape) for f in fields), strict=True
         )
-        self._map_field(platnosc, row, "payment_due_date", "tns:TerminPlatnosci")
 
-    def process_csv(
+    def _render_invoice(
         self,
-        csv_path: Path,
-        output_path: Path | None = None,
-        column_mapping: dict[str, str] | None = None,
+        nodes: tuple[_PlanNode, ...],
+        values: tuple[str | None, ...],
+        standalone: bool = False,
     ) -> str:
         """
-        Process CSV file and generate FA-3 XML
+        Render the ``Faktura`` of one row from the compiled template
+
+        A standalone invoice declares the namespaces itself; otherwise it
+        inherits them from the root element it is written into.
+        """
+        tags = self._invoice_tags.get(standalone)
+        if tags is None:
+            tags = self._invoice_tags[standalone] = self._tags(
+                "tns:Faktura", declare=standalone
+            )
+        start, end = tags
+        out = [start, "\n"]
+        self._render_nodes(nodes, values, out)
+        out += (end, "\n")
+        return "".join(out)
+
+    def _build_invoice(
+        self, nodes: tuple[_PlanNode, ...], values: tuple[str | None, ...]
+    ) -> etree._Element:
+        """Build the ``Faktura`` of one row as an element, laid out as rendered"""
+        invoice = etree.Element(
+            self._qname("tns:Faktura"), nsmap=self.namespaces or None
+        )
+        self._build_nodes(invoice, nodes, values)
+        etree.indent(invoice, space="  ")
+        invoice.tail = "\n"
+        return invoice
+
+    def _build_nodes(
+        self,
+        parent: etree._Element,
+        nodes: tuple[_PlanNode, ...],
+        values: tuple[str | None, ...],
+    ) -> None:
+        for node in nodes:
+            if isinstance(node, _Leaf):
+                text = values[node.column] if node.column >= 0 else None
+                if text is None:
+                    text = node.raw_default
+                if text is not None:
+                    etree.SubElement(parent, node.tag).text = text
+                continue
+            self._build_nodes(etree.SubElement(parent, node.tag), node.children, values)
+
+    def _render_nodes(
+        self,
+        nodes: tuple[_PlanNode, ...],
+        values: tuple[str | None, ...],
+        out: list[str],
+    ) -> None:
+        for node in nodes:
+            if isinstance(node, _Leaf):
+                text = values[node.column] if node.column >= 0 else None
+                if text is None:
+                    text = node.default
+                if text is not None:
+                    out += (node.start, text, node.end)
+                continue
+            mark = len(out)
+            out.append(node.start)
+            self._render_nodes(node.children, values, out)
+            if len(out) == mark + 1:
+                out[mark] = node.empty
+            else:
+                out.append(node.end)
+
+    def load_mapped(
+        self, csv_path: Path, column_mapping: dict[str, str] | None = None
+    ) -> pd.DataFrame:
+        """
+        Read, map and validate an input file
 
         Args:
-            csv_path: Path to input CSV file
-            output_path: Path to output XML file (optional)
+            csv_path: Path to input CSV/Excel file
             column_mapping: Custom column mapping (optional)
 
         Returns:
-            Generated XML string
+            Mapped DataFrame, ready for ``write_xml``
+
+        Raises:
+            MappingError: If the file cannot be read or its data is invalid
+        """
+        df = self.read_csv(csv_path, column_mapping)
+        return self._checked(self.map_columns(df, column_mapping))
+
+    def iter_mapped(
+        self,
+        csv_path: Path,
+        column_mapping: dict[str, str] | None = None,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+    ) -> Iterator[pd.DataFrame]:
         """
-        # Read CSV
-        df = self.read_csv(csv_path)
+        Chunked ``load_mapped``: read, map and validate ``chunksize`` rows at
+        a time, for ``write_xml`` to stream
 
-        # Map columns
-        df_mapped = self.map_columns(df, column_mapping)
+        Raises:
+            MappingError: If the file cannot be read or a chunk is invalid
+        """
+        chunks = self.iter_chunks(csv_path, column_mapping, chunksize)
+        while True:
+            with timed("read"):
+                df = next(chunks, None)
+            if df is None:
+                return
+            yield self._checked(self.map_columns(df, column_mapping))
 
-        # Validate data
+    def _checked(self, df_mapped: pd.DataFrame) -> pd.DataFrame:
+        """Validate mapped data, raising one MappingError for all problems"""
         errors = self.validate_data(df_mapped)
         if errors:
             error_summary = "\n".join(
@@ -491,17 +988,101 @@ class CSVToFAMapper:
                 f"Validation failed with {len(errors)} errors:\n{error_summary}"
             )
 
+        return df_mapped
+
+    def process_csv(
+        self,
+        csv_path: Path,
+        output_path: Path | None = None,
+        column_mapping: dict[str, str] | None = None,
+    ) -> str:
+        """
+        Process CSV file and generate FA-3 XML
+
+        Args:
+            csv_path: Path to input CSV file
+            output_path: Path to output XML file (optional)
+            column_mapping: Custom column mapping (optional)
+
+        Returns:
+            Generated XML string
+        """
+        df_mapped = self.load_mapped(csv_path, column_mapping)
+
         # Generate XML
-        xml_content = self.generate_xml(df_mapped)
+        xml_bytes = self.generate_xml_bytes(df_mapped)
 
         # Save to file if output path specified
         if output_path:
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(xml_content)
+            output_path.write_bytes(xml_bytes)
             logger.info(f"XML saved to: {output_path}")
 
-        return xml_content
+        return xml_bytes.decode("utf-8")
+
+    def convert_file(
+        self,
+        csv_path: Path,
+        output_path: Path,
+        column_mapping: dict[str, str] | None = None,
+        validator: XSDValidator | None = None,
+        chunksize: int | None = None,
+    ) -> list[ValidationError]:
+        """
+        Map an input file straight to an FA-3 XML file
+
+        Unlike ``process_csv`` the document is never held in memory: invoices
+        are streamed to ``output_path`` and validated in the same pass.
+
+        Args:
+            csv_path: Path to input CSV/Excel file
+            output_path: Path to output XML file
+            column_mapping: Custom column mapping (optional)
+            validator: Validate each invoice against this schema (optional)
+            chunksize: Read, map and write this many rows at a time instead
+                of loading the whole input (optional)
+
+        Returns:
+            Schema validation errors (empty if valid or not validated)
+        """
+        data: pd.DataFrame | Iterable[pd.DataFrame]
+        if chunksize:
+            data = self.iter_mapped(csv_path, column_mapping, chunksize)
+        else:
+            data = self.load_mapped(csv_path, column_mapping)
+        return self.write_file(data, output_path, validator=validator)
+
+    def write_file(
+        self,
+        df: pd.DataFrame | Iterable[pd.DataFrame],
+        output_path: Path,
+        validator: XSDValidator | None = None,
+    ) -> list[ValidationError]:
+        """
+        Stream already mapped data to an FA-3 XML file
+
+        The file only appears once it is complete, so an invalid chunk
+        never leaves a truncated document behind.
+
+        Args:
+            df: DataFrame from ``load_mapped`` or chunks from ``iter_mapped``
+            output_path: Path to output XML file
+            validator: Validate each invoice against this schema (optional)
+
+        Returns:
+            Schema validation errors (empty if valid or not validated)
+        """
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        partial = output_path.with_name(f"{output_path.name}.part")
+        try:
+            with open(partial, "wb") as f:
+                errors = self.write_xml(df, f, validator=validator)
+            os.replace(partial, output_path)
+        finally:
+            partial.unlink(missing_ok=True)
+        logger.info(f"XML saved to: {output_path}")
+
+        return errors
 
     def get_missing_fields_report(
         self, df: pd.DataFrame
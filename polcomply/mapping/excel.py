@@ -0,0 +1,318 @@
+"""
+Fast Excel ingestion for the FA-3 mapper
+
+Workbooks are streamed row by row with calamine (``pip install
+python-calamine``) when it is installed, otherwise with openpyxl in read-only
+mode. Only the requested columns are kept and rows are yielded in chunks.
+
+The first read of a sheet also writes a Parquet sidecar next to the workbook
+(``<name>.xlsx.<sheet>.parquet``). Later reads of the unchanged workbook load
+the sidecar instead of parsing Excel; it is rebuilt when the workbook's size or
+modification time changes, when columns it lacks are requested, or when the
+requested columns are to be read with other text columns. pyarrow is only
+imported for the sidecar, so mapping CSV files and records does not need it.
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import importlib.util
+import json
+import logging
+import os
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm", ".xls")
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# Parquet schema metadata key describing the source workbook
+_CACHE_KEY = b"polcomply.excel"
+
+
+def excel_engine() -> str:
+    """Name of the fastest installed engine: ``calamine`` or ``openpyxl``"""
+    if importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
+
+
+def sidecar_path(path: Path, sheet: int | str = 0) -> Path:
+    """Parquet cache file for one sheet of a workbook"""
+    return path.with_name(f"{path.name}.{sheet}.parquet")
+
+
+def _calamine_rows(path: Path, sheet: int | str) -> Iterator[list[Any]]:
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_path(str(path))
+    if isinstance(sheet, int):
+        worksheet = workbook.get_sheet_by_index(sheet)
+    else:
+        worksheet = workbook.get_sheet_by_name(sheet)
+    rows = worksheet.iter_rows() if hasattr(worksheet, "iter_rows") else None
+    for row in rows if rows is not None else worksheet.to_python():
+        # calamine reports empty cells as ""
+        yield [None if value == "" else value for value in row]
+
+
+def _openpyxl_rows(path: Path, sheet: int | str) -> Iterator[tuple[Any, ...]]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = (
+            workbook.worksheets[sheet] if isinstance(sheet, int) else workbook[sheet]
+        )
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _pandas_rows(path: Path, sheet: int | str) -> Iterator[list[Any]]:
+    # Legacy .xls without calamine: openpyxl cannot read it
+    df = pd.read_excel(path, sheet_name=sheet, header=None, dtype=object)
+    for row in df.itertuples(index=False):
+        yield [None if pd.isna(value) else value for value in row]
+
+
+def _rows(path: Path, sheet: int | str) -> Iterator[Any]:
+    engine = excel_engine()
+    if engine == "calamine":
+        return _calamine_rows(path, sheet)
+    if path.suffix.lower() == ".xls":
+        return _pandas_rows(path, sheet)
+    return _openpyxl_rows(path, sheet)
+
+
+def _text(value: Any) -> str:
+    """Cell value as text, without the ``.0`` Excel adds to whole numbers"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _header(row: Iterable[Any]) -> list[str]:
+    return [
+        f"Unnamed: {i}" if value is None else str(value) for i, value in enumerate(row)
+    ]
+
+
+def _chunk(
+    rows: list[list[Any]], names: list[str], text: set[str], start: int
+) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(rows, columns=names)
+    for name in names:
+        if name in text:
+            df[name] = [None if v is None else _text(v) for v in df[name]]
+        elif df[name].dtype == object:
+            values = [v for v in df[name] if v is not None]
+            if values and all(isinstance(v, datetime) for v in values):
+                df[name] = pd.to_datetime(df[name])
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def _parse(
+    path: Path,
+    sheet: int | str,
+    columns: list[str] | None,
+    text_columns: set[str],
+    chunksize: int,
+) -> tuple[list[str], Iterator[pd.DataFrame]]:
+    """Header of the sheet and an iterator over its (selected) row chunks"""
+    rows = _rows(path, sheet)
+    header = _header(next(rows, ()))
+    wanted = set(header) if columns is None else set(columns)
+    selected = [(i, name) for i, name in enumerate(header) if name in wanted]
+    names = [name for _, name in selected]
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        batch: list[list[Any]] = []
+        start = 0
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i, _ in selected]
+            if all(value is None for value in values):
+                continue
+            batch.append(values)
+            if len(batch) >= chunksize:
+                yield _chunk(batch, names, text_columns, start)
+                start += len(batch)
+                batch = []
+        if batch or not start:
+            yield _chunk(batch, names, text_columns, start)
+
+    return header, chunks()
+
+
+def _source_stamp(path: Path, sheet: int | str) -> dict[str, Any]:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sheet": sheet}
+
+
+def _cached_columns(
+    cache: Path,
+    stamp: dict[str, Any],
+    columns: list[str] | None,
+    text_columns: set[str],
+) -> list[str] | None:
+    """Columns to read from a valid sidecar, or ``None`` if it must be rebuilt"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        metadata = pq.read_schema(cache).metadata or {}
+        info = json.loads(metadata[_CACHE_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+    if info.get("source") != stamp:
+        return None
+    wanted = set(info["header"] if columns is None else columns)
+    selected = [c for c in info["header"] if c in wanted]
+    chosen = set(selected)
+    if not chosen <= set(info["columns"]):
+        return None
+    # Text columns were converted when the sidecar was written
+    if text_columns & chosen != set(info.get("text_columns", ())) & chosen:
+        return None
+    return selected
+
+
+def _read_sidecar(
+    cache: Path, columns: list[str], chunksize: int
+) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(cache)
+    start = 0
+    for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+        df = batch.to_pandas()
+        df.index = pd.RangeIndex(start, start + len(df))
+        start += len(df)
+        yield df
+    if not start:
+        yield parquet.schema_arrow.empty_table().select(columns).to_pandas()
+
+
+def _write_through(
+    chunks: Iterator[pd.DataFrame],
+    cache: Path,
+    header: list[str],
+    stamp: dict[str, Any],
+    text_columns: set[str],
+) -> Iterator[pd.DataFrame]:
+    """Yield chunks while copying them into a new sidecar"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    partial = cache.with_name(f"{cache.name}.part")
+    writer: pq.ParquetWriter | None = None
+    caching = True
+    try:
+        for df in chunks:
+            if caching:
+                try:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    if writer is None:
+                        schema = pa.schema(
+                            pa.field(f.name, pa.string()) if f.type == pa.null() else f
+                            for f in table.schema
+                        ).with_metadata(
+                            {
+                                _CACHE_KEY: json.dumps(
+                                    {
+                                        "source": stamp,
+                                        "header": header,
+                                        "columns": list(df.columns),
+                                        "text_columns": sorted(
+                                            text_columns & set(df.columns)
+                                        ),
+                                    }
+                                )
+                            }
+                        )
+                        writer = pq.ParquetWriter(partial, schema)
+                    writer.write_table(table.cast(writer.schema))
+                except (OSError, pa.ArrowException) as e:
+                    # The cache is only an optimization; keep streaming
+                    logger.warning(f"Not caching {cache.name}: {e}")
+                    caching = False
+            yield df
+        if caching and writer is not None:
+            writer.close()
+            writer = None
+            os.replace(partial, cache)
+            logger.info(f"Cached workbook sheet to: {cache}")
+    finally:
+        if writer is not None:
+            writer.close()
+        partial.unlink(missing_ok=True)
+
+
+def iter_excel(
+    path: Path,
+    columns: list[str] | None = None,
+    text_columns: Iterable[str] = (),
+    sheet: int | str = 0,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    cache: bool = True,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream one sheet of a workbook as DataFrame chunks
+
+    The first row is the header. Columns missing from the sheet are ignored,
+    as are rows with no value in any selected column. Row indexes continue
+    across chunks, so they match ``pd.read_excel`` on the whole sheet.
+
+    Args:
+        path: Path to .xlsx/.xls workbook
+        columns: Header names to keep (default: all)
+        text_columns: Columns to keep as text, e.g. NIPs and postal codes
+        sheet: Sheet index or name
+        chunksize: Rows per yielded DataFrame
+        cache: Read and write the Parquet sidecar
+
+    Yields:
+        DataFrames of at most ``chunksize`` rows (one empty frame if the
+        sheet has no data rows)
+    """
+    stamp = _source_stamp(path, sheet)
+    sidecar = sidecar_path(path, sheet)
+    text = set(text_columns)
+    if cache and sidecar.exists():
+        cached = _cached_columns(sidecar, stamp, columns, text)
+        if cached is not None:
+            logger.info(f"Reading cached workbook sheet: {sidecar}")
+            yield from _read_sidecar(sidecar, cached, chunksize)
+            return
+
+    logger.info(f"Reading workbook with {excel_engine()}: {path}")
+    header, chunks = _parse(path, sheet, columns, text, chunksize)
+    if cache:
+        chunks = _write_through(chunks, sidecar, header, stamp, text)
+    yield from chunks
+
+
+def read_excel(
+    path: Path,
+    columns: list[str] | None = None,
+    text_columns: Iterable[str] = (),
+    sheet: int | str = 0,
+    cache: bool = True,
+) -> pd.DataFrame:
+    """
+    Read one sheet of a workbook into a single DataFrame
+
+    See ``iter_excel`` for the arguments.
+    """
+    chunks = list(iter_excel(path, columns, text_columns, sheet, cache=cache))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks)
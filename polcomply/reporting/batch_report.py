@@ -0,0 +1,337 @@
+"""
+Consolidated report for a batch of validated files
+
+``BatchReport`` aggregates per-file results as they arrive (e.g. from a
+process pool). Each file contributes a compact entry built by ``file_entry``:
+status, error counts by code and by field, and its first few errors. Error
+objects are never kept, so memory stays flat however many errors a batch has.
+
+The report is written as a JSON summary (``report.json``) and an HTML
+dashboard (``index.html``) linking to per-file HTML reports.
+"""
+
+import html
+import json
+import re
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from polcomply.timing import Timings
+from polcomply.validators.xsd import ValidationError
+
+from .html_report import _STYLE
+
+# Errors kept per file entry; counts are always exact
+MAX_LISTED_ERRORS = 5
+
+# Fields listed in the "top failing fields" table
+TOP_FIELDS = 20
+
+STATUSES = ("ok", "invalid", "failed")
+
+# libxml2 messages start with the element they are about
+_FIELD_PATTERN = re.compile(r"^Element '(?:\{[^}]*\})?([^']+)'")
+
+
+def error_field(message: str) -> str | None:
+    """Local name of the element an XSD error refers to, if any"""
+    match = _FIELD_PATTERN.match(message)
+    return match.group(1) if match else None
+
+
+def file_entry(
+    file: str,
+    errors: Iterable[ValidationError],
+    schema_version: str | None = None,
+    details: str | None = None,
+    seconds: float | None = None,
+) -> dict[str, Any]:
+    """
+    Summarize the validation result of one file
+
+    Args:
+        file: Validated file
+        errors: Its validation errors
+        schema_version: Schema the file was validated against; ``None`` marks
+            the file as failed (unreadable or no matching schema)
+        details: Path of the per-file report, relative to the batch report
+        seconds: Validation time
+
+    Returns:
+        JSON-serializable entry for ``BatchReport.add``
+    """
+    codes: Counter[str] = Counter()
+    fields: Counter[str] = Counter()
+    listed: list[dict[str, Any]] = []
+    for error in errors:
+        codes[error.code or "VALIDATION_ERROR"] += 1
+        field = error_field(error.message)
+        if field:
+            fields[field] += 1
+        if len(listed) < MAX_LISTED_ERRORS:
+            listed.append(error.to_dict())
+
+    error_count = sum(codes.values())
+    if schema_version is None:
+        status = "failed"
+    else:
+        status = "invalid" if error_count else "ok"
+    return {
+        "file": file,
+        "status": status,
+        "schema_version": schema_version,
+        "error_count": error_count,
+        "codes": dict(codes),
+        "fields": dict(fields),
+        "errors": listed,
+        "details": details,
+        "seconds": seconds,
+    }
+
+
+class BatchReport:
+    """Incrementally aggregated report over many validated files"""
+
+    def __init__(self, title: str = "Batch Validation Report"):
+        """
+        Initialize an empty report
+
+        Args:
+            title: Heading of the HTML dashboard
+        """
+        self.title = title
+        self.started = datetime.now()
+        self.files: list[dict[str, Any]] = []
+        self.statuses: Counter[str] = Counter()
+        self.codes: Counter[str] = Counter()
+        self.fields: Counter[str] = Counter()
+        # Files each code / field occurs in
+        self.code_files: Counter[str] = Counter()
+        self.field_files: Counter[str] = Counter()
+        self.timings = Timings()
+
+    def add(self, entry: dict[str, Any]) -> None:
+        """Add one file's entry (see ``file_entry``) and its ``stages``, if any"""
+        stages = entry.pop("stages", None)
+        if stages:
+            self.timings.merge(stages)
+        self.files.append(entry)
+        self.statuses[entry["status"]] += 1
+        self.codes.update(entry["codes"])
+        self.fields.update(entry["fields"])
+        self.code_files.update(entry["codes"].keys())
+        self.field_files.update(entry["fields"].keys())
+
+    @property
+    def summary(self) -> dict[str, int]:
+        """File counts by status and the total number of errors"""
+        return {
+            "files": len(self.files),
+            **{status: self.statuses[status] for status in STATUSES},
+            "errors": sum(self.codes.values()),
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-serializable report; files are sorted by path"""
+        return {
+            "title": self.title,
+            "generated_at": self.started.isoformat(timespec="seconds"),
+            "summary": self.summary,
+            "error_codes": [
+                {"code": code, "errors": count, "files": self.code_files[code]}
+                for code, count in self.codes.most_common()
+            ],
+            "top_fields": [
+                {"field": field, "errors": count, "files": self.field_files[field]}
+                for field, count in self.fields.most_common(TOP_FIELDS)
+            ],
+            "stages": self.timings.to_dict(),
+            "files": sorted(self.files, key=lambda f: f["file"]),
+        }
+
+    def write_json(self, path: Path) -> Path:
+        """Write the JSON summary"""
+        path.write_text(
+            json.dumps(self.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+        return path
+
+    def iter_html(self) -> Iterator[str]:
+        """
+        Render the HTML dashboard, chunk by chunk
+
+        Yields:
+            Consecutive pieces of the HTML document
+        """
+        report = self.to_dict()
+        summary = report["summary"]
+        title = html.escape(self.title)
+        status_class = "valid" if summary["ok"] == summary["files"] else "invalid"
+        yield f"""<!DOCTYPE html>
+<html lang="pl">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>PolComply - {title}</title>
+    <style>
+{_STYLE}{_DASHBOARD_STYLE}    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🎯 PolComply - {title}</h1>
+            <div class="subtitle">Generated {report["generated_at"]}</div>
+            <div class="status {status_class}">
+                {summary["ok"]} of {summary["files"]} files valid
+            </div>
+        </div>
+
+        <div class="report-info">
+            <h2>Summary</h2>
+            <div class="info-grid">
+"""
+        for label, key in (
+            ("Files", "files"),
+            ("Valid", "ok"),
+            ("Invalid", "invalid"),
+            ("Failed", "failed"),
+            ("Total Errors", "errors"),
+        ):
+            yield (
+                f'<div class="info-item"><div class="label">{label}</div>'
+                f'<div class="value">{summary[key]}</div></div>\n'
+            )
+        yield "            </div>\n        </div>\n"
+
+        if report["error_codes"]:
+            yield from self._histogram(
+                "Errors by Code", "Error Code", "code", report["error_codes"]
+            )
+        if report["top_fields"]:
+            yield from self._histogram(
+                "Top Failing Fields", "Field", "field", report["top_fields"]
+            )
+
+        yield """
+        <div class="errors-section">
+            <h2>Files</h2>
+            <table class="error-table">
+                <thead>
+                    <tr>
+                        <th>File</th>
+                        <th>Status</th>
+                        <th>Schema</th>
+                        <th>Errors</th>
+                        <th>First Error</th>
+                    </tr>
+                </thead>
+                <tbody>
+"""
+        # Problems first, then by path
+        order = {status: i for i, status in enumerate(("failed", "invalid", "ok"))}
+        for entry in sorted(report["files"], key=lambda f: order[f["status"]]):
+            name = html.escape(entry["file"])
+            if entry["details"]:
+                name = f'<a href="{html.escape(entry["details"])}">{name}</a>'
+            first = entry["errors"][0]["message"] if entry["errors"] else ""
+            yield (
+                f"<tr><td>{name}</td>"
+                f'<td><span class="badge {entry["status"]}">{entry["status"]}</span></td>'
+                f'<td>{html.escape(entry["schema_version"] or "N/A")}</td>'
+                f'<td class="error-count">{entry["error_count"]}</td>'
+                f'<td class="error-message">{html.escape(first)}</td></tr>\n'
+            )
+        yield """                </tbody>
+            </table>
+        </div>
+
+        <div class="footer">
+            <p>Generated by PolComply v0.1.0 | <a href="https://polcomply.pl" style="color: white;">polcomply.pl</a></p>
+        </div>
+    </div>
+</body>
+</html>"""
+
+    def _histogram(
+        self, heading: str, label: str, key: str, rows: list[dict[str, Any]]
+    ) -> Iterator[str]:
+        top = rows[0]["errors"]
+        yield f"""
+        <div class="report-info">
+            <h2>{heading}</h2>
+            <table class="error-table">
+                <thead>
+                    <tr>
+                        <th>{label}</th>
+                        <th>Errors</th>
+                        <th>Files</th>
+                        <th></th>
+                    </tr>
+                </thead>
+                <tbody>
+"""
+        for row in rows:
+            width = max(1, round(100 * row["errors"] / top))
+            yield (
+                f'<tr><td><span class="error-code">{html.escape(row[key])}</span></td>'
+                f'<td class="error-count">{row["errors"]}</td>'
+                f'<td class="error-count">{row["files"]}</td>'
+                f'<td class="bar-cell"><div class="bar" style="width: {width}%"></div></td>'
+                "</tr>\n"
+            )
+        yield "                </tbody>\n            </table>\n        </div>\n"
+
+    def write_html(self, path: Path) -> Path:
+        """Stream the HTML dashboard to a file"""
+        with open(path, "w", encoding="utf-8") as f:
+            for chunk in self.iter_html():
+                f.write(chunk)
+        return path
+
+    def write(self, output_dir: Path) -> tuple[Path, Path]:
+        """
+        Write ``report.json`` and ``index.html`` to a directory
+
+        Returns:
+            Paths of the JSON summary and the HTML dashboard
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return (
+            self.write_json(output_dir / "report.json"),
+            self.write_html(output_dir / "index.html"),
+        )
+
+
+_DASHBOARD_STYLE = """\
+        .report-info .error-table {
+            margin-top: 0.5rem;
+        }
+        .bar-cell {
+            width: 40%;
+        }
+        .bar {
+            height: 0.75rem;
+            border-radius: 4px;
+            background: #ef4444;
+        }
+        .badge {
+            display: inline-block;
+            padding: 0.25rem 0.5rem;
+            border-radius: 4px;
+            font-size: 0.85rem;
+            font-weight: 600;
+            color: white;
+        }
+        .badge.ok {
+            background: #10b981;
+        }
+        .badge.invalid {
+            background: #f59e0b;
+        }
+        .badge.failed {
+            background: #ef4444;
+        }
+"""
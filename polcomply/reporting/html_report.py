@@ -1,191 +1,139 @@
-"""HTML report generator for validation results"""
+"""
+HTML report generator for validation results
 
+Reports are produced as a stream of chunks (``iter_html_report``), so they can
+be written to a file or sent as an HTTP response without building the whole
+document in memory. Identical errors are grouped; the full error list is
+embedded as compact JSON and paged in the browser, which keeps reports with
+100k errors small and quick to open.
+"""
+
+import html
+import json
+from collections.abc import Iterator, Sequence
 from datetime import datetime
 from pathlib import Path
+from typing import Any
 
 from polcomply.validators.xsd import ValidationError
 
+# Error rows per JSON chunk yielded by ``iter_html_report``
+ROWS_PER_CHUNK = 2000
 
-def generate_html_report(
-    errors: list[ValidationError],
-    filename: str = "report.html",
-    output_path: Path | None = None,
-) -> str:
-    """
-    Generate HTML report from validation errors
-
-    Args:
-        errors: List of validation errors
-        filename: Name of the file being validated
-        output_path: Optional path to save the report
-
-    Returns:
-        HTML content as string
-    """
+# Groups rendered server-side in the summary table; the rest are only paged
+MAX_GROUP_ROWS = 500
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    error_count = len(errors)
-    is_valid = error_count == 0
+# Errors per page in the browser
+PAGE_SIZE = 100
 
-    status_class = "valid" if is_valid else "invalid"
-    status_text = "✅ VALID" if is_valid else f"❌ {error_count} ERRORS FOUND"
-
-    # Build errors table
-    if is_valid:
-        errors_html = """
-            <div class="success-message">
-                <svg viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
-                    <path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path>
-                    <polyline points="22 4 12 14.01 9 11.01"></polyline>
-                </svg>
-                <h3>Document is valid!</h3>
-                <p>Your XML document complies with FA-3 schema requirements.</p>
-            </div>
-        """
-    else:
-        error_rows = []
-        for i, error in enumerate(errors):
-            error_rows.append(
-                f"""
-                <tr>
-                    <td>{i+1}</td>
-                    <td class="error-location">Line {error.line or 'N/A'}, Col {error.column or 'N/A'}</td>
-                    <td><span class="error-code">{error.code or 'VALIDATION_ERROR'}</span></td>
-                    <td class="error-message">{error.message}</td>
-                </tr>
-            """
-            )
-
-        errors_html = f"""
-            <table class="error-table">
-                <thead>
-                    <tr>
-                        <th>#</th>
-                        <th>Location</th>
-                        <th>Error Code</th>
-                        <th>Message</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {''.join(error_rows)}
-                </tbody>
-            </table>
-        """
-
-    html_content = f"""<!DOCTYPE html>
-<html lang="pl">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>PolComply - FA-3 Validation Report</title>
-    <style>
-        * {{
+_STYLE = """\
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
-        body {{
+        }
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             min-height: 100vh;
             padding: 2rem;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1200px;
             margin: 0 auto;
-        }}
-        .header {{
+        }
+        .header {
             background: white;
             border-radius: 12px;
             padding: 2rem;
             margin-bottom: 2rem;
             box-shadow: 0 10px 30px rgba(0, 0, 0, 0.1);
-        }}
-        .header h1 {{
+        }
+        .header h1 {
             color: #333;
             margin-bottom: 0.5rem;
-        }}
-        .header .subtitle {{
+        }
+        .header .subtitle {
             color: #666;
             font-size: 0.9rem;
-        }}
-        .status {{
+        }
+        .status {
             display: inline-block;
             padding: 0.5rem 1rem;
             border-radius: 8px;
             font-weight: 600;
             margin-top: 1rem;
-        }}
-        .status.valid {{
+        }
+        .status.valid {
             background: #10b981;
             color: white;
-        }}
-        .status.invalid {{
+        }
+        .status.invalid {
             background: #ef4444;
             color: white;
-        }}
-        .report-info {{
+        }
+        .report-info {
             background: white;
             border-radius: 12px;
             padding: 1.5rem;
             margin-bottom: 2rem;
             box-shadow: 0 10px 30px rgba(0, 0, 0, 0.1);
-        }}
-        .report-info h2 {{
+        }
+        .report-info h2 {
             color: #333;
             margin-bottom: 1rem;
             font-size: 1.2rem;
-        }}
-        .info-grid {{
+        }
+        .info-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
             gap: 1rem;
-        }}
-        .info-item {{
+        }
+        .info-item {
             padding: 0.75rem;
             background: #f9fafb;
             border-radius: 8px;
-        }}
-        .info-item .label {{
+        }
+        .info-item .label {
             color: #666;
             font-size: 0.85rem;
             margin-bottom: 0.25rem;
-        }}
-        .info-item .value {{
+        }
+        .info-item .value {
             color: #333;
             font-weight: 600;
-        }}
-        .errors-section {{
+        }
+        .errors-section {
             background: white;
             border-radius: 12px;
             padding: 1.5rem;
             box-shadow: 0 10px 30px rgba(0, 0, 0, 0.1);
-        }}
-        .errors-section h2 {{
+        }
+        .errors-section h2 {
             color: #333;
             margin-bottom: 1rem;
             font-size: 1.2rem;
-        }}
-        .error-table {{
+        }
+        .error-table {
             width: 100%;
             border-collapse: collapse;
-        }}
-        .error-table th {{
+        }
+        .error-table th {
             background: #f9fafb;
             padding: 0.75rem;
             text-align: left;
             font-size: 0.85rem;
             color: #666;
             border-bottom: 2px solid #e5e7eb;
-        }}
-        .error-table td {{
+        }
+        .error-table td {
             padding: 0.75rem;
             border-bottom: 1px solid #e5e7eb;
-        }}
-        .error-table tr:hover {{
+        }
+        .error-table tr:hover {
             background: #f9fafb;
-        }}
-        .error-code {{
+        }
+        .error-code {
             display: inline-block;
             padding: 0.25rem 0.5rem;
             background: #fee2e2;
@@ -193,31 +141,149 @@ def generate_html_report(
             border-radius: 4px;
             font-size: 0.85rem;
             font-weight: 600;
-        }}
-        .error-location {{
+        }
+        .error-location {
             color: #666;
             font-size: 0.85rem;
-        }}
-        .error-message {{
+        }
+        .error-message {
+            color: #333;
+        }
+        .errors-section h3 {
             color: #333;
-        }}
-        .success-message {{
+            margin: 1.5rem 0 0.75rem;
+            font-size: 1rem;
+        }
+        .error-count {
+            font-weight: 600;
+            text-align: right;
+        }
+        .pager {
+            display: flex;
+            align-items: center;
+            gap: 1rem;
+            margin-bottom: 0.75rem;
+            color: #666;
+            font-size: 0.85rem;
+        }
+        .pager button {
+            padding: 0.25rem 0.75rem;
+            border: 1px solid #e5e7eb;
+            border-radius: 4px;
+            background: white;
+            cursor: pointer;
+        }
+        .success-message {
             text-align: center;
             padding: 3rem;
             color: #10b981;
-        }}
-        .success-message svg {{
+        }
+        .success-message svg {
             width: 64px;
             height: 64px;
             margin-bottom: 1rem;
-        }}
-        .footer {{
+        }
+        .footer {
             text-align: center;
             margin-top: 2rem;
             color: white;
             opacity: 0.8;
-        }}
-    </style>
+        }
+"""
+
+# Renders one page of the embedded error rows; messages come from the groups
+_SCRIPT = """\
+(function () {
+    var groups = JSON.parse(document.getElementById("error-groups").textContent);
+    var rows = JSON.parse(document.getElementById("error-rows-data").textContent);
+    var body = document.getElementById("error-rows");
+    var info = document.getElementById("page-info");
+    var pages = Math.max(1, Math.ceil(rows.length / PAGE_SIZE));
+    var page = 0;
+
+    function cell(tr, text, cls) {
+        var td = document.createElement("td");
+        if (cls) { td.className = cls; }
+        td.textContent = text;
+        tr.appendChild(td);
+        return td;
+    }
+
+    function render() {
+        var start = page * PAGE_SIZE;
+        var fragment = document.createDocumentFragment();
+        rows.slice(start, start + PAGE_SIZE).forEach(function (row, i) {
+            var group = groups[row[2]];
+            var tr = document.createElement("tr");
+            cell(tr, String(start + i + 1));
+            cell(tr, "Line " + (row[0] || "N/A") + ", Col " + (row[1] || "N/A"),
+                 "error-location");
+            var code = document.createElement("span");
+            code.className = "error-code";
+            code.textContent = group[0];
+            cell(tr, "").appendChild(code);
+            cell(tr, group[1], "error-message");
+            fragment.appendChild(tr);
+        });
+        body.replaceChildren(fragment);
+        info.textContent = "Page " + (page + 1) + " of " + pages;
+    }
+
+    document.getElementById("page-prev").onclick = function () {
+        if (page > 0) { page--; render(); }
+    };
+    document.getElementById("page-next").onclick = function () {
+        if (page < pages - 1) { page++; render(); }
+    };
+    render();
+})();
+"""
+
+
+def _json(value: Any) -> str:
+    """JSON safe to embed in a ``<script>`` element"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).replace(
+        "<", "\\u003c"
+    )
+
+
+def _group(
+    errors: Sequence[ValidationError],
+) -> tuple[list[tuple[str, str]], list[int], list[list[int]]]:
+    """
+    Group identical errors
+
+    Returns:
+        Distinct (code, message) pairs, the occurrences of each, and for every
+        group up to five lines it was reported at
+    """
+    index: dict[tuple[str, str], int] = {}
+    counts: list[int] = []
+    lines: list[list[int]] = []
+    for error in errors:
+        key = (error.code or "VALIDATION_ERROR", error.message)
+        g = index.setdefault(key, len(index))
+        if g == len(counts):
+            counts.append(0)
+            lines.append([])
+        counts[g] += 1
+        if error.line and len(lines[g]) < 5:
+            lines[g].append(error.line)
+    return list(index), counts, lines
+
+
+def _head(filename: str, timestamp: str, error_count: int, schema_version: str) -> str:
+    is_valid = error_count == 0
+    status_class = "valid" if is_valid else "invalid"
+    status_text = "✅ VALID" if is_valid else f"❌ {error_count} ERRORS FOUND"
+    return f"""<!DOCTYPE html>
+<html lang="pl">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>PolComply - FA-3 Validation Report</title>
+    <style>
+{_STYLE}    </style>
 </head>
 <body>
     <div class="container">
@@ -234,7 +300,7 @@ def generate_html_report(
             <div class="info-grid">
                 <div class="info-item">
                     <div class="label">File Name</div>
-                    <div class="value">{filename}</div>
+                    <div class="value">{html.escape(filename)}</div>
                 </div>
                 <div class="info-item">
                     <div class="label">Validation Time</div>
@@ -242,7 +308,7 @@ def generate_html_report(
                 </div>
                 <div class="info-item">
                     <div class="label">Schema Version</div>
-                    <div class="value">FA-3 (1-0E)</div>
+                    <div class="value">{html.escape(schema_version)}</div>
                 </div>
                 <div class="info-item">
                     <div class="label">Total Errors</div>
@@ -253,8 +319,21 @@ def generate_html_report(
 
         <div class="errors-section">
             <h2>Validation Results</h2>
-            {errors_html}
-        </div>
+"""
+
+
+_VALID = """
+            <div class="success-message">
+                <svg viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                    <path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path>
+                    <polyline points="22 4 12 14.01 9 11.01"></polyline>
+                </svg>
+                <h3>Document is valid!</h3>
+                <p>Your XML document complies with FA-3 schema requirements.</p>
+            </div>
+"""
+
+_FOOT = """        </div>
 
         <div class="footer">
             <p>Generated by PolComply v0.1.0 | <a href="https://polcomply.pl" style="color: white;">polcomply.pl</a></p>
@@ -263,6 +342,151 @@ def generate_html_report(
 </body>
 </html>"""
 
+
+def _group_table(
+    groups: list[tuple[str, str]], counts: list[int], lines: list[list[int]]
+) -> Iterator[str]:
+    yield f"""
+            <h3>Grouped errors ({len(groups)} distinct)</h3>
+            <table class="error-table">
+                <thead>
+                    <tr>
+                        <th>Error Code</th>
+                        <th>Message</th>
+                        <th>Occurrences</th>
+                        <th>First Lines</th>
+                    </tr>
+                </thead>
+                <tbody>
+"""
+    # Most frequent first; ties keep the order errors were reported in
+    order = sorted(range(len(groups)), key=lambda g: -counts[g])
+    for g in order[:MAX_GROUP_ROWS]:
+        code, message = groups[g]
+        yield (
+            f'<tr><td><span class="error-code">{html.escape(code)}</span></td>'
+            f'<td class="error-message">{html.escape(message)}</td>'
+            f'<td class="error-count">{counts[g]}</td>'
+            f'<td class="error-location">{", ".join(map(str, lines[g])) or "N/A"}</td>'
+            "</tr>\n"
+        )
+    yield "                </tbody>\n            </table>\n"
+    if len(groups) > MAX_GROUP_ROWS:
+        yield (
+            f"            <p>… and {len(groups) - MAX_GROUP_ROWS} more distinct "
+            "errors, listed below.</p>\n"
+        )
+
+
+def iter_html_report(
+    errors: Sequence[ValidationError],
+    filename: str = "report.html",
+    schema_version: str = "FA-3 (1-0E)",
+) -> Iterator[str]:
+    """
+    Generate HTML report from validation errors, chunk by chunk
+
+    Args:
+        errors: List of validation errors
+        filename: Name of the file being validated
+        schema_version: Schema label shown in the report
+
+    Yields:
+        Consecutive pieces of the HTML document
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    yield _head(filename, timestamp, len(errors), schema_version)
+
+    if not errors:
+        yield _VALID
+        yield _FOOT
+        return
+
+    groups, counts, lines = _group(errors)
+    yield from _group_table(groups, counts, lines)
+
+    yield f"""
+            <h3>All errors</h3>
+            <noscript><p>Enable JavaScript to browse all {len(errors)} errors.</p></noscript>
+            <div class="pager">
+                <button type="button" id="page-prev">‹</button>
+                <span id="page-info"></span>
+                <button type="button" id="page-next">›</button>
+            </div>
+            <table class="error-table">
+                <thead>
+                    <tr>
+                        <th>#</th>
+                        <th>Location</th>
+                        <th>Error Code</th>
+                        <th>Message</th>
+                    </tr>
+                </thead>
+                <tbody id="error-rows"></tbody>
+            </table>
+            <script type="application/json" id="error-groups">{_json(groups)}</script>
+            <script type="application/json" id="error-rows-data">["""
+
+    # Rows reference their group instead of repeating code and message
+    index = {group: g for g, group in enumerate(groups)}
+    for start in range(0, len(errors), ROWS_PER_CHUNK):
+        rows = [
+            [
+                error.line or 0,
+                error.column or 0,
+                index[(error.code or "VALIDATION_ERROR", error.message)],
+            ]
+            for error in errors[start : start + ROWS_PER_CHUNK]
+        ]
+        yield ("," if start else "") + _json(rows)[1:-1]
+    yield "]</script>\n            <script>\n"
+    yield _SCRIPT.replace("PAGE_SIZE", str(PAGE_SIZE))
+    yield "            </script>\n"
+    yield _FOOT
+
+
+def write_html_report(
+    errors: Sequence[ValidationError],
+    filename: str,
+    output_path: Path,
+    schema_version: str = "FA-3 (1-0E)",
+) -> Path:
+    """
+    Stream an HTML report to a file
+
+    Args:
+        errors: List of validation errors
+        filename: Name of the file being validated
+        output_path: Path to save the report
+        schema_version: Schema label shown in the report
+
+    Returns:
+        Path of the written report
+    """
+    with open(output_path, "w", encoding="utf-8") as f:
+        for chunk in iter_html_report(errors, filename, schema_version):
+            f.write(chunk)
+    return output_path
+
+
+def generate_html_report(
+    errors: list[ValidationError],
+    filename: str = "report.html",
+    output_path: Path | None = None,
+) -> str:
+    """
+    Generate HTML report from validation errors
+
+    Args:
+        errors: List of validation errors
+        filename: Name of the file being validated
+        output_path: Optional path to save the report
+
+    Returns:
+        HTML content as string
+    """
+    html_content = "".join(iter_html_report(errors, filename))
+
     if output_path:
         output_path.write_text(html_content, encoding="utf-8")
 
@@ -0,0 +1,64 @@
+"""
+Tests for the ``--profile`` option of the CLI command groups
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import pstats
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from polcomply.cli.main import app
+
+EXAMPLES_DIR = Path(__file__).parent.parent.parent / "examples"
+FA3_CONFIG = Path(__file__).parent.parent.parent / "mapping" / "fa3.yaml"
+
+
+class TestProfileOption:
+    """Test profiling whole CLI commands"""
+
+    def test_map_profile_saves_stats(self, tmp_path):
+        """Test the stats cover the mapping code and a summary is printed"""
+        stats_path = tmp_path / "map.pstats"
+
+        result = CliRunner().invoke(
+            app,
+            [
+                "map",
+                "--profile",
+                str(stats_path),
+                "csv-to-fa",
+                str(EXAMPLES_DIR / "basic_invoice.csv"),
+                "-o",
+                str(tmp_path / "out.xml"),
+                "-c",
+                str(FA3_CONFIG),
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        functions = pstats.Stats(str(stats_path)).get_stats_profile().func_profiles
+        assert "read_csv" in functions
+        assert "Profile (top functions by own time)" in result.output
+
+    def test_profile_is_saved_when_the_command_fails(self, tmp_path):
+        """Test a failing command still leaves its profile behind"""
+        stats_path = tmp_path / "validate.pstats"
+
+        result = CliRunner().invoke(
+            app,
+            [
+                "validate",
+                "--profile",
+                str(stats_path),
+                "xml",
+                str(tmp_path / "missing.xml"),
+                "-s",
+                str(tmp_path / "missing.xsd"),
+            ],
+        )
+
+        assert result.exit_code == 1
+        assert stats_path.exists()
@@ -0,0 +1,98 @@
+"""
+Import-time regression tests for the CLI
+
+The CLI runs from pre-commit hooks and CI many times a day, so loading it must
+not import pandas, lxml or the other heavy dependencies of the SDK. Besides
+checking which modules are loaded, ``python -X importtime`` measures it
+against a budget loose enough for slow CI runners.
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import polcomply
+
+# Directory containing the ``polcomply`` package
+PACKAGE_PARENT = Path(polcomply.__file__).resolve().parent.parent
+
+HEAVY_MODULES = {"pandas", "numpy", "lxml", "yaml", "pyarrow", "openpyxl"}
+
+# Import time of the CLI (typer and rich included) is ~100ms; pandas alone
+# adds ~700ms, so a regression lands far above this even on a slow runner
+IMPORT_BUDGET_US = 500_000
+
+
+def _loaded_modules(statement: str) -> set[str]:
+    """Run ``statement`` in a fresh interpreter; top-level modules it loaded"""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"{statement}\nimport sys\nprint('\\n'.join(sys.modules))",
+        ],
+        cwd=PACKAGE_PARENT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {name.split(".")[0] for name in result.stdout.split()}
+
+
+def _importtime(statement: str) -> int:
+    """Cumulative microseconds ``statement`` spends importing polcomply modules"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PACKAGE_PARENT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are part of their top-level entry's cumulative time
+        if not name.startswith("  ") and name.strip().startswith("polcomply"):
+            total += int(cumulative)
+    return total
+
+
+class TestStartup:
+    """Test the CLI and package import lazily"""
+
+    def test_cli_does_not_import_heavy_modules(self):
+        """Test loading the CLI leaves pandas and lxml unimported"""
+        loaded = _loaded_modules("import polcomply.cli.main")
+
+        assert "polcomply" in loaded
+        assert not loaded & HEAVY_MODULES
+
+    def test_cli_import_time_within_budget(self):
+        """Test importing the CLI stays within the import-time budget"""
+        assert 0 < _importtime("import polcomply.cli.main") < IMPORT_BUDGET_US
+
+    def test_package_exports_are_lazy(self):
+        """Test public names load their module on first access only"""
+        loaded = _loaded_modules(
+            "import polcomply, sys; "
+            "assert 'polcomply.mapping.csv_to_fa' not in sys.modules; "
+            "assert polcomply.CSVToFAMapper.__name__ == 'CSVToFAMapper'"
+        )
+
+        assert "pandas" in loaded
+        assert set(polcomply.__all__) <= set(dir(polcomply))
+
+    def test_mapper_works_without_pyarrow(self):
+        """Test only the Excel sidecar needs pyarrow, not the CSV mapper"""
+        # None in sys.modules makes any import of pyarrow fail
+        loaded = _loaded_modules(
+            "import sys; sys.modules['pyarrow'] = None\n"
+            "from polcomply.mapping.csv_to_fa import CSVToFAMapper"
+        )
+
+        assert "pandas" in loaded
@@ -0,0 +1,110 @@
+"""
+Tests for parallel batch mapping
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from polcomply.mapping import batch
+from polcomply.mapping.batch import collect_inputs, map_files, output_paths
+
+
+class TestBatchMapping:
+    """Test mapping many files with one report"""
+
+    FA3_CONFIG = Path(__file__).parent.parent.parent / "mapping" / "fa3.yaml"
+    EXAMPLES_DIR = Path(__file__).parent.parent.parent / "examples"
+
+    @pytest.fixture
+    def inputs_dir(self, tmp_path):
+        """Two valid example invoices and one unreadable workbook"""
+        inputs = tmp_path / "in"
+        inputs.mkdir()
+        for name in ("basic_invoice.csv", "mpp_invoice.csv"):
+            shutil.copy(self.EXAMPLES_DIR / name, inputs / name)
+        (inputs / "notes.txt").write_text("not an invoice", encoding="utf-8")
+        (inputs / "broken.xlsx").write_text("not a workbook", encoding="utf-8")
+        return inputs
+
+    def test_collect_inputs(self, inputs_dir):
+        """Test directories expand to CSV/Excel files in a stable order"""
+        extra = inputs_dir / "mpp_invoice.csv"
+
+        inputs = collect_inputs([inputs_dir, extra])
+
+        assert [p.name for p in inputs] == [
+            "basic_invoice.csv",
+            "broken.xlsx",
+            "mpp_invoice.csv",
+        ]
+        with pytest.raises(FileNotFoundError):
+            collect_inputs([inputs_dir / "missing.csv"])
+
+    def test_output_paths_do_not_collide(self, tmp_path):
+        """Test inputs with the same stem get distinct outputs"""
+        outputs = output_paths(
+            [Path("a/x.csv"), Path("b/x.xlsx"), Path("y.csv")], tmp_path
+        )
+
+        assert [p.name for p in outputs] == ["x.xml", "x_2.xml", "y.xml"]
+
+    def test_map_files_reads_each_input_once(self, inputs_dir, tmp_path, monkeypatch):
+        """Test one read per file, with failures reported instead of raised"""
+        reads: list[str] = []
+        read_csv = batch.CSVToFAMapper.read_csv
+
+        def counting_read_csv(self, path, **kwargs):
+            reads.append(path.name)
+            return read_csv(self, path, **kwargs)
+
+        monkeypatch.setattr(batch.CSVToFAMapper, "read_csv", counting_read_csv)
+        output_dir = tmp_path / "out"
+        report_path = tmp_path / "report.json"
+
+        report = map_files(
+            collect_inputs([inputs_dir]),
+            output_dir,
+            self.FA3_CONFIG,
+            workers=1,
+            report_path=report_path,
+        )
+
+        assert sorted(reads) == ["basic_invoice.csv", "broken.xlsx", "mpp_invoice.csv"]
+        assert report["summary"] == {
+            "files": 3,
+            "ok": 2,
+            "invalid": 0,
+            "failed": 1,
+            "invoices": 2,
+        }
+        basic, broken, mpp = report["files"]
+        assert basic["status"] == mpp["status"] == "ok"
+        assert basic["missing_required"] == []
+        assert (output_dir / "mpp_invoice.xml").read_bytes().count(b"Faktura") == 2
+        assert broken["status"] == "failed"
+        assert broken["output"] is None
+        assert broken["errors"][0]["message"].startswith("Failed to read")
+        assert not (output_dir / "broken.xml").exists()
+        assert report["stages"]["stages"]["read"]["calls"] == 3
+        assert report["stages"]["stages"]["render_xml"]["calls"] == 2
+        assert all("stages" not in f for f in report["files"])
+        assert json.loads(report_path.read_text(encoding="utf-8")) == report
+
+    def test_map_files_in_process_pool(self, inputs_dir, tmp_path):
+        """Test workers produce the same results as in-process mapping"""
+        inputs = collect_inputs([inputs_dir])
+
+        serial = map_files(inputs, tmp_path / "serial", self.FA3_CONFIG, workers=1)
+        parallel = map_files(inputs, tmp_path / "parallel", self.FA3_CONFIG, workers=2)
+
+        assert parallel["workers"] == 2
+        assert parallel["summary"] == serial["summary"]
+        assert (tmp_path / "parallel" / "basic_invoice.xml").read_bytes() == (
+            tmp_path / "serial" / "basic_invoice.xml"
+        ).read_bytes()
@@ -10,7 +10,12 @@ from pathlib import Path
 import pandas as pd
 import pytest
 
-from polcomply.mapping.csv_to_fa import CSVToFAMapper, MappingError
+from polcomply.mapping.csv_to_fa import (
+    CSVToFAMapper,
+    MappingError,
+    layout_from_xpaths,
+)
+from polcomply.validators.xsd import XSDValidator
 
 # Test data directory
 TEST_DATA_DIR = Path(__file__).parent.parent / "examples"
@@ -76,6 +81,7 @@ fields:
   total_net_amount:
     xpath: "tns:Podsumowanie/tns:WartoscNetto"
     type: "decimal"
+    decimal_places: 2
     required: true
     description: "Suma wartości netto"
 
@@ -219,6 +225,109 @@ FA/2024/001,invalid-date,1234567890,Test Company,Test Product,not-a-number,100.0
             file_content = f.read()
         assert "FA/2024/001" in file_content
 
+    def test_convert_file_streams_and_validates(self, sample_config, tmp_path):
+        """Test streaming several invoices with per-invoice schema validation"""
+        csv_content = """Numer faktury,Data wystawienia,NIP sprzedawcy,Nazwa sprzedawcy,Nazwa pozycji,Ilość,Cena netto,Suma netto
+FA/2024/001,2024-01-15,1234567890,Test Company,Test Product,2,100.00,200.00
+FA/2024/002,2024-01-16,1234567890,A & B <Sp. z o.o.>,Test Product,1,50.00,50.00"""
+        csv_path = tmp_path / "two.csv"
+        csv_path.write_text(csv_content, encoding="utf-8")
+
+        def schema(content: str) -> Path:
+            path = tmp_path / f"faktura_{len(content)}.xsd"
+            path.write_text(
+                f"""<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+           targetNamespace="http://example.com/invoice"
+           elementFormDefault="qualified">
+    <xs:element name="Faktura">
+        <xs:complexType><xs:sequence>{content}</xs:sequence></xs:complexType>
+    </xs:element>
+</xs:schema>""",
+                encoding="utf-8",
+            )
+            return path
+
+        lax = XSDValidator(
+            schema(
+                '<xs:any processContents="skip" minOccurs="0" maxOccurs="unbounded"/>'
+            )
+        )
+        strict = XSDValidator(schema('<xs:element name="NrFaktury"/>'))
+        mapper = CSVToFAMapper(sample_config)
+        output_path = tmp_path / "out" / "invoices.xml"
+
+        assert mapper.convert_file(csv_path, output_path, validator=lax) == []
+        xml_bytes = output_path.read_bytes()
+        assert xml_bytes.startswith(b"<?xml version=")
+        # Built and validated invoices serialize exactly like rendered ones
+        mapper.convert_file(csv_path, tmp_path / "plain.xml")
+        assert xml_bytes == (tmp_path / "plain.xml").read_bytes()
+        assert xml_bytes.count(b"<tns:Faktura") == 2
+        # Invoices inherit the namespaces declared on the root
+        assert xml_bytes.count(b"xmlns:tns=") == 1
+        assert lax.validate(xml_bytes)  # root FA is not a schema element
+
+        errors = mapper.convert_file(csv_path, output_path, validator=strict)
+        assert len(errors) == 2  # one per invoice
+
+    def test_generate_xml_bytes(self, sample_config, sample_csv):
+        """Test byte output matches the string output"""
+        mapper = CSVToFAMapper(sample_config)
+        df_mapped = mapper.map_columns(mapper.read_csv(sample_csv))
+
+        xml_bytes = mapper.generate_xml_bytes(df_mapped)
+
+        assert isinstance(xml_bytes, bytes)
+        assert xml_bytes.decode("utf-8") == mapper.generate_xml(df_mapped)
+
+    def test_generate_xml_escapes_values(self, sample_config, tmp_path):
+        """Test template output is well-formed for markup characters"""
+        from lxml import etree
+
+        csv_content = """Numer faktury,Data wystawienia,NIP sprzedawcy,Nazwa sprzedawcy,Nazwa pozycji,Ilość,Cena netto,Suma netto
+FA/2024/001,2024-01-15,1234567890,A & B <Sp. z o.o.>,Test Product,2,100.00,200.00"""
+        csv_path = tmp_path / "escape.csv"
+        csv_path.write_text(csv_content, encoding="utf-8")
+
+        mapper = CSVToFAMapper(sample_config)
+        df_mapped = mapper.map_columns(mapper.read_csv(csv_path))
+        root = etree.fromstring(mapper.generate_xml_bytes(df_mapped))
+
+        ns = {"tns": "http://example.com/invoice"}
+        faktura = root.find("tns:Faktura", ns)
+        assert faktura.findtext("tns:Sprzedawca/tns:Nazwa", namespaces=ns) == (
+            "A & B <Sp. z o.o.>"
+        )
+        assert faktura.findtext("tns:Podsumowanie/tns:WartoscNetto", namespaces=ns) == (
+            "200.00"
+        )
+        assert faktura.findtext("tns:Waluta", namespaces=ns) == "PLN"
+
+    def test_decimals_keep_their_precision(self, sample_config, tmp_path):
+        """Test only amounts are rounded, half up; other decimals stay exact"""
+        from lxml import etree
+
+        csv_content = """Numer faktury,Data wystawienia,NIP sprzedawcy,Nazwa sprzedawcy,Nazwa pozycji,Ilość,Cena netto,Suma netto
+FA/2024/001,2024-01-15,1234567890,Test Company,Test Product,0.125,12.3456,10.005"""
+        csv_path = tmp_path / "precision.csv"
+        csv_path.write_text(csv_content, encoding="utf-8")
+
+        mapper = CSVToFAMapper(sample_config)
+        df_mapped = mapper.map_columns(mapper.read_csv(csv_path))
+        faktura = etree.fromstring(mapper.generate_xml_bytes(df_mapped))[0]
+
+        ns = {"tns": "http://example.com/invoice"}
+
+        def text(path):
+            return faktura.findtext(path, namespaces=ns)
+
+        assert text("tns:PozycjeFaktury/tns:PozycjaFaktury/tns:Ilosc") == "0.125"
+        assert (
+            text("tns:PozycjeFaktury/tns:PozycjaFaktury/tns:CenaJednostkowa")
+            == "12.3456"
+        )
+        assert text("tns:Podsumowanie/tns:WartoscNetto") == "10.01"
+
     def test_process_csv_validation_error(self, sample_config, tmp_path):
         """Test CSV processing with validation errors"""
         # Create CSV with validation errors
@@ -395,6 +504,119 @@ csv_columns:
         assert "0" in xml_content  # 0% VAT rate
 
 
+class TestScenarios:
+    """Test scenario selection from fa3.yaml"""
+
+    FA3_CONFIG = Path(__file__).parent.parent.parent / "mapping" / "fa3.yaml"
+    EXAMPLES_DIR = Path(__file__).parent.parent.parent / "examples"
+    NS = {"tns": "http://crd.gov.pl/wzor/2023/06/21/12348/"}
+
+    def test_layout_from_xpaths(self):
+        """Test xpath lists compile into a nested layout"""
+        layout = layout_from_xpaths(
+            {
+                "number": {"xpath": "tns:Naglowek/tns:P_1"},
+                "flag": {"xpath": "tns:Naglowek/tns:P_23", "value": 1},
+                "nip": {"xpath": "tns:Sprzedawca/tns:Dane/tns:NIP"},
+                "unmapped": {"type": "string"},
+            }
+        )
+
+        assert layout == [
+            ("tns:Naglowek", [("tns:P_1", "number", None), ("tns:P_23", None, "1")]),
+            ("tns:Sprzedawca", [("tns:Dane", [("tns:NIP", "nip", None)])]),
+        ]
+
+    def test_mixed_file_maps_each_row_by_scenario(self):
+        """Test one pass over normal, correction, advance and MPP invoices"""
+        from lxml import etree
+
+        mapper = CSVToFAMapper(self.FA3_CONFIG)
+        frames = [
+            mapper.read_csv(self.EXAMPLES_DIR / name)
+            for name in (
+                "basic_invoice.csv",
+                "correction_invoice.csv",
+                "advance_invoice.csv",
+                "mpp_invoice.csv",
+            )
+        ]
+        df_mapped = mapper.map_columns(pd.concat(frames, ignore_index=True))
+
+        root = etree.fromstring(mapper.generate_xml_bytes(df_mapped))
+        invoices = root.findall("tns:Faktura", self.NS)
+
+        def header(invoice, tag):
+            return invoice.findtext(f"tns:Naglowek/tns:{tag}", namespaces=self.NS)
+
+        assert [header(i, "P_1") for i in invoices] == [
+            "FA/2024/001",
+            "KOR/2024/001",
+            "ZAL/2024/001",
+            "MPP/2024/001",
+        ]
+        assert [header(i, "RodzajFaktury") for i in invoices] == [
+            "VAT",
+            "KOREKTA",
+            "ZALICZKA",
+            "MPP",
+        ]
+        # Correction references the corrected invoice, MPP carries its flag
+        assert header(invoices[1], "P_2") == "FA/2024/001"
+        assert header(invoices[0], "P_2") is None
+        assert header(invoices[3], "P_23") == "1"
+        assert header(invoices[0], "P_23") is None
+        # NIPs keep their leading zeros
+        buyer_nip = invoices[0].findtext(
+            "tns:Nabywca/tns:DaneIdentyfikacyjne/tns:NIP", namespaces=self.NS
+        )
+        assert buyer_nip == "0987654321"
+
+        # The compiled plan is reused for the same columns
+        mapper.generate_xml_bytes(df_mapped)
+        assert len(mapper._plans) == 1
+
+    def test_invoice_documents_are_standalone(self):
+        """Test one document per row, each with Faktura as its root"""
+        from lxml import etree
+
+        mapper = CSVToFAMapper(self.FA3_CONFIG)
+        df_mapped = mapper.map_columns(
+            mapper.read_csv(self.EXAMPLES_DIR / "basic_invoice.csv")
+        )
+        combined = etree.fromstring(mapper.generate_xml_bytes(df_mapped))
+
+        documents = list(mapper.iter_invoice_documents(df_mapped))
+
+        assert len(documents) == len(df_mapped)
+        for document, invoice in zip(documents, combined, strict=True):
+            root = etree.fromstring(document)
+            assert root.tag == f"{{{self.NS['tns']}}}Faktura"
+            assert etree.tostring(root) == etree.tostring(invoice, with_tail=False)
+
+    def test_unknown_scenario_in_selection(self, tmp_path):
+        """Test selection values must name a configured scenario"""
+        config_path = tmp_path / "bad.yaml"
+        config_path.write_text(
+            """scenarios:
+  fv:
+    fields:
+      invoice_number:
+        xpath: "Naglowek/P_1"
+scenario_selection:
+  field: "invoice_type"
+  values:
+    KOREKTA: "korekta"
+""",
+            encoding="utf-8",
+        )
+        mapper = CSVToFAMapper(config_path)
+        df = pd.DataFrame({"invoice_number": ["FV/1"], "invoice_type": ["KOREKTA"]})
+
+        with pytest.raises(MappingError, match="Unknown scenario 'korekta'"):
+            mapper.generate_xml(df)
+
+
 class TestMappingError:
     """Test MappingError exception"""
 
@@ -0,0 +1,102 @@
+"""
+Tests for fast Excel ingestion
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from polcomply.mapping import excel
+from polcomply.mapping.csv_to_fa import CSVToFAMapper
+
+
+class TestExcelIngestion:
+    """Test chunked, column-selective Excel reads and the Parquet sidecar"""
+
+    FA3_CONFIG = Path(__file__).parent.parent.parent / "mapping" / "fa3.yaml"
+    EXAMPLES_DIR = Path(__file__).parent.parent.parent / "examples"
+
+    @pytest.fixture
+    def workbook(self, tmp_path):
+        """Five copies of the basic invoice, with typed cells and extra columns"""
+        df = pd.read_csv(self.EXAMPLES_DIR / "basic_invoice.csv", dtype=str)
+        df = pd.concat([df] * 5, ignore_index=True)
+        df["Numer faktury"] = [f"FA/2024/{i:03d}" for i in range(1, 6)]
+        df["Ilość"] = pd.to_numeric(df["Ilość"])
+        df["Data wystawienia"] = pd.to_datetime(df["Data wystawienia"])
+        df["Uwagi"] = "not mapped"
+        path = tmp_path / "ledger.xlsx"
+        df.to_excel(path, index=False)
+        return path
+
+    def test_read_csv_reads_mapped_columns_only(self, workbook):
+        """Test Excel reads keep mapped columns and text as written"""
+        mapper = CSVToFAMapper(self.FA3_CONFIG)
+
+        df = mapper.read_csv(workbook)
+
+        assert "Uwagi" not in df.columns
+        assert set(df.columns) <= set(mapper.csv_columns)
+        assert list(df["NIP nabywcy"]) == ["0987654321"] * 5
+        assert df["Data wystawienia"].iloc[0] == pd.Timestamp("2024-01-15")
+        assert list(df.index) == list(range(5))
+
+    def test_sidecar_skips_excel_until_workbook_changes(self, workbook, monkeypatch):
+        """Test re-runs read the Parquet sidecar instead of the workbook"""
+        columns = ["Numer faktury", "NIP nabywcy"]
+        first = excel.read_excel(workbook, columns, text_columns=columns)
+        assert excel.sidecar_path(workbook).exists()
+
+        def no_excel(path, sheet):
+            raise AssertionError("workbook parsed again")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(excel, "_rows", no_excel)
+            cached = excel.read_excel(workbook, columns, text_columns=columns)
+            pd.testing.assert_frame_equal(cached, first, check_dtype=False)
+
+            # Columns the sidecar does not hold force a rebuild
+            with pytest.raises(AssertionError, match="parsed again"):
+                excel.read_excel(workbook, ["Uwagi"])
+
+            # So do other text columns: the sidecar holds converted values
+            with pytest.raises(AssertionError, match="parsed again"):
+                excel.read_excel(workbook, columns, text_columns=columns[:1])
+
+        stat = workbook.stat()
+        os.utime(workbook, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        parsed = []
+        rows = excel._rows
+        monkeypatch.setattr(
+            excel, "_rows", lambda path, sheet: parsed.append(path) or rows(path, sheet)
+        )
+        excel.read_excel(workbook, columns, text_columns=columns)
+        assert parsed == [workbook]
+
+    def test_iter_excel_chunks(self, workbook):
+        """Test chunks are bounded and keep file row numbers"""
+        chunks = list(
+            excel.iter_excel(workbook, ["Numer faktury"], chunksize=2, cache=False)
+        )
+
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        assert list(chunks[-1].index) == [4]
+        assert chunks[-1]["Numer faktury"].iloc[0] == "FA/2024/005"
+        assert not excel.sidecar_path(workbook).exists()
+
+    def test_convert_file_in_chunks(self, workbook, tmp_path):
+        """Test chunked conversion writes the same document"""
+        mapper = CSVToFAMapper(self.FA3_CONFIG)
+        whole = tmp_path / "whole.xml"
+        chunked = tmp_path / "chunked.xml"
+
+        assert mapper.convert_file(workbook, whole) == []
+        assert mapper.convert_file(workbook, chunked, chunksize=2) == []
+
+        assert chunked.read_bytes() == whole.read_bytes()
+        assert whole.read_bytes().count(b"<tns:P_1>FA/2024/") == 5
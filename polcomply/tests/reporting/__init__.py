@@ -0,0 +1,6 @@
+"""
+Reporting tests module
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
@@ -0,0 +1,84 @@
+"""
+Tests for the consolidated batch report
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import json
+
+from polcomply.reporting.batch_report import BatchReport, error_field, file_entry
+from polcomply.validators.xsd import ValidationError
+
+NS = "{http://crd.gov.pl/wzor/2023/06/21/12348/}"
+
+
+def _errors(count: int) -> list[ValidationError]:
+    return [
+        ValidationError(
+            f"Element '{NS}KodWaluty': [facet 'length'] bad value",
+            line=i + 1,
+            code="SCHEMAV_CVC_LENGTH_VALID",
+        )
+        for i in range(count)
+    ] + [ValidationError("Premature end of data", line=99, code="XML_SYNTAX_ERROR")]
+
+
+class TestBatchReport:
+    """Test incremental aggregation and report output"""
+
+    def test_error_field(self):
+        """Test the element is read from libxml2 messages"""
+        assert error_field(f"Element '{NS}P_1': This element is not expected.") == (
+            "P_1"
+        )
+        assert error_field("Element 'NIP': bad") == "NIP"
+        assert error_field("Premature end of data") is None
+
+    def test_file_entry_is_compact(self):
+        """Test entries keep counts and only the first few errors"""
+        entry = file_entry("a.xml", _errors(1000), schema_version="FA-3")
+
+        assert entry["status"] == "invalid"
+        assert entry["error_count"] == 1001
+        assert entry["codes"] == {
+            "SCHEMAV_CVC_LENGTH_VALID": 1000,
+            "XML_SYNTAX_ERROR": 1,
+        }
+        assert entry["fields"] == {"KodWaluty": 1000}
+        assert len(entry["errors"]) == 5
+        assert file_entry("b.xml", [], schema_version="FA-3")["status"] == "ok"
+        assert file_entry("c.xml", _errors(0))["status"] == "failed"
+
+    def test_aggregates_and_writes_reports(self, tmp_path):
+        """Test histograms across files, JSON summary and escaped dashboard"""
+        report = BatchReport()
+        report.add(file_entry("z.xml", [], schema_version="FA-3"))
+        report.add(
+            file_entry(
+                "<a>.xml", _errors(3), schema_version="FA-3", details="files/a.html"
+            )
+        )
+        report.add(file_entry("b.xml", _errors(1), schema_version="FA-3"))
+
+        json_path, html_path = report.write(tmp_path / "out")
+        data = json.loads(json_path.read_text(encoding="utf-8"))
+
+        assert data["summary"] == {
+            "files": 3,
+            "ok": 1,
+            "invalid": 2,
+            "failed": 0,
+            "errors": 6,
+        }
+        assert data["error_codes"][0] == {
+            "code": "SCHEMAV_CVC_LENGTH_VALID",
+            "errors": 4,
+            "files": 2,
+        }
+        assert data["top_fields"] == [{"field": "KodWaluty", "errors": 4, "files": 2}]
+        assert [f["file"] for f in data["files"]] == ["<a>.xml", "b.xml", "z.xml"]
+
+        dashboard = html_path.read_text(encoding="utf-8")
+        assert '<a href="files/a.html">&lt;a&gt;.xml</a>' in dashboard
+        assert "<a>.xml" not in dashboard
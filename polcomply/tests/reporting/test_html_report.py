@@ -0,0 +1,81 @@
+"""
+Tests for the streaming HTML report
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import json
+import re
+
+from polcomply.reporting import html_report
+from polcomply.reporting.html_report import (
+    generate_html_report,
+    iter_html_report,
+    write_html_report,
+)
+from polcomply.validators.xsd import ValidationError
+
+
+def _embedded(report: str, element_id: str):
+    match = re.search(rf'id="{element_id}">(.*?)</script>', report, re.S)
+    assert match is not None, f"No embedded {element_id}"
+    return json.loads(match.group(1))
+
+
+class TestHtmlReport:
+    """Test report escaping, grouping and streaming"""
+
+    def test_valid_document(self):
+        """Test a report without errors"""
+        report = generate_html_report([], "invoice.xml")
+        assert "Document is valid!" in report
+        assert "error-rows-data" not in report
+
+    def test_user_content_is_escaped(self):
+        """Test file names and messages cannot inject markup"""
+        errors = [
+            ValidationError("Value '<script>alert(1)</script>' invalid", line=3),
+        ]
+        report = generate_html_report(errors, '<img src=x onerror="1">.xml')
+
+        assert "<script>alert" not in report
+        assert "&lt;img src=x onerror=&quot;1&quot;&gt;.xml" in report
+        assert _embedded(report, "error-groups") == [
+            ["VALIDATION_ERROR", "Value '<script>alert(1)</script>' invalid"]
+        ]
+
+    def test_identical_errors_are_grouped(self):
+        """Test rows reference distinct messages instead of repeating them"""
+        errors = [
+            ValidationError("Missing P_1", line=i, column=2, code="cvc")
+            for i in range(1, 8)
+        ] + [ValidationError("Bad NIP", line=9, code="NIP")]
+        report = generate_html_report(errors, "invoice.xml")
+
+        assert _embedded(report, "error-groups") == [
+            ["cvc", "Missing P_1"],
+            ["NIP", "Bad NIP"],
+        ]
+        rows = _embedded(report, "error-rows-data")
+        assert rows[0] == [1, 2, 0]
+        assert rows[-1] == [9, 0, 1]
+        assert '<td class="error-count">7</td>' in report
+        assert '<td class="error-location">1, 2, 3, 4, 5</td>' in report
+
+    def test_large_reports_stream_in_chunks(self, tmp_path, monkeypatch):
+        """Test error rows are yielded in bounded chunks and stay compact"""
+        monkeypatch.setattr(html_report, "ROWS_PER_CHUNK", 1000)
+        errors = [
+            ValidationError(f"Element 'P_{i % 10}' invalid", line=i + 1, code="cvc")
+            for i in range(10_000)
+        ]
+
+        chunks = list(iter_html_report(errors, "big.xml"))
+        assert max(len(c) for c in chunks) < 50_000
+
+        path = write_html_report(errors, "big.xml", tmp_path / "report.html")
+        report = path.read_text(encoding="utf-8")
+        assert len(_embedded(report, "error-rows-data")) == 10_000
+        assert report.count("<tr>") < 20
+        assert path.stat().st_size < 250_000
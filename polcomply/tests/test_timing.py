@@ -0,0 +1,73 @@
+"""
+Tests for the pipeline stage timing hooks
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+from polcomply import timing
+from polcomply.validators.xsd import XSDValidator
+
+SCHEMA = """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:element name="Faktura" type="xs:string"/>
+</xs:schema>"""
+
+
+class TestTiming:
+    """Test observers, collection and merging"""
+
+    def test_nothing_recorded_without_observers(self):
+        """Test timed blocks are no-ops unless someone observes them"""
+        with timing.collect() as timings:
+            pass
+        with timing.timed("xml_parse"):
+            pass
+
+        assert timings.to_dict() == {"stages": {}, "events": {}}
+
+    def test_timed_records_failed_blocks(self):
+        """Test a stage is recorded as a decorator and when it raises"""
+
+        @timing.timed("check")
+        def check():
+            return "ok"
+
+        with timing.collect() as timings:
+            assert check() == "ok"
+            try:
+                with timing.timed("check"):
+                    raise ValueError("boom")
+            except ValueError:
+                pass
+
+        assert timings.calls == {"check": 2}
+
+    def test_validator_stages_and_cache_events(self, tmp_path):
+        """Test XSD validation reports its stages and schema cache use"""
+        schema = tmp_path / "schema.xsd"
+        schema.write_text(SCHEMA, encoding="utf-8")
+
+        with timing.collect() as timings:
+            XSDValidator(schema)
+            validator = XSDValidator(schema)
+            errors = validator.validate(b"<Faktura>1</Faktura>")
+
+        assert errors == []
+        report = timings.to_dict()
+        assert set(report["stages"]) == {"schema_compile", "xml_parse", "xsd_validate"}
+        assert report["events"] == {"schema_cache_hit": 1, "schema_cache_miss": 1}
+
+    def test_merge_sums_worker_totals(self):
+        """Test totals from several workers add up"""
+        worker = timing.Timings()
+        worker.stage("map", 0.5)
+        worker.count("schema_cache_hit")
+        total = timing.Timings()
+
+        total.merge(worker.to_dict())
+        total.merge(worker.to_dict())
+
+        assert total.to_dict() == {
+            "stages": {"map": {"seconds": 1.0, "calls": 2}},
+            "events": {"schema_cache_hit": 2},
+        }
@@ -0,0 +1,93 @@
+"""
+Tests for parallel batch validation
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import json
+
+import pytest
+
+from polcomply.validators.batch import collect_xml_files, validate_files
+
+
+@pytest.fixture
+def schema(tmp_path):
+    path = tmp_path / "invoice.xsd"
+    path.write_text(
+        """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+           targetNamespace="urn:test" elementFormDefault="qualified">
+    <xs:element name="Faktura">
+        <xs:complexType><xs:sequence>
+            <xs:element name="P_1" type="xs:string"/>
+        </xs:sequence></xs:complexType>
+    </xs:element>
+</xs:schema>""",
+        encoding="utf-8",
+    )
+    return path
+
+
+@pytest.fixture
+def invoices(tmp_path):
+    """Valid, invalid, malformed and foreign documents, with a stem collision"""
+    directory = tmp_path / "invoices"
+    (directory / "more").mkdir(parents=True)
+    documents = {
+        "ok.xml": '<Faktura xmlns="urn:test"><P_1>1</P_1></Faktura>',
+        "invalid.xml": '<Faktura xmlns="urn:test"><P_2>1</P_2></Faktura>',
+        "broken.xml": '<Faktura xmlns="urn:test"><P_1>',
+        "foreign.xml": '<Invoice xmlns="urn:other"/>',
+        "more/invalid.xml": '<Faktura xmlns="urn:test"/>',
+        "notes.txt": "not an invoice",
+    }
+    for name, content in documents.items():
+        (directory / name).write_text(content, encoding="utf-8")
+    return directory
+
+
+class TestBatchValidation:
+    """Test validating many files into one report"""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_validate_files(self, invoices, schema, tmp_path, workers):
+        """Test statuses, per-file reports and the consolidated report"""
+        files = collect_xml_files([invoices, invoices / "more" / "invalid.xml"])
+        assert [f.name for f in files] == [
+            "broken.xml",
+            "foreign.xml",
+            "invalid.xml",
+            "ok.xml",
+            "invalid.xml",
+        ]
+
+        out = tmp_path / "report"
+        report = validate_files(files, out, schema_path=schema, workers=workers)
+
+        assert report.summary == {
+            "files": 5,
+            "ok": 1,
+            "invalid": 3,
+            "failed": 1,
+            "errors": 4,
+        }
+        data = json.loads((out / "report.json").read_text(encoding="utf-8"))
+        entries = {f["file"]: f for f in data["files"]}
+        assert entries[str(invoices / "ok.xml")]["details"] is None
+        assert entries[str(invoices / "foreign.xml")]["status"] == "failed"
+        assert entries[str(invoices / "more" / "invalid.xml")]["details"] == (
+            "files/invalid_2.html"
+        )
+        assert sorted(p.name for p in (out / "files").iterdir()) == [
+            "broken.html",
+            "foreign.html",
+            "invalid.html",
+            "invalid_2.html",
+        ]
+        assert "files/broken.html" in (out / "index.html").read_text(encoding="utf-8")
+
+    def test_missing_input(self, tmp_path):
+        """Test a missing path is reported before validating anything"""
+        with pytest.raises(FileNotFoundError):
+            collect_xml_files([tmp_path / "missing"])
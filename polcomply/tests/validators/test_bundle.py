@@ -0,0 +1,150 @@
+"""
+Tests for schema bundles and schema resolution caching
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import os
+
+import pytest
+from lxml import etree
+
+from polcomply.validators import paths
+from polcomply.validators.bundle import build_bundle, write_bundle
+from polcomply.validators.xsd import ValidationError, XSDValidator
+
+
+@pytest.fixture
+def split_schema(tmp_path):
+    """Schema spread over an include and an import in a subdirectory"""
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "main.xsd").write_text(
+        """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+           xmlns:t="urn:test" xmlns:o="urn:other"
+           targetNamespace="urn:test" elementFormDefault="qualified">
+    <xs:include schemaLocation="types.xsd"/>
+    <xs:import namespace="urn:other" schemaLocation="sub/other.xsd"/>
+    <xs:element name="Root">
+        <xs:complexType><xs:sequence>
+            <xs:element name="Code" type="t:Code"/>
+            <xs:element ref="o:Amount"/>
+        </xs:sequence></xs:complexType>
+    </xs:element>
+</xs:schema>""",
+        encoding="utf-8",
+    )
+    (tmp_path / "types.xsd").write_text(
+        """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+           targetNamespace="urn:test">
+    <xs:simpleType name="Code">
+        <xs:restriction base="xs:string"><xs:length value="3"/></xs:restriction>
+    </xs:simpleType>
+</xs:schema>""",
+        encoding="utf-8",
+    )
+    (tmp_path / "sub" / "other.xsd").write_text(
+        """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+           targetNamespace="urn:other">
+    <xs:element name="Amount" type="xs:decimal"/>
+</xs:schema>""",
+        encoding="utf-8",
+    )
+    return tmp_path / "main.xsd"
+
+
+def _document(code: str, amount: str) -> bytes:
+    return (
+        f'<Root xmlns="urn:test"><Code>{code}</Code>'
+        f'<Amount xmlns="urn:other">{amount}</Amount></Root>'
+    ).encode()
+
+
+class TestSchemaBundle:
+    """Test building and loading schema bundles"""
+
+    def test_bundle_validates_like_the_schema(self, split_schema, tmp_path):
+        """Test a bundle holds every referenced document"""
+        info = write_bundle(split_schema, tmp_path / "out" / "main.bundle")
+        assert info["documents"] == ["main.xsd", "types.xsd", "other.xsd"]
+
+        # The bundle no longer needs the original files
+        for name in ("main.xsd", "types.xsd", "sub/other.xsd"):
+            (tmp_path / name).unlink()
+        validator = XSDValidator(tmp_path / "out" / "main.bundle")
+
+        assert validator.validate(_document("ABC", "1.50")) == []
+        errors = validator.validate(_document("ABCD", "x"))
+        assert len(errors) == 2
+        assert validator.get_schema_info()["fingerprint"] == info["fingerprint"]
+        assert validator.get_schema_info()["target_namespace"] == "urn:test"
+
+    def test_fingerprint_detects_tampering(self, split_schema, tmp_path):
+        """Test a modified bundle is rejected"""
+        bundle = build_bundle(split_schema)
+        bundle[1].text = bundle[1].text.replace('value="3"', 'value="4"')
+        path = tmp_path / "tampered.bundle"
+        etree.ElementTree(bundle).write(str(path))
+
+        with pytest.raises(ValidationError) as exc_info:
+            XSDValidator(path)
+        assert exc_info.value.code == "BUNDLE_FINGERPRINT"
+
+    def test_remote_schemas_are_not_bundled(self, tmp_path):
+        """Test remote references must be downloaded first"""
+        schema = tmp_path / "remote.xsd"
+        schema.write_text(
+            """<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+    <xs:import namespace="urn:x" schemaLocation="https://example.com/x.xsd"/>
+</xs:schema>""",
+            encoding="utf-8",
+        )
+
+        with pytest.raises(ValidationError) as exc_info:
+            build_bundle(schema)
+        assert exc_info.value.code == "BUNDLE_REMOTE_SCHEMA"
+
+    def test_validators_share_compiled_schema(self, split_schema):
+        """Test the schema is compiled once per file version"""
+        first = XSDValidator(split_schema)
+        second = XSDValidator(split_schema)
+        assert first._schema is second._schema
+
+        stat = split_schema.stat()
+        os.utime(split_schema, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert XSDValidator(split_schema)._schema is not first._schema
+
+
+class TestSchemaResolution:
+    """Test FA-3 schema resolution"""
+
+    @pytest.fixture(autouse=True)
+    def clean_cache(self, monkeypatch):
+        monkeypatch.setattr(paths, "_resolved", {})
+
+    def test_resolution_is_memoized(self, split_schema, monkeypatch):
+        """Test the search runs once per environment and directory"""
+        monkeypatch.setenv("FA3_SCHEMA_PATH", str(split_schema))
+        calls = []
+        search = paths._search_fa3_schema
+        monkeypatch.setattr(
+            paths,
+            "_search_fa3_schema",
+            lambda *args: calls.append(args) or search(*args),
+        )
+
+        assert paths.resolve_fa3_schema() == split_schema
+        assert paths.resolve_fa3_schema() == split_schema
+        assert len(calls) == 1
+
+    def test_resolution_prefers_fresh_bundle(self, split_schema, monkeypatch):
+        """Test a bundle next to the schema wins unless the schema is newer"""
+        monkeypatch.setenv("FA3_SCHEMA_PATH", str(split_schema))
+        bundle = paths.bundle_path(split_schema)
+        write_bundle(split_schema)
+        assert paths.resolve_fa3_schema() == bundle
+
+        stat = bundle.stat()
+        os.utime(split_schema, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        paths._resolved.clear()
+        assert paths.resolve_fa3_schema() == split_schema
@@ -0,0 +1,120 @@
+"""
+Tests for the multi-version schema registry
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import os
+
+import pytest
+
+from polcomply.validators import paths
+from polcomply.validators.registry import SchemaRegistry, sniff_namespace
+from polcomply.validators.xsd import XMLFeedParser
+
+
+def _schema(namespace: str) -> str:
+    return f"""<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+           targetNamespace="{namespace}" elementFormDefault="qualified">
+    <xs:element name="Faktura">
+        <xs:complexType><xs:sequence>
+            <xs:element name="P_1" type="xs:string"/>
+        </xs:sequence></xs:complexType>
+    </xs:element>
+</xs:schema>"""
+
+
+@pytest.fixture
+def schemas(tmp_path):
+    """FA-3 and FA-2 style schemas with different target namespaces"""
+    for version, namespace in (("FA-3", "urn:fa3"), ("FA-2", "urn:fa2")):
+        (tmp_path / f"{version}.xsd").write_text(_schema(namespace), encoding="utf-8")
+    return [tmp_path / "FA-3.xsd", tmp_path / "FA-2.xsd"]
+
+
+def _invoice(namespace: str, element: str = "P_1") -> bytes:
+    return f'<Faktura xmlns="{namespace}"><{element}>1</{element}></Faktura>'.encode()
+
+
+class TestSchemaRegistry:
+    """Test namespace sniffing and dispatch"""
+
+    @pytest.mark.parametrize(
+        "document,namespace",
+        [
+            (b'<?xml version="1.0"?>\n<a:R xmlns:a="urn:x"><b/></a:R>', "urn:x"),
+            (b'<R xmlns="urn:y"/>', "urn:y"),
+            (b"<R>", ""),
+            (b"<R", None),
+            (b"<R xmlns='urn:z'>" + b"<unclosed>" * 2000, "urn:z"),
+            (b"not xml", None),
+            (b'<R xmlns="urn:x', None),
+        ],
+    )
+    def test_sniff_namespace(self, document, namespace):
+        """Test only the root start tag needs to be well-formed"""
+        assert sniff_namespace(document) == namespace
+
+    def test_dispatches_by_namespace(self, schemas):
+        """Test each document is validated by its own version's schema"""
+        registry = SchemaRegistry(schemas)
+
+        assert registry.versions == {"urn:fa3": "FA-3", "urn:fa2": "FA-2"}
+        assert registry.validate(_invoice("urn:fa3")) == ("FA-3", [])
+        assert registry.validate(_invoice("urn:fa2")) == ("FA-2", [])
+
+        version, errors = registry.validate(_invoice("urn:fa2", "P_2"))
+        assert version == "FA-2"
+        assert len(errors) == 1
+
+    def test_unsupported_and_malformed_documents(self, schemas):
+        """Test unknown namespaces are rejected and bad XML hits the default"""
+        registry = SchemaRegistry(schemas)
+
+        version, errors = registry.validate(_invoice("urn:fa1"))
+        assert version is None
+        assert errors[0].code == "UNSUPPORTED_NAMESPACE"
+
+        version, errors = registry.validate(b"<Faktura")
+        assert version == "FA-3"
+        assert errors[0].code == "XML_SYNTAX_ERROR"
+
+        assert SchemaRegistry().validate(_invoice("urn:fa3"))[1][0].code == (
+            "NO_SCHEMA_REGISTERED"
+        )
+
+    @pytest.mark.parametrize(
+        "document",
+        [
+            _invoice("urn:fa3"),
+            _invoice("urn:fa2", "P_2"),
+            _invoice("urn:fa1"),
+            b'<Faktura xmlns="urn:fa3"><P_1>1</P_1>',
+            b"not xml",
+        ],
+    )
+    def test_validate_feed_matches_validate(self, schemas, document):
+        """Test a document fed in small chunks gives the same result"""
+        registry = SchemaRegistry(schemas)
+        feed = XMLFeedParser()
+        for offset in range(0, len(document), 7):
+            feed.feed(document[offset : offset + 7])
+
+        version, errors = registry.validate_feed(feed)
+
+        expected_version, expected = registry.validate(document)
+        assert version == expected_version
+        assert [(e.code, e.line) for e in errors] == [
+            (e.code, e.line) for e in expected
+        ]
+
+    def test_resolve_fa_schemas(self, schemas, monkeypatch):
+        """Test sibling versions are found next to FA-3, or listed explicitly"""
+        monkeypatch.setattr(paths, "_resolved", {})
+        monkeypatch.delenv("FA_SCHEMA_PATHS", raising=False)
+        monkeypatch.setenv("FA3_SCHEMA_PATH", str(schemas[0]))
+        assert paths.resolve_fa_schemas() == schemas
+
+        monkeypatch.setenv("FA_SCHEMA_PATHS", os.pathsep.join(map(str, schemas[1:])))
+        assert paths.resolve_fa_schemas() == schemas[1:]
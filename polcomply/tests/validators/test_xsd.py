@@ -287,6 +287,44 @@ class TestXSDValidator:
         validator = XSDValidator(sample_schema)
         assert validator.is_valid(invalid_xml_missing_element) is False
 
+    def test_validate_element(
+        self, sample_schema, valid_xml, invalid_xml_missing_element
+    ):
+        """Test validating parsed elements without re-serializing them"""
+        from lxml import etree
+
+        validator = XSDValidator(sample_schema)
+
+        assert validator.validate_element(etree.fromstring(valid_xml)) == []
+        errors = validator.validate_element(
+            etree.fromstring(invalid_xml_missing_element)
+        )
+        assert len(errors) > 0
+        assert all(isinstance(error, ValidationError) for error in errors)
+
+    def test_validate_element_concurrently(
+        self, sample_schema, valid_xml, invalid_xml_missing_element
+    ):
+        """Test threads sharing a compiled schema get only their own errors"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        from lxml import etree
+
+        validator = XSDValidator(sample_schema)
+        expected = len(
+            validator.validate_element(etree.fromstring(invalid_xml_missing_element))
+        )
+        documents = [valid_xml, invalid_xml_missing_element] * 1000
+
+        def error_count(document: bytes) -> int:
+            other = XSDValidator(sample_schema)  # same compiled schema
+            return len(other.validate_element(etree.fromstring(document)))
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            counts = list(pool.map(error_count, documents))
+
+        assert counts == [0, expected] * 1000
+
     def test_get_schema_info(self, sample_schema):
         """Test getting schema information"""
         validator = XSDValidator(sample_schema)
@@ -0,0 +1,130 @@
+"""
+Stage timing hooks for the validation and mapping pipelines
+
+SDK code reports how long each pipeline stage took (``timed``/``record``) and
+counts notable events such as schema cache hits (``count``). Nothing is kept
+unless an observer is registered: the API exports them as Prometheus metrics,
+and CLI batch runs collect a per-stage breakdown with ``collect``::
+
+    with collect() as timings:
+        validator.validate(xml_bytes)
+    print(timings.to_dict())
+
+Stages: ``schema_resolve``, ``schema_compile``, ``xml_parse``,
+``xsd_validate``, ``read``, ``map``, ``check``, ``render_xml``.
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import threading
+import time
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+
+class Observer:
+    """Receives stage timings and event counts; override what you need"""
+
+    def stage(self, name: str, seconds: float) -> None:
+        """Called once per completed stage"""
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Called for counted events (e.g. ``schema_cache_hit``)"""
+
+
+_O = TypeVar("_O", bound=Observer)
+
+_observers: list[Observer] = []
+_lock = threading.Lock()
+
+
+def observe(observer: _O) -> _O:
+    """Register an observer for all stages and events in this process"""
+    with _lock:
+        _observers.append(observer)
+    return observer
+
+
+def unobserve(observer: Observer) -> None:
+    """Remove a registered observer"""
+    with _lock:
+        if observer in _observers:
+            _observers.remove(observer)
+
+
+def record(name: str, seconds: float) -> None:
+    """Report a stage measured by the caller"""
+    for observer in _observers:
+        observer.stage(name, seconds)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Report an event"""
+    for observer in _observers:
+        observer.count(name, amount)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Time the enclosed block as one stage (also if it raises)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _observers:
+            record(name, time.perf_counter() - started)
+
+
+class Timings(Observer):
+    """Totals per stage and event, mergeable across worker processes"""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.events: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.events[name] = self.events.get(name, 0) + amount
+
+    def merge(self, other: Mapping[str, Any]) -> None:
+        """Add the totals of another ``to_dict`` result"""
+        for name, stats in other.get("stages", {}).items():
+            with self._lock:
+                self.seconds[name] = self.seconds.get(name, 0.0) + stats["seconds"]
+                self.calls[name] = self.calls.get(name, 0) + stats["calls"]
+        for name, amount in other.get("events", {}).items():
+            self.count(name, amount)
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-serializable totals, slowest stage first"""
+        return {
+            "stages": {
+                name: {
+                    "seconds": round(self.seconds[name], 6),
+                    "calls": self.calls[name],
+                }
+                for name in sorted(
+                    self.seconds, key=self.seconds.__getitem__, reverse=True
+                )
+            },
+            "events": dict(sorted(self.events.items())),
+        }
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    """Collect the stages and events of the enclosed block"""
+    timings = observe(Timings())
+    try:
+        yield timings
+    finally:
+        unobserve(timings)
@@ -5,6 +5,21 @@ Licensed under the Business Source License 1.1 (BSL).
 See LICENSE file for full terms.
 """
 
-from .xsd import ValidationError, XSDValidator
+from typing import TYPE_CHECKING
 
-__all__ = ["XSDValidator", "ValidationError"]
+from .._lazy import lazy_attributes
+
+if TYPE_CHECKING:
+    from .registry import SchemaRegistry
+    from .xsd import ValidationError, XSDValidator
+
+# Loaded on first access (PEP 562): the validator pulls in lxml
+_LAZY_ATTRIBUTES = {
+    "XSDValidator": ".xsd",
+    "ValidationError": ".xsd",
+    "SchemaRegistry": ".registry",
+}
+
+__all__ = ["XSDValidator", "ValidationError", "SchemaRegistry"]
+
+__getattr__, __dir__ = lazy_attributes(globals(), _LAZY_ATTRIBUTES)
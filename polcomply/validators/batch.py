@@ -0,0 +1,189 @@
+"""
+Parallel validation of many XML files with a consolidated report
+
+Each worker process compiles the schemas once, validates the files it is
+given and writes a per-file HTML report for every file with errors. Only a
+compact summary of each file travels back to the parent, which aggregates
+them into a ``BatchReport`` as they complete.
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import logging
+import os
+import time
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+from ..reporting.batch_report import BatchReport, file_entry
+from ..reporting.html_report import write_html_report
+from ..timing import collect
+from .registry import SchemaRegistry, fa_schema_registry
+from .xsd import ValidationError
+
+logger = logging.getLogger(__name__)
+
+XML_SUFFIXES = (".xml",)
+
+# Per-file reports, relative to the batch report directory
+DETAILS_DIR = "files"
+
+# Per-process state, set up once by ``_init_worker``
+_registry: SchemaRegistry | None = None
+
+
+def collect_xml_files(paths: Iterable[Path]) -> list[Path]:
+    """
+    Expand files and directories into the list of XML files to validate
+
+    Args:
+        paths: XML files, or directories whose XML files are validated
+
+    Returns:
+        Files in a stable order, without duplicates
+
+    Raises:
+        FileNotFoundError: If a path does not exist
+    """
+    files: list[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(
+                sorted(
+                    p
+                    for p in path.iterdir()
+                    if p.is_file() and p.suffix.lower() in XML_SUFFIXES
+                )
+            )
+        elif path.is_file():
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"Input not found: {path}")
+    return list(dict.fromkeys(files))
+
+
+def details_names(files: list[Path]) -> list[str]:
+    """Name one per-file report per input, suffixing stems that would collide"""
+    seen: Counter[str] = Counter()
+    names = []
+    for path in files:
+        stem = path.stem
+        seen[stem] += 1
+        if seen[stem] > 1:
+            stem = f"{stem}_{seen[stem]}"
+        names.append(f"{DETAILS_DIR}/{stem}.html")
+    return names
+
+
+def _init_worker(schema_path: Path | None) -> None:
+    """Compile the schemas once per worker process"""
+    global _registry
+    _registry = SchemaRegistry([schema_path]) if schema_path else fa_schema_registry()
+    if not len(_registry):
+        raise FileNotFoundError(
+            "FA-3 schema not found. Please provide a schema or set FA3_SCHEMA_PATH"
+        )
+
+
+def validate_file(xml_path: Path, report_dir: Path, details: str) -> dict[str, Any]:
+    """
+    Validate one file with this worker's schemas; never raises
+
+    Args:
+        xml_path: XML file to validate
+        report_dir: Batch report directory
+        details: Per-file report path, relative to ``report_dir``; only
+            written if the file has errors
+
+    Returns:
+        Compact entry for ``BatchReport.add``, with the time spent per stage
+    """
+    if _registry is None:
+        raise RuntimeError("Batch worker is not initialized")
+
+    started = time.perf_counter()
+    version: str | None = None
+    report: str | None = None
+    with collect() as timings:
+        try:
+            version, errors = _registry.validate_file(xml_path)
+            if errors:
+                write_html_report(
+                    errors, xml_path.name, report_dir / details, version or "N/A"
+                )
+                report = details
+        except Exception as e:
+            logger.exception(f"Batch validation failed for {xml_path}")
+            version = None
+            errors = [ValidationError(f"Unexpected error: {e}")]
+
+    entry = file_entry(
+        str(xml_path),
+        errors,
+        schema_version=version,
+        details=report,
+        seconds=round(time.perf_counter() - started, 4),
+    )
+    entry["stages"] = timings.to_dict()
+    return entry
+
+
+def _validate_job(job: tuple[Path, Path, str]) -> dict[str, Any]:
+    return validate_file(*job)
+
+
+def validate_files(
+    files: list[Path],
+    report_dir: Path,
+    schema_path: Path | None = None,
+    workers: int | None = None,
+) -> BatchReport:
+    """
+    Validate many XML files in a process pool
+
+    Writes ``report.json``, ``index.html`` and per-file reports of invalid
+    files to ``report_dir``.
+
+    Args:
+        files: XML files (see ``collect_xml_files``)
+        report_dir: Directory for the reports
+        schema_path: Validate every file against this XSD or bundle (default:
+            the FA schema matching each file's namespace)
+        workers: Worker processes (default: CPU count); 1 validates in-process
+
+    Returns:
+        The aggregated report
+
+    Raises:
+        FileNotFoundError: If no schema is found
+        ValidationError: If a schema is invalid
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files) or 1))
+    (report_dir / DETAILS_DIR).mkdir(parents=True, exist_ok=True)
+    jobs = [
+        (f, report_dir, name)
+        for f, name in zip(files, details_names(files), strict=True)
+    ]
+    report = BatchReport()
+
+    # Fail fast on a missing or broken schema instead of in every worker
+    _init_worker(schema_path)
+    if workers == 1:
+        for job in jobs:
+            report.add(_validate_job(job))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(schema_path,),
+        ) as pool:
+            for future in as_completed(pool.submit(_validate_job, j) for j in jobs):
+                report.add(future.result())
+
+    report.write(report_dir)
+    logger.info(f"Batch report saved to: {report_dir}")
+    return report
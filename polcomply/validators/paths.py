@@ -3,11 +3,41 @@
 import os
 from pathlib import Path
 
+from ..timing import count, timed
+
+# Suffix of schema bundles (see ``validators.bundle``); kept here so path
+# resolution does not import lxml
+BUNDLE_SUFFIX = ".bundle"
+
+# (FA3_SCHEMA_PATH, working directory) -> resolved path, per process
+_resolved: dict[tuple[str | None, Path], Path] = {}
+
+
+def bundle_path(schema_path: Path) -> Path:
+    """Default bundle location for an XSD (``FA-3.xsd`` -> ``FA-3.xsd.bundle``)"""
+    return schema_path.with_name(schema_path.name + BUNDLE_SUFFIX)
+
+
+def _prefer_bundle(schema_path: Path) -> Path:
+    """Use ``<schema>.bundle`` instead of the XSD when it is at least as new"""
+    bundle = bundle_path(schema_path)
+    try:
+        if bundle.stat().st_mtime_ns >= schema_path.stat().st_mtime_ns:
+            return bundle
+    except OSError:
+        pass
+    return schema_path
+
 
 def resolve_fa3_schema() -> Path | None:
     """
     Resolve FA-3 XSD schema file path
 
+    The first hit is memoized per process (for the current FA3_SCHEMA_PATH
+    and working directory). A schema bundle built next to the XSD with
+    ``polcomply schema bundle`` is returned instead of the XSD, unless the
+    XSD is newer.
+
     Search order:
     1. Environment variable FA3_SCHEMA_PATH
     2. ./schemas/FA-3.xsd (current directory)
@@ -16,19 +46,31 @@ def resolve_fa3_schema() -> Path | None:
     5. Package schemas/FA-3.xsd (in polcomply package)
 
     Returns:
-        Path to FA-3.xsd if found, None otherwise
+        Path to FA-3.xsd (or its bundle) if found, None otherwise
     """
+    env_path = os.getenv("FA3_SCHEMA_PATH")
+    cwd = Path.cwd()
+    key = (env_path, cwd)
+    if key in _resolved:
+        count("schema_path_cache_hit")
+        return _resolved[key]
+
+    count("schema_path_cache_miss")
+    with timed("schema_resolve"):
+        schema_path = _search_fa3_schema(env_path, cwd)
+        if schema_path is None:
+            return None
+        _resolved[key] = _prefer_bundle(schema_path)
+    return _resolved[key]
 
+
+def _search_fa3_schema(env_path: str | None, cwd: Path) -> Path | None:
     # 1. Environment variable
-    env_path = os.getenv("FA3_SCHEMA_PATH")
     if env_path:
         schema_path = Path(env_path)
         if schema_path.exists() and schema_path.is_file():
             return schema_path
 
-    # Current working directory
-    cwd = Path.cwd()
-
     # 2. ./schemas/FA-3.xsd
     schema_path = cwd / "schemas" / "FA-3.xsd"
     if schema_path.exists():
@@ -53,6 +95,32 @@ def resolve_fa3_schema() -> Path | None:
     return None
 
 
+def resolve_fa_schemas() -> list[Path]:
+    """
+    Resolve every FA schema version to load into a ``SchemaRegistry``
+
+    FA_SCHEMA_PATHS (paths separated by ``os.pathsep``) lists them explicitly.
+    Otherwise all ``FA-*.xsd`` files next to the resolved FA-3 schema are
+    used (e.g. FA-2.xsd and FA-3.xsd), each replaced by its bundle if fresh.
+
+    Returns:
+        Schema paths, FA-3 first (empty if no schema was found)
+    """
+    env_paths = os.getenv("FA_SCHEMA_PATHS")
+    if env_paths:
+        return [Path(p) for p in env_paths.split(os.pathsep) if p]
+
+    fa3 = resolve_fa3_schema()
+    if fa3 is None:
+        return []
+    schemas = [fa3]
+    for schema_path in sorted(fa3.parent.glob("FA-*.xsd")):
+        candidate = _prefer_bundle(schema_path)
+        if candidate.resolve() not in {s.resolve() for s in schemas}:
+            schemas.append(candidate)
+    return schemas
+
+
 def get_fa3_schema_or_fail() -> Path:
     """
     Get FA-3 schema path or raise error
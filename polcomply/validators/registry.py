@@ -0,0 +1,213 @@
+"""
+Registry of compiled schemas, dispatched by document namespace
+
+Every registered schema (e.g. FA(2) and FA(3)) stays compiled in memory. To
+validate a document, only its first start tag is parsed to learn the root
+namespace; the whole document is then validated by the matching schema.
+
+Licensed under the Business Source License 1.1 (BSL).
+See LICENSE file for full terms.
+"""
+
+import logging
+from collections.abc import Iterable
+from pathlib import Path
+
+from lxml import etree
+
+from ..timing import timed
+from .paths import BUNDLE_SUFFIX, resolve_fa_schemas
+from .xsd import ValidationError, XMLFeedParser, XSDValidator
+
+logger = logging.getLogger(__name__)
+
+# Bytes fed to the namespace sniffer at a time; the root tag is nearly
+# always within the first chunk
+SNIFF_CHUNK_SIZE = 4096
+
+
+def sniff_namespace(xml_bytes: bytes) -> str | None:
+    """
+    Namespace of the root element, parsing nothing past its start tag
+
+    Args:
+        xml_bytes: XML document as bytes
+
+    Returns:
+        Root namespace URI, ``""`` for no namespace, or ``None`` if the
+        document is malformed before its root start tag ends
+    """
+    parser = etree.XMLPullParser(events=("start",))
+    try:
+        for offset in range(0, len(xml_bytes), SNIFF_CHUNK_SIZE):
+            parser.feed(xml_bytes[offset : offset + SNIFF_CHUNK_SIZE])
+            for _, element in parser.read_events():
+                return etree.QName(element).namespace or ""
+        # The parser holds back a start tag at the very end of the input until
+        # it sees more; whitespace releases it without completing a cut-off tag
+        parser.feed(b"\n")
+    except etree.XMLSyntaxError:
+        pass
+    for _, element in parser.read_events():
+        return etree.QName(element).namespace or ""
+    return None
+
+
+def schema_version(schema_path: Path) -> str:
+    """Version label of a schema file (``FA-3.xsd`` or its bundle -> ``FA-3``)"""
+    name = schema_path.name
+    if name.endswith(BUNDLE_SUFFIX):
+        name = name[: -len(BUNDLE_SUFFIX)]
+    return Path(name).stem
+
+
+class SchemaRegistry:
+    """Compiled schemas by target namespace"""
+
+    def __init__(self, schemas: Iterable[Path] = ()):
+        """
+        Initialize registry and compile the given schemas
+
+        Args:
+            schemas: XSD or bundle paths; the first is the default used for
+                documents whose namespace cannot be read
+        """
+        self._validators: dict[str, tuple[str, XSDValidator]] = {}
+        self._default: tuple[str, XSDValidator] | None = None
+        for schema_path in schemas:
+            self.register(schema_path)
+
+    def register(self, schema_path: Path, version: str | None = None) -> str:
+        """
+        Compile a schema and route its target namespace to it
+
+        Args:
+            schema_path: Path to XSD schema or schema bundle
+            version: Label reported for documents it validates (default:
+                file name, e.g. ``FA-3``)
+
+        Returns:
+            Target namespace of the schema
+
+        Raises:
+            FileNotFoundError: If the schema file doesn't exist
+            ValidationError: If the schema is invalid
+        """
+        validator = XSDValidator(schema_path)
+        namespace = validator.get_schema_info()["target_namespace"] or ""
+        entry = (version or schema_version(schema_path), validator)
+        if namespace in self._validators:
+            logger.warning(
+                f"Schema {schema_path} replaces {self._validators[namespace][0]} "
+                f"for namespace '{namespace}'"
+            )
+        self._validators[namespace] = entry
+        if self._default is None:
+            self._default = entry
+        logger.info(f"Registered schema {entry[0]} for namespace '{namespace}'")
+        return namespace
+
+    @property
+    def versions(self) -> dict[str, str]:
+        """Registered namespaces and their version labels"""
+        return {ns: version for ns, (version, _) in self._validators.items()}
+
+    def __len__(self) -> int:
+        return len(self._validators)
+
+    def validate(self, xml_bytes: bytes) -> tuple[str | None, list[ValidationError]]:
+        """
+        Validate a document against the schema for its root namespace
+
+        Args:
+            xml_bytes: XML document as bytes
+
+        Returns:
+            Version label of the schema used (``None`` if none matched) and
+            the validation errors (empty if valid)
+        """
+        if self._default is None:
+            return None, [
+                ValidationError("No schemas registered", code="NO_SCHEMA_REGISTERED")
+            ]
+
+        namespace = sniff_namespace(xml_bytes)
+        if namespace is None:
+            # Malformed; the default validator reports the syntax error
+            version, validator = self._default
+        elif namespace in self._validators:
+            version, validator = self._validators[namespace]
+        else:
+            return None, [self._unsupported(namespace)]
+        return version, validator.validate(xml_bytes)
+
+    def validate_feed(
+        self, feed: XMLFeedParser
+    ) -> tuple[str | None, list[ValidationError]]:
+        """
+        Finish an incrementally parsed document and validate it
+
+        Args:
+            feed: Parser that was fed the whole document
+
+        Returns:
+            Version label of the schema used (``None`` if none matched) and
+            the validation errors (empty if valid)
+        """
+        if self._default is None:
+            return None, [
+                ValidationError("No schemas registered", code="NO_SCHEMA_REGISTERED")
+            ]
+
+        root, errors = feed.close()
+        if root is None:
+            return self._default[0], errors
+
+        namespace = etree.QName(root).namespace or ""
+        if namespace not in self._validators:
+            return None, [self._unsupported(namespace)]
+        version, validator = self._validators[namespace]
+        with timed("xsd_validate"):
+            return version, validator.validate_element(root)
+
+    def _unsupported(self, namespace: str) -> ValidationError:
+        supported = ", ".join(f"{v} ({ns})" for ns, v in sorted(self.versions.items()))
+        return ValidationError(
+            f"Unsupported document namespace '{namespace}'. Supported: {supported}",
+            code="UNSUPPORTED_NAMESPACE",
+        )
+
+    def validate_file(self, xml_path: Path) -> tuple[str | None, list[ValidationError]]:
+        """
+        Validate an XML file against the schema for its root namespace
+
+        Args:
+            xml_path: Path to XML file
+
+        Returns:
+            Version label of the schema used and the validation errors
+        """
+        try:
+            xml_bytes = xml_path.read_bytes()
+        except FileNotFoundError:
+            return None, [
+                ValidationError(
+                    f"XML file not found: {xml_path}", code="FILE_NOT_FOUND"
+                )
+            ]
+        except OSError as e:
+            return None, [
+                ValidationError(
+                    f"Failed to read XML file: {str(e)}", code="FILE_READ_ERROR"
+                )
+            ]
+        return self.validate(xml_bytes)
+
+
+def fa_schema_registry() -> SchemaRegistry:
+    """
+    Registry of all resolved FA schema versions (see ``resolve_fa_schemas``)
+
+    Schemas compile once per process, so building the registry again is cheap.
+    """
+    return SchemaRegistry(resolve_fa_schemas())
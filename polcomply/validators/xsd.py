@@ -6,11 +6,16 @@ See LICENSE file for full terms.
 """
 
 import logging
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 from lxml import etree
 
+from ..timing import count, record, timed
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,6 +56,86 @@ class ValidationError(Exception):
         }
 
 
+@lru_cache(maxsize=16)
+def _compile_schema(
+    path: str, mtime_ns: int, size: int
+) -> tuple[etree.XMLSchema, etree._ElementTree, str | None, threading.Lock]:
+    """
+    Parse and compile an XSD or schema bundle, once per process and file version
+
+    Compiled in a pre-fork server's master process, the result is shared
+    copy-on-write by all workers. The lock guards the schema's error log,
+    which every validation of the shared schema writes to.
+    """
+    from .bundle import compile_bundle, is_bundle
+
+    with timed("schema_compile"):
+        schema_doc = etree.parse(path)
+        fingerprint: str | None = None
+        if is_bundle(schema_doc.getroot()):
+            schema, schema_doc, fingerprint = compile_bundle(schema_doc.getroot())
+        else:
+            schema = etree.XMLSchema(schema_doc)
+    return schema, schema_doc, fingerprint, threading.Lock()
+
+
+def _syntax_error(error: etree.XMLSyntaxError) -> ValidationError:
+    return ValidationError(
+        f"XML syntax error: {error.msg}",
+        line=error.lineno,
+        column=error.position[0] if error.position else None,
+        code="XML_SYNTAX_ERROR",
+    )
+
+
+class XMLFeedParser:
+    """
+    Builds a document from chunks as they arrive (e.g. from an upload)
+
+    Only the parsed tree is kept, never the raw bytes. After the first syntax
+    error further chunks are ignored.
+    """
+
+    def __init__(self) -> None:
+        self._parser = etree.XMLParser()
+        self._errors: list[ValidationError] = []
+        self._seconds = 0.0
+
+    @property
+    def failed(self) -> bool:
+        """Whether the document is already known to be malformed"""
+        return bool(self._errors)
+
+    def feed(self, chunk: bytes) -> None:
+        """Parse the next chunk of the document"""
+        if self._errors:
+            return
+        started = time.perf_counter()
+        try:
+            self._parser.feed(chunk)
+        except etree.XMLSyntaxError as e:
+            self._errors.append(_syntax_error(e))
+        finally:
+            self._seconds += time.perf_counter() - started
+
+    def close(self) -> tuple[etree._Element | None, list[ValidationError]]:
+        """
+        Finish parsing
+
+        Returns:
+            Root element (``None`` if malformed) and the syntax errors
+        """
+        started = time.perf_counter()
+        root = None
+        if not self._errors:
+            try:
+                root = self._parser.close()
+            except etree.XMLSyntaxError as e:
+                self._errors.append(_syntax_error(e))
+        record("xml_parse", self._seconds + time.perf_counter() - started)
+        return root, self._errors
+
+
 class XSDValidator:
     """XSD schema validator for XML documents"""
 
@@ -58,8 +143,10 @@ class XSDValidator:
         """
         Initialize XSD validator with schema file
 
+        Validators of the same (unchanged) file share one compiled schema.
+
         Args:
-            schema_path: Path to XSD schema file
+            schema_path: Path to XSD schema file or schema bundle
 
         Raises:
             FileNotFoundError: If schema file doesn't exist
@@ -71,14 +158,26 @@ class XSDValidator:
         self.schema_path = schema_path
         self._schema: etree.XMLSchema | None = None
         self._schema_doc: etree._ElementTree | None = None
+        self._lock = threading.Lock()
+        self.fingerprint: str | None = None
         self._load_schema()
 
     def _load_schema(self) -> None:
         """Load and parse XSD schema"""
         try:
-            # Parse XSD schema
-            self._schema_doc = etree.parse(str(self.schema_path))
-            self._schema = etree.XMLSchema(self._schema_doc)
+            # Parse and compile XSD schema (or reuse it)
+            stat = self.schema_path.stat()
+            misses = _compile_schema.cache_info().misses
+            (
+                self._schema,
+                self._schema_doc,
+                self.fingerprint,
+                self._lock,
+            ) = _compile_schema(
+                str(self.schema_path.resolve()), stat.st_mtime_ns, stat.st_size
+            )
+            hit = _compile_schema.cache_info().misses == misses
+            count("schema_cache_hit" if hit else "schema_cache_miss")
             logger.info(f"XSD schema loaded successfully: {self.schema_path}")
         except etree.XMLSyntaxError as e:
             raise ValidationError(
@@ -87,6 +186,8 @@ class XSDValidator:
                 column=e.position[0] if e.position else None,
                 code="XSD_SYNTAX_ERROR",
             )
+        except ValidationError:
+            raise
         except Exception as e:
             raise ValidationError(
                 f"Failed to load XSD schema: {str(e)}", code="XSD_LOAD_ERROR"
@@ -106,17 +207,11 @@ class XSDValidator:
 
         try:
             # Parse XML document
-            xml_doc = etree.fromstring(xml_bytes)
+            with timed("xml_parse"):
+                xml_doc = etree.fromstring(xml_bytes)
         except etree.XMLSyntaxError as e:
             # XML syntax error - document is malformed
-            errors.append(
-                ValidationError(
-                    f"XML syntax error: {e.msg}",
-                    line=e.lineno,
-                    column=e.position[0] if e.position else None,
-                    code="XML_SYNTAX_ERROR",
-                )
-            )
+            errors.append(_syntax_error(e))
             return errors
         except Exception as e:
             errors.append(
@@ -129,7 +224,9 @@ class XSDValidator:
         # Validate against XSD schema
         try:
             if self._schema is not None:
-                self._schema.assertValid(xml_doc)
+                # The exception carries a copy of the shared error log
+                with timed("xsd_validate"), self._lock:
+                    self._schema.assertValid(xml_doc)
             logger.debug("XML document is valid according to XSD schema")
         except etree.DocumentInvalid as e:
             # Collect all validation errors
@@ -161,6 +258,37 @@ class XSDValidator:
 
         return errors
 
+    def validate_element(self, element: etree._Element) -> list[ValidationError]:
+        """
+        Validate an already built element (e.g. one streamed ``Faktura``)
+
+        The element is validated as a document root, so it must be a global
+        element of the schema. No serialization or re-parsing takes place.
+
+        Args:
+            element: lxml element to validate
+
+        Returns:
+            List of validation errors (empty if valid)
+        """
+        if self._schema is None:
+            return []
+        # Validations of a shared schema would mix their errors in its log
+        with self._lock:
+            if self._schema.validate(element):
+                return []
+            error_log = self._schema.error_log  # a copy
+
+        return [
+            ValidationError(
+                message=error.message,
+                line=error.line,
+                column=error.column,
+                code=error.type_name,
+            )
+            for error in error_log
+        ]
+
     def validate_file(self, xml_path: Path) -> list[ValidationError]:
         """
         Validate XML file against XSD schema
@@ -217,6 +345,7 @@ class XSDValidator:
             "schema_path": str(self.schema_path),
             "schema_loaded": self._schema is not None,
             "target_namespace": target_namespace,
+            "fingerprint": self.fingerprint,
         }
 
 